@@ -15,20 +15,45 @@
 
 from __future__ import annotations
 
+import atexit
+import codecs
+import cProfile
+import csv
+import gzip
+import hashlib
+import importlib.util
+import io
 import json
+import pstats
+import queue
+import re
+import tempfile
+import threading
 import time
-from dataclasses import dataclass
+import unicodedata
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import os
 import base64
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 import requests
 import streamlit as st
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
 from dotenv import load_dotenv
 from textwrap import dedent
 
+RERUN_STARTED = time.perf_counter()  # início desta execução do script (orçamento do rerun)
+
 
 # ============================
 # i18n
@@ -41,11 +66,18 @@ I18N = {'en': {'app_name': 'ISP Consulte Tools',
         'auth_unknown': 'Could not confirm. See JSON above.',
         'backoff': 'Backoff (sec)',
         'btn_apply_bulk': '⚡ Apply to selected',
+        'btn_apply_workbook': '✅ Apply workbook changes',
         'btn_clear_cache': '🧹 Clear page cache',
         'btn_clear_selection': '🧹 Clear selection',
         'btn_fetch_subjects': '🔄 Fetch subjects',
+        'btn_reload_subjects': '♻️ Reload from IXC',
+        'btn_reset_metrics': '🧹 Reset metrics',
+        'btn_resume_listing': '▶️ Continue listing',
         'btn_save_put': '💾 Save changes (PUT)',
         'btn_select_all_filtered': '✅ Select all (current filter)',
+        'cassette_active': '📼 HTTP cassette active: {mode} — {path} ({n} recorded interactions, {misses} misses, '
+                           '{fallbacks} answered with another call of the same endpoint)',
+        'chk_check_conflicts': 'Check for changes made in IXC before saving',
         'chk_save_only_changed': 'Save only changed items',
         'chk_save_only_selected': 'Save only selected (if any)',
         'chk_validate_before_save': 'Validate required fields before saving',
@@ -57,57 +89,130 @@ I18N = {'en': {'app_name': 'ISP Consulte Tools',
         'download_csv': '⬇️ Download CSV report',
         'download_edit_csv': '⬇️ Download edit report (CSV)',
         'download_edit_json': '⬇️ Download compact_edit_subjects (JSON)',
-        'download_json': '⬇️ Download compact_jsoncolumns (JSON)',
+        'download_fanout_matrix': '⬇️ Download row × base matrix (CSV)',
+        'download_json': '⬇️ Download compact_jsoncolumns (NDJSON.gz)',
+        'download_listing_csv': '⬇️ Download listing (CSV)',
+        'download_listing_ndjson': '⬇️ Full listing (NDJSON.gz)',
+        'download_listing_xlsx': '⬇️ Download for editing (xlsx, current filter)',
+        'download_listing_parquet': '⬇️ Full listing (Parquet)',
+        'download_metrics_json': '⬇️ Export metrics (JSON)',
+        'download_metrics_prom': '⬇️ Export metrics (Prometheus)',
+        'download_parquet': '⬇️ Download report (Parquet)',
         'download_template_diagnostics': '⬇️ Download template — Diagnostics',
         'download_template_subjects': '⬇️ Download template — Subjects',
         'downloads': 'Downloads',
+        'edit_in_excel': 'Edit in Excel (download / upload)',
         'errors': 'Errors',
+        'fanout_matrix': 'Result per base',
+        'fanout_rows': 'Status per row × base',
+        'fanout_title': '🌐 Several IXC bases (fan-out)',
         'go_create_diagnostics': '➡️ Go to Create Diagnostics',
         'go_create_subjects': '➡️ Go to Create Subjects',
+        'help_check_conflicts': 'Re-reads only the rows being saved (one listing per id range) and compares them with the version you edited.',
+        'help_keyset': 'Each page asks for id > last id read instead of page=N: constant cost at the end of large tables, no skipped/duplicated rows if records are added meanwhile, and a failed page can be resumed.',
+        'help_reload_subjects': 'Ignores the shared listing cache and downloads again (the new result replaces it for everyone).',
+        'help_resolve_lookups': 'Fetches the referenced IXC tables once (cached) and accepts names instead of ids in: {fields}. Rows with unknown ids/names are rejected before the POST.',
+        'help_rp_auto': 'Measures each page and doubles/halves rp towards {target:g} s per page; the value is remembered per host and the field above is only the starting point.',
         'hint_bulk': 'Tip: mark **select** column and use bulk edit to change a field for all selected.',
+        'hint_edit_in_excel': 'Download, edit in Excel keeping the id column, and upload: only changed cells become pending edits (saved with the PUT button).',
+        'hint_workbook': 'One .xlsx with the "Assuntos" and "Diagnósticos" sheets: read once, each sheet validated with its own rules and sent to both endpoints in parallel.',
+        'hint_xlsx_calamine': 'Tip: large .xlsx files read much faster with python-calamine installed (pip install python-calamine), or send the sheet as .csv/.parquet.',
         'home': 'Home',
         'host_label': 'IXC Host (URL da Sua Base IXC)',
+        'import_workbook': 'Subjects + Diagnostics',
         'label_bulk_field': 'Field (bulk edit)',
         'label_bulk_value': 'Value',
         'label_columns': 'Fields to show/edit',
+        'label_fanout': 'Run on all selected bases at once',
+        'label_fanout_targets': 'Bases',
         'label_filter': 'Filter (subject/description)',
+        'label_keyset': 'Paginate by id (keyset)',
         'label_max_pages': 'Max pages (safety)',
         'label_max_total': 'Total limit (0 = all)',
+        'label_on_conflict': 'Row changed in IXC since the listing',
+        'label_page': 'Page',
+        'label_page_size': 'Rows per page (editor)',
+        'label_gzip_reports': 'Compress CSV reports (.gz)',
+        'label_profile': 'Per-phase performance profile (debug)',
+        'label_profile_cprofile': 'Write cProfile dump (.prof) to disk',
+        'label_rate_limit': 'Requests/s per base (0 = no limit)',
+        'label_resolve_lookups': 'Resolve names → ids and check references before sending',
         'label_rp': 'Rows per page (rp)',
+        'label_rp_auto': 'Automatic rp',
         'label_selected': 'Selected',
+        'label_sort_by': 'Sort by',
+        'label_sort_order': 'Order',
+        'label_targets': 'Bases for fan-out (one per line)',
         'language': 'Language',
+        'listing_cache_stats': 'Shared listing cache: {entries} listings, {mb} MB — hits {hits}, misses {misses}, evictions {evictions}, invalidations {invalidations}, patches {patches}.',
+        'lookups_title': '🔗 References (name → id)',
         'manage_subjects': 'Manage Subjects',
         'manage_subjects_help': 'Fetch, edit and save (PUT) subjects one by one.',
         'masked_summary': 'Masked summary',
         'max_retries': 'Max retries',
+        'metrics_empty': 'No requests recorded yet.',
+        'metrics_help': 'Per-request timings to the IXC (all sessions on this server). Latency excludes backoff sleeps and '
+                        'client rate-limit waits (throttle_pct).',
         'missing_config': 'Missing Host and/or Token (use Settings or .env).',
         'msg_bulk_applied': "Applied '{field}={value}' to {n} items.",
+        'msg_conflicts_checked': 'Concurrency check: {n} rows re-read in {req} requests; {conflicts} changed in IXC.',
+        'msg_conflicts_found': '{n} row(s) were changed in IXC after your listing (see CONFLITO in the report).',
+        'msg_conflicts_rebased': 'Skipped rows now show the IXC version with your edits on top; review them and save again.',
+        'msg_csv_detected': 'CSV read as {encoding}, delimiter "{delimiter}".',
+        'msg_fanout_invalid': 'Ignored lines in the bases list: {errors}',
+        'msg_fanout_none': 'Select at least one base.',
         'msg_finished': 'Done. OK: {ok} | Errors: {err}',
+        'msg_first_dispatch': 'First row reached the sender {seconds:.2f}s after the click.',
+        'msg_listing_cached': 'From the shared listing cache (fetched {age} ago; edits saved through the app are already applied).',
+        'msg_listing_incomplete': 'Listing stopped with {n} subjects (HTTP {status}); it can continue from id > {after}.',
         'msg_loaded_n': 'Loaded {n} subjects.',
+        'msg_lookup_failed': 'Reference not checked — {detail}',
         'msg_missing_id': "Column 'id' is not visible. Include 'id' to save.",
         'msg_no_data_manage': 'Click **Fetch subjects** to load data.',
         'msg_no_selection': 'No selected rows.',
         'msg_nothing_to_save': 'No changes detected to save.',
+        'msg_page_info': 'Page {page} of {pages} — {n} rows in the current filter.',
+        'msg_report_preview': 'Showing the last {n} of {total} rows; the full report is in the downloads.',
+        'msg_resolving_lookups': 'Fetching the IXC reference tables...',
+        'msg_resume_has_edits': 'There are unsaved edits on the screen: save or clear them before continuing the listing.',
+        'msg_rp_auto_used': 'Automatic rp: {rps} ({pages} pages).',
+        'msg_workbook_applied': '{n} cells applied as pending edits.',
+        'msg_workbook_diff': '**{cells}** changed cells in **{rows}** subjects; {unknown} ids not in the listing.',
+        'msg_workbook_missing_sheet': 'Sheet "{sheet}" not found in the workbook (skipped).',
+        'msg_workbook_no_sheets': 'The workbook has none of the expected sheets: {sheets}.',
         'need_column': 'Spreadsheet must include required column: ',
         'need_file': 'Upload the spreadsheet to start.',
+        'on_conflict_overwrite': 'Overwrite anyway',
+        'on_conflict_skip': 'Skip and refresh it',
+        'page_cache_stats': 'Listing pages by content: {pages} pages, {mb} MB — unchanged pages reused {hits}, decoded {misses}.',
         'page_create_diagnostics_title': 'Create Diagnostics',
         'page_create_subjects_title': 'Create Subjects',
         'page_home_title': 'Home',
         'page_manage_subjects_title': 'Manage Subjects',
         'page_settings_title': 'Settings',
+        'page_workbook_title': 'Create Subjects + Diagnostics (one workbook)',
         'present_config': 'Host and token present (masked).',
         'preview_sheet': 'Spreadsheet preview (first rows)',
+        'profile_breakdown': 'Per-phase profile',
+        'profile_threads_note': 'Phases measured in worker threads (pipeline stages, fan-out jobs): % is over the time of the threads that measured them; the cProfile dump includes those threads.',
         'project_info': 'Project info',
         'put_saving': 'Saving',
+        'rerun_budget': 'Rerun budget',
+        'rerun_budget_history': 'Last reruns per page (all sessions, profile on)',
+        'rerun_budget_over': 'Fixed cost above budget: {fixed:.1f} ms > {budget:.0f} ms (IXC_RERUN_BUDGET_MS).',
+        'rerun_budget_summary': 'This rerun: {total:.1f} ms total, {fixed:.1f} ms outside the page (budget {budget:.0f} ms).',
         'result': 'Result',
         'run_create': '🚀 Create in IXC',
         'run_validate': '✅ Validate only',
         'session_only_note': 'Settings below are **session-only** (not saved to disk or browser).',
         'settings': 'Settings',
+        'sort_asc': 'Ascending',
+        'sort_desc': 'Descending',
         'status_config': 'Auth/config status (quick)',
         'summary': 'Summary',
         'support': 'Support',
         'tab_auth': 'Authentication',
+        'tab_metrics': 'Metrics',
         'tab_personalization': 'Personalization',
         'template_missing': 'Template not found in project: ',
         'templates': 'Templates',
@@ -118,6 +223,8 @@ I18N = {'en': {'app_name': 'ISP Consulte Tools',
         'theme_light': 'Light',
         'timeout': 'Timeout (sec)',
         'token_label': 'Basic token (IXC_AUTH_BASIC) — not saved',
+        'upload_edited_xlsx': 'Upload edited workbook (.xlsx)',
+        'upload_sheet': 'Upload spreadsheet (.xlsx, .csv or .parquet)',
         'upload_xlsx': 'Upload spreadsheet (.xlsx)',
         'what_can_do': 'What you can do',
         'restore_env': '🧹 Restore from .env',
@@ -130,11 +237,18 @@ I18N = {'en': {'app_name': 'ISP Consulte Tools',
            'auth_unknown': 'Não deu para confirmar. Veja o JSON acima.',
            'backoff': 'Backoff (seg)',
            'btn_apply_bulk': '⚡ Aplicar em selecionados',
+           'btn_apply_workbook': '✅ Aplicar alterações da planilha',
            'btn_clear_cache': '🧹 Limpar cache desta tela',
            'btn_clear_selection': '🧹 Limpar seleção',
            'btn_fetch_subjects': '🔄 Buscar assuntos',
+           'btn_reload_subjects': '♻️ Recarregar do IXC',
+           'btn_reset_metrics': '🧹 Zerar métricas',
+           'btn_resume_listing': '▶️ Continuar listagem',
            'btn_save_put': '💾 Salvar alterações (PUT)',
            'btn_select_all_filtered': '✅ Selecionar todos (filtro atual)',
+           'cassette_active': '📼 Cassete HTTP ativo: {mode} — {path} ({n} interações gravadas, {misses} sem gravação, '
+                              '{fallbacks} respondidas com outra chamada do mesmo endpoint)',
+           'chk_check_conflicts': 'Conferir alterações feitas no IXC antes de salvar',
            'chk_save_only_changed': 'Salvar somente itens alterados',
            'chk_save_only_selected': 'Salvar somente selecionados (se houver)',
            'chk_validate_before_save': 'Validar obrigatórios antes de salvar',
@@ -146,59 +260,132 @@ I18N = {'en': {'app_name': 'ISP Consulte Tools',
            'download_csv': '⬇️ Baixar relatório CSV',
            'download_edit_csv': '⬇️ Baixar relatório de edição (CSV)',
            'download_edit_json': '⬇️ Baixar compact_edicao_assuntos (JSON)',
-           'download_json': '⬇️ Baixar compact_jsoncolumns (JSON)',
+           'download_fanout_matrix': '⬇️ Baixar matriz linha × base (CSV)',
+           'download_json': '⬇️ Baixar compact_jsoncolumns (NDJSON.gz)',
+           'download_listing_csv': '⬇️ Baixar listagem (CSV)',
+           'download_listing_ndjson': '⬇️ Listagem completa (NDJSON.gz)',
+           'download_listing_xlsx': '⬇️ Baixar para edição (xlsx, filtro atual)',
+           'download_listing_parquet': '⬇️ Listagem completa (Parquet)',
+           'download_metrics_json': '⬇️ Exportar métricas (JSON)',
+           'download_metrics_prom': '⬇️ Exportar métricas (Prometheus)',
+           'download_parquet': '⬇️ Baixar relatório (Parquet)',
            'download_template_diagnostics': '⬇️ Baixar modelo — Diagnósticos',
            'download_template_subjects': '⬇️ Baixar modelo — Assuntos',
            'downloads': 'Downloads',
+           'edit_in_excel': 'Editar no Excel (baixar / enviar)',
            'errors': 'Erros',
+           'fanout_matrix': 'Resultado por base',
+           'fanout_rows': 'Status por linha × base',
+           'fanout_title': '🌐 Várias bases IXC (fan-out)',
            'go_create_diagnostics': '➡️ Ir para Criar Diagnósticos',
            'go_create_subjects': '➡️ Ir para Criar Assuntos',
+           'help_check_conflicts': 'Relê só as linhas a salvar (um listar por faixa de ids) e compara com a versão que você editou.',
+           'help_keyset': 'Cada página pede id > último id lido em vez de page=N: custo constante no fim de tabelas grandes, sem pular/repetir linhas se entrarem registros no meio, e dá para retomar uma página que falhou.',
+           'help_reload_subjects': 'Ignora o cache compartilhado de listagens e baixa de novo (o resultado novo vale para todas as sessões).',
+           'help_resolve_lookups': 'Busca uma vez (com cache) as tabelas referenciadas do IXC e aceita nomes no lugar de ids em: {fields}. Linhas com id/nome inexistente são rejeitadas antes do POST.',
+           'help_rp_auto': 'Mede cada página e dobra/divide o rp rumo a {target:g} s por página; o valor fica guardado por host e o campo acima é só o ponto de partida.',
            'hint_bulk': 'Dica: marque a coluna **selecionar** e use a edição em massa para alterar um campo em todos '
                         'selecionados.',
+           'hint_edit_in_excel': 'Baixe, edite no Excel mantendo a coluna id e envie de volta: só as células alteradas viram edições pendentes (salvas com o botão PUT).',
+           'hint_workbook': 'Um .xlsx com as abas "Assuntos" e "Diagnósticos": lido uma vez, cada aba validada com as próprias regras e enviada aos dois endpoints em paralelo.',
+           'hint_xlsx_calamine': 'Dica: .xlsx grandes são lidos bem mais rápido com o python-calamine instalado (pip install python-calamine), ou envie a planilha em .csv/.parquet.',
            'home': 'Home',
            'host_label': 'Host do IXC (URL da Sua Base IXC)',
+           'import_workbook': 'Assuntos + Diagnósticos',
            'label_bulk_field': 'Campo (edição em massa)',
            'label_bulk_value': 'Valor',
            'label_columns': 'Campos para exibir/editar',
+           'label_fanout': 'Rodar em todas as bases escolhidas ao mesmo tempo',
+           'label_fanout_targets': 'Bases',
            'label_filter': 'Filtro (assunto/descrição)',
+           'label_keyset': 'Paginar por id (keyset)',
            'label_max_pages': 'Máx. páginas (segurança)',
            'label_max_total': 'Limite total (0 = todos)',
+           'label_on_conflict': 'Linha alterada no IXC desde a listagem',
+           'label_page': 'Página',
+           'label_page_size': 'Linhas por página (editor)',
+           'label_gzip_reports': 'Compactar relatórios CSV (.gz)',
+           'label_profile': 'Perfil de desempenho por fase (debug)',
+           'label_profile_cprofile': 'Gravar dump do cProfile (.prof) em disco',
+           'label_rate_limit': 'Requisições/s por base (0 = sem limite)',
+           'label_resolve_lookups': 'Resolver nomes → ids e conferir referências antes de enviar',
            'label_rp': 'Registros por página (rp)',
+           'label_rp_auto': 'rp automático',
            'label_selected': 'Selecionados',
+           'label_sort_by': 'Ordenar por',
+           'label_sort_order': 'Ordem',
+           'label_targets': 'Bases para o fan-out (uma por linha)',
            'language': 'Idioma',
+           'listing_cache_stats': 'Cache compartilhado de listagens: {entries} listagens, {mb} MB — acertos {hits}, faltas {misses}, descartes {evictions}, invalidações {invalidations}, patches {patches}.',
+           'lookups_title': '🔗 Referências (nome → id)',
            'manage_subjects': 'Gerenciar Assuntos',
            'manage_subjects_help': 'Busque, edite e salve (PUT) os assuntos item a item.',
            'masked_summary': 'Resumo (mascarado)',
            'max_retries': 'Max retries',
+           'metrics_empty': 'Nenhuma requisição registrada ainda.',
+           'metrics_help': 'Tempos por requisição ao IXC (todas as sessões deste servidor). A latência não inclui o '
+                           'tempo dormindo em backoff nem a espera do rate limit do cliente (throttle_pct).',
            'missing_config': 'Falta configurar Host e/ou Token (use Configurações ou .env).',
            'msg_bulk_applied': "Aplicado '{field}={value}' em {n} itens.",
+           'msg_conflicts_checked': 'Conferência: {n} linhas relidas em {req} requisições; {conflicts} alteradas no IXC.',
+           'msg_conflicts_found': '{n} linha(s) foram alteradas no IXC depois da sua listagem (veja CONFLITO no relatório).',
+           'msg_conflicts_rebased': 'As linhas puladas agora mostram a versão do IXC com as suas edições por cima; revise e salve de novo.',
+           'msg_csv_detected': 'CSV lido como {encoding}, delimitador "{delimiter}".',
+           'msg_fanout_invalid': 'Linhas ignoradas na lista de bases: {errors}',
+           'msg_fanout_none': 'Escolha ao menos uma base.',
            'msg_finished': 'Finalizado. OK: {ok} | Erros: {err}',
+           'msg_first_dispatch': 'Primeira linha chegou ao envio {seconds:.2f}s após o clique.',
+           'msg_listing_cached': 'Do cache compartilhado de listagens (buscado há {age}; edições salvas pelo app já estão aplicadas).',
+           'msg_listing_incomplete': 'A listagem parou com {n} assuntos (HTTP {status}); dá para continuar de id > {after}.',
            'msg_loaded_n': 'Carregados {n} assuntos.',
+           'msg_lookup_failed': 'Referência não conferida — {detail}',
            'msg_missing_id': "Coluna 'id' não está visível. Inclua 'id' nos campos para salvar.",
            'msg_no_data_manage': 'Clique em **Buscar assuntos** para carregar os dados.',
            'msg_no_selection': 'Nenhuma linha selecionada.',
            'msg_nothing_to_save': 'Nenhuma alteração detectada para salvar.',
+           'msg_page_info': 'Página {page} de {pages} — {n} linhas no filtro atual.',
+           'msg_report_preview': 'Mostrando as últimas {n} de {total} linhas; o relatório completo está nos downloads.',
+           'msg_resolving_lookups': 'Buscando as tabelas de referência do IXC...',
+           'msg_resume_has_edits': 'Há edições não salvas na tela: salve ou limpe antes de continuar a listagem.',
+           'msg_rp_auto_used': 'rp automático: {rps} ({pages} páginas).',
+           'msg_workbook_applied': '{n} células aplicadas como edições pendentes.',
+           'msg_workbook_diff': '**{cells}** células alteradas em **{rows}** assuntos; {unknown} ids fora da listagem.',
+           'msg_workbook_missing_sheet': 'Aba "{sheet}" não encontrada na pasta (ignorada).',
+           'msg_workbook_no_sheets': 'A pasta não tem nenhuma das abas esperadas: {sheets}.',
            'need_column': 'A planilha precisa ter a coluna obrigatória: ',
            'need_file': 'Envie a planilha para começar.',
+           'on_conflict_overwrite': 'Sobrescrever mesmo assim',
+           'on_conflict_skip': 'Pular e atualizar a linha',
+           'page_cache_stats': 'Páginas da listagem por conteúdo: {pages} páginas, {mb} MB — páginas iguais reaproveitadas {hits}, decodificadas {misses}.',
            'page_create_diagnostics_title': 'Criar Diagnósticos',
            'page_create_subjects_title': 'Criar Assuntos',
            'page_home_title': 'Home',
            'page_manage_subjects_title': 'Gerenciar Assuntos',
            'page_settings_title': 'Configurações',
+           'page_workbook_title': 'Criar Assuntos + Diagnósticos (uma pasta)',
            'present_config': 'Host e token presentes (credenciais mascaradas).',
            'preview_sheet': 'Preview da planilha (primeiras linhas)',
+           'profile_breakdown': 'Perfil por fase',
+           'profile_threads_note': 'Fases medidas em threads de trabalho (estágios do pipeline, jobs do fan-out): o % é sobre o tempo das threads que as mediram; o .prof do cProfile inclui essas threads.',
            'project_info': 'Informações do projeto',
            'put_saving': 'Salvando',
+           'rerun_budget': 'Orçamento do rerun',
+           'rerun_budget_history': 'Últimos reruns por página (todas as sessões, com perfil ligado)',
+           'rerun_budget_over': 'Custo fixo acima do orçamento: {fixed:.1f} ms > {budget:.0f} ms (IXC_RERUN_BUDGET_MS).',
+           'rerun_budget_summary': 'Este rerun: {total:.1f} ms no total, {fixed:.1f} ms fora da página (orçamento {budget:.0f} ms).',
            'result': 'Resultado',
            'run_create': '🚀 Criar no IXC',
            'run_validate': '✅ Apenas validar',
            'session_only_note': 'As configurações abaixo podem ser aplicadas **somente na sessão atual** (não salva em '
                                 'disco nem no navegador).',
            'settings': 'Configurações',
+           'sort_asc': 'Crescente',
+           'sort_desc': 'Decrescente',
            'status_config': 'Status de autenticação/config (rápido)',
            'summary': 'Resumo',
            'support': 'Suporte',
            'tab_auth': 'Autenticação',
+           'tab_metrics': 'Métricas',
            'tab_personalization': 'Personalização',
            'template_missing': 'Template não encontrado no projeto: ',
            'templates': 'Planilhas modelo',
@@ -209,6 +396,8 @@ I18N = {'en': {'app_name': 'ISP Consulte Tools',
            'theme_light': 'Claro',
            'timeout': 'Timeout (seg)',
            'token_label': 'Token de acesso API (Token Original Do IXC)',
+           'upload_edited_xlsx': 'Enviar planilha editada (.xlsx)',
+           'upload_sheet': 'Upload da planilha (.xlsx, .csv ou .parquet)',
            'upload_xlsx': 'Upload da planilha (.xlsx)',
            'what_can_do': 'O que é possível fazer',
            'restore_env': '🧹 Restaurar do .env',
@@ -221,6 +410,113 @@ def tr(key: str) -> str:
     return I18N.get(lang, I18N["pt-BR"]).get(key, key)
 
 
+# ============================
+# Orçamento do rerun + assets estáticos (memo por processo)
+# ============================
+
+class RerunBudget:
+    """Tempo de cada trecho desta execução do script (do topo do app.py até o fim da página)."""
+
+    def __init__(self, started: float) -> None:
+        self.started = started
+        self._last = started
+        self.phases: List[Tuple[str, float]] = []
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    @property
+    def total(self) -> float:
+        return self._last - self.started
+
+    def seconds(self, phase: str) -> float:
+        return sum(secs for name, secs in self.phases if name == phase)
+
+
+class RerunHistory:
+    """Últimos reruns por página (todas as sessões): p50/p95 do total e do custo fixo fora da página."""
+
+    def __init__(self, maxlen: int = 200) -> None:
+        self._runs: Dict[str, deque] = {}
+        self._maxlen = maxlen
+        self._lock = threading.Lock()
+
+    def record(self, page: str, budget: RerunBudget, page_phase: str) -> None:
+        total = budget.total
+        with self._lock:
+            self._runs.setdefault(page, deque(maxlen=self._maxlen)).append((total, total - budget.seconds(page_phase)))
+
+    def summary(self) -> pd.DataFrame:
+        def pct(values: List[float], q: float) -> float:
+            values = sorted(values)
+            return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 1)
+
+        with self._lock:
+            runs = {page: list(d) for page, d in self._runs.items()}
+        rows = []
+        for page, items in sorted(runs.items()):
+            totals = [t for t, _ in items]
+            fixed = [f for _, f in items]
+            rows.append({"pagina": page, "reruns": len(items), "total_p50_ms": pct(totals, 0.5), "total_p95_ms": pct(totals, 0.95),
+                         "fixo_p50_ms": pct(fixed, 0.5), "fixo_p95_ms": pct(fixed, 0.95)})
+        return pd.DataFrame(rows)
+
+
+@st.cache_resource(show_spinner=False)
+def get_rerun_history() -> RerunHistory:
+    return RerunHistory()
+
+
+def minify_css(css: str) -> str:
+    """Remove comentários e espaços sobrando do CSS (menos bytes a cada rerun)."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    return re.sub(r":\s+", ":", css).replace(";}", "}").strip()  # espaço antes de ":" fica (seletor "a :hover")
+
+
+class StaticAssets:
+    """Textos e arquivos que não mudam entre reruns (CSS, modelos, logo, .env), montados uma vez por processo.
+
+    Só conteúdo comum a todas as sessões: nada que venha do session_state (token, cookie) entra aqui.
+    """
+
+    def __init__(self) -> None:
+        self._memo: Dict[Tuple[str, Any], Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind: str, key: Any, build: Callable[[], Any]) -> Any:
+        try:
+            return self._memo[(kind, key)]
+        except KeyError:
+            pass
+        value = build()
+        with self._lock:
+            return self._memo.setdefault((kind, key), value)
+
+    def css(self, mode: str, *blocks: str) -> str:
+        """Um único <style> minificado com os blocos do tema ``mode``."""
+        def build() -> str:
+            body = "".join(re.sub(r"</?style>", "", b) for b in blocks)
+            return f"<style>{minify_css(body)}</style>"
+        return self.get("css", mode, build)
+
+    def file_bytes(self, path: Path) -> Optional[bytes]:
+        """Conteúdo do arquivo (None se não existir); lido do disco só na primeira vez."""
+        return self.get("file", str(path), lambda: path.read_bytes() if path.exists() else None)
+
+
+@st.cache_resource(show_spinner=False)
+def get_static_assets() -> StaticAssets:
+    return StaticAssets()
+
+
+rerun_budget = RerunBudget(RERUN_STARTED)
+static_assets = get_static_assets()
+
+
 # ============================
 # Streamlit config + session defaults
 # ============================
@@ -243,6 +539,9 @@ def set_page(key: str) -> None:
     st.rerun()
 
 
+rerun_budget.mark("config + sessão")
+
+
 # ============================
 # THEME (Auto by system via CSS prefers-color-scheme)
 # ============================
@@ -380,11 +679,12 @@ section[data-testid="stSidebar"] .stButton { margin-bottom: 0.32rem !important;
 </style>
 """
 
-st.markdown(BASE_THEME_CSS, unsafe_allow_html=True)
-if st.session_state.theme_mode == "dark":
-    st.markdown(OVERRIDE_DARK, unsafe_allow_html=True)
-elif st.session_state.theme_mode == "light":
-    st.markdown(OVERRIDE_LIGHT, unsafe_allow_html=True)
+THEME_OVERRIDES = {"dark": OVERRIDE_DARK, "light": OVERRIDE_LIGHT}
+
+# base + override do modo num <style> só, minificado uma vez por processo
+_theme_mode = st.session_state.theme_mode if st.session_state.theme_mode in THEME_OVERRIDES else "auto"
+st.markdown(static_assets.css(_theme_mode, BASE_THEME_CSS, THEME_OVERRIDES.get(_theme_mode, "")), unsafe_allow_html=True)
+rerun_budget.mark("tema (CSS)")
 
 
 # ============================
@@ -396,10 +696,7 @@ TEMPLATES_DIR = APP_DIR / "templates"
 
 
 def read_template_bytes(filename: str) -> Optional[bytes]:
-    path = TEMPLATES_DIR / filename
-    if not path.exists():
-        return None
-    return path.read_bytes()
+    return static_assets.file_bytes(TEMPLATES_DIR / filename)
 
 
 def templates_block() -> None:
@@ -413,9 +710,10 @@ def templates_block() -> None:
         else:
             st.download_button(
                 tr("download_template_subjects"),
-                data=b1,
+                data=lambda: read_template_bytes("modelo_assuntos.xlsx"),  # bytes só no clique, não a cada rerun
                 file_name="modelo_assuntos.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                on_click="ignore",
                 use_container_width=True,
             )
 
@@ -426,9 +724,10 @@ def templates_block() -> None:
         else:
             st.download_button(
                 tr("download_template_diagnostics"),
-                data=b2,
+                data=lambda: read_template_bytes("modelo_diagnosticos.xlsx"),  # bytes só no clique, não a cada rerun
                 file_name="modelo_diagnosticos.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                on_click="ignore",
                 use_container_width=True,
             )
 
@@ -437,7 +736,16 @@ def templates_block() -> None:
 # .env + runtime config
 # ============================
 
-load_dotenv()
+static_assets.get("dotenv", None, load_dotenv)  # .env lido uma vez por processo
+
+ENV_FLAG_TRUE = ("1", "true", "s", "sim", "yes", "on")
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    """Liga/desliga do .env: 1/true/s/sim/yes/on liga; vazio ou ausente fica com ``default``."""
+    v = (os.getenv(name, "") or "").strip().lower()
+    return v in ENV_FLAG_TRUE if v else default
+
 
 ENV_IXC_BASE_URL = (os.getenv("IXC_BASE_URL", "") or "").strip().rstrip("/")
 ENV_IXC_AUTH_BASIC = (os.getenv("IXC_AUTH_BASIC", "") or "").strip()
@@ -445,6 +753,28 @@ ENV_IXC_COOKIE = (os.getenv("IXC_COOKIE", "") or "").strip()
 ENV_IXC_TIMEOUT_SECONDS = float(os.getenv("IXC_TIMEOUT_SECONDS", "30"))
 ENV_IXC_MAX_RETRIES = int(os.getenv("IXC_MAX_RETRIES", "3"))
 ENV_IXC_RETRY_BACKOFF_SECONDS = float(os.getenv("IXC_RETRY_BACKOFF_SECONDS", "1.5"))
+ENV_IXC_PROFILE = _env_flag("IXC_PROFILE")
+ENV_IXC_PROFILE_CPROFILE = _env_flag("IXC_PROFILE_CPROFILE")
+ENV_IXC_PROFILE_DIR = (os.getenv("IXC_PROFILE_DIR", "") or "").strip() or str(APP_DIR / "profiles")
+ENV_IXC_PROGRESS_INTERVAL_SECONDS = float(os.getenv("IXC_PROGRESS_INTERVAL_SECONDS", "0.5"))  # barra/status dos loops
+ENV_IXC_PIPELINE_QUEUE_SIZE = int(os.getenv("IXC_PIPELINE_QUEUE_SIZE", "256"))  # itens por fila entre estágios do import
+ENV_IXC_RERUN_BUDGET_MS = float(os.getenv("IXC_RERUN_BUDGET_MS", "50"))  # custo fixo aceitável por rerun, fora da página
+ENV_IXC_GZIP_REPORTS = _env_flag("IXC_GZIP_REPORTS")
+ENV_IXC_CASSETTE = (os.getenv("IXC_CASSETTE", "") or "").strip()
+ENV_IXC_CASSETTE_MODE = (os.getenv("IXC_CASSETTE_MODE", "") or "").strip().lower()  # record | replay | replay_timed
+ENV_IXC_CASSETTE_FALLBACK = _env_flag("IXC_CASSETTE_FALLBACK")
+ENV_IXC_RATE_LIMIT = float(os.getenv("IXC_RATE_LIMIT", "0"))  # req/s por base; 0 = sem limite
+ENV_IXC_TARGETS_FILE = (os.getenv("IXC_TARGETS_FILE", "") or "").strip()  # bases do fan-out (uma por linha)
+ENV_IXC_FANOUT_WORKERS = int(os.getenv("IXC_FANOUT_WORKERS", "8"))
+ENV_IXC_LOOKUP_TTL_SECONDS = float(os.getenv("IXC_LOOKUP_TTL_SECONDS", "600"))
+ENV_IXC_LOOKUPS = (os.getenv("IXC_LOOKUPS", "") or "").strip()  # tabela.campo=tabela_ref:coluna_nome;...
+ENV_IXC_LISTING_CACHE_TTL_SECONDS = float(os.getenv("IXC_LISTING_CACHE_TTL_SECONDS", "300"))  # 0 = sem cache
+ENV_IXC_LISTING_CACHE_MB = float(os.getenv("IXC_LISTING_CACHE_MB", "256"))
+ENV_IXC_RP_AUTO = _env_flag("IXC_RP_AUTO")
+ENV_IXC_RP_TARGET_SECONDS = float(os.getenv("IXC_RP_TARGET_SECONDS", "2"))  # tempo-alvo por página no rp automático
+ENV_IXC_PAGE_CACHE_MB = float(os.getenv("IXC_PAGE_CACHE_MB", "128"))  # páginas normalizadas por hash; 0 = desliga
+ENV_IXC_LIST_KEYSET = _env_flag("IXC_LIST_KEYSET")
+ENV_IXC_XLSX_BACKEND = (os.getenv("IXC_XLSX_BACKEND", "") or "auto").strip().lower()  # auto | calamine | openpyxl
 
 ENDPOINT_ASSUNTO = "/webservice/v1/su_oss_assunto"
 ENDPOINT_DIAGNOSTICO = "/webservice/v1/su_diagnostico"
@@ -486,20 +816,53 @@ def mask_middle(s: str, keep_left: int = 10, keep_right: int = 6) -> str:
     return s[:keep_left] + "..." + s[-keep_right:]
 
 
-def get_runtime_config() -> Dict[str, Any]:
-    base_url = st.session_state.get("cfg_base_url") or ENV_IXC_BASE_URL
-    auth = st.session_state.get("cfg_auth_basic") or ENV_IXC_AUTH_BASIC
-    cookie = st.session_state.get("cfg_cookie") or ENV_IXC_COOKIE
+def read_targets_file(path: str) -> str:
+    """Conteúdo do IXC_TARGETS_FILE ("" se não configurado ou ilegível)."""
+    if not path:
+        return ""
+    try:
+        data = static_assets.file_bytes(Path(path))
+    except OSError:
+        return ""
+    return data.decode("utf-8") if data else ""
+
+
+ENV_IXC_TARGETS = read_targets_file(ENV_IXC_TARGETS_FILE)
+
+
+RUNTIME_CONFIG_KEYS = (
+    "cfg_base_url", "cfg_auth_basic", "cfg_cookie", "cfg_timeout_seconds", "cfg_max_retries", "cfg_retry_backoff_seconds",
+    "cfg_profile", "cfg_profile_cprofile", "cfg_gzip_reports", "cfg_rate_limit", "cfg_targets",
+)
+
+
+def _derive_runtime_config(o: Dict[str, Any]) -> Dict[str, Any]:
     return {
-        "base_url": (base_url or "").strip().rstrip("/"),
-        "auth_basic": (auth or "").strip(),
-        "cookie": (cookie or "").strip(),
-        "timeout_seconds": float(st.session_state.get("cfg_timeout_seconds") or ENV_IXC_TIMEOUT_SECONDS),
-        "max_retries": int(st.session_state.get("cfg_max_retries") or ENV_IXC_MAX_RETRIES),
-        "retry_backoff_seconds": float(st.session_state.get("cfg_retry_backoff_seconds") or ENV_IXC_RETRY_BACKOFF_SECONDS),
+        "base_url": (o["cfg_base_url"] or ENV_IXC_BASE_URL or "").strip().rstrip("/"),
+        "auth_basic": (o["cfg_auth_basic"] or ENV_IXC_AUTH_BASIC or "").strip(),
+        "cookie": (o["cfg_cookie"] or ENV_IXC_COOKIE or "").strip(),
+        "timeout_seconds": float(o["cfg_timeout_seconds"] or ENV_IXC_TIMEOUT_SECONDS),
+        "max_retries": int(o["cfg_max_retries"] or ENV_IXC_MAX_RETRIES),
+        "retry_backoff_seconds": float(o["cfg_retry_backoff_seconds"] or ENV_IXC_RETRY_BACKOFF_SECONDS),
+        "profile": bool(o["cfg_profile"] or ENV_IXC_PROFILE),
+        "profile_cprofile": bool(o["cfg_profile_cprofile"] or ENV_IXC_PROFILE_CPROFILE),
+        "gzip_reports": bool(o["cfg_gzip_reports"] or ENV_IXC_GZIP_REPORTS),
+        "rate_limit": float(o["cfg_rate_limit"] or ENV_IXC_RATE_LIMIT),
+        "targets": str(o["cfg_targets"] or ENV_IXC_TARGETS),
     }
 
 
+def get_runtime_config() -> Dict[str, Any]:
+    """Config da sessão; a derivada fica no próprio session_state enquanto os valores cfg_* não mudam."""
+    ss = st.session_state
+    overrides = tuple(ss.get(k) for k in RUNTIME_CONFIG_KEYS)
+    memo = ss.get("_runtime_config")
+    if memo is None or memo[0] != overrides:
+        memo = (overrides, _derive_runtime_config(dict(zip(RUNTIME_CONFIG_KEYS, overrides))))
+        ss["_runtime_config"] = memo
+    return dict(memo[1])
+
+
 def build_headers(cfg: Dict[str, Any]) -> Dict[str, str]:
     auth_header = normalize_auth_to_header(cfg.get("auth_basic", ""))
     headers: Dict[str, str] = {"Content-Type": "application/json"}
@@ -513,6 +876,12 @@ def build_headers(cfg: Dict[str, Any]) -> Dict[str, str]:
     return headers
 
 
+def credential_fingerprint(cfg: Dict[str, Any]) -> str:
+    """Identifica a credencial em chaves de cache sem guardar o token."""
+    raw = f"{normalize_auth_to_header(cfg.get('auth_basic', ''))}\0{cfg.get('cookie', '')}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
 # ============================
 # API client
 # ============================
@@ -525,105 +894,539 @@ class IXCResponse:
     text: str
 
 
-def test_auth(cfg: Dict[str, Any], session: Optional[requests.Session] = None) -> Dict[str, Any]:
-    """Faz um HEAD no endpoint do IXC (sem body) para validar se o Authorization está ok."""
-    url = f"{cfg['base_url']}{ENDPOINT_ASSUNTO}"
-    headers = build_headers(cfg)
-    s = session or requests.Session()
-    s = session or requests.Session()
-    try:
-        resp = s.request("HEAD", url, headers=headers, timeout=cfg["timeout_seconds"])
-        return {
-            "ok": resp.status_code != 401,
-            "status_code": resp.status_code,
-            "response_headers": dict(resp.headers),
-            "response_text": (resp.text or "")[:500],
-        }
-    except Exception as e:
-        return {"ok": False, "error": str(e)}
+RETRY_STATUSES = (429, 500, 502, 503, 504)
 
 
-def post_to_endpoint(cfg: Dict[str, Any], endpoint_path: str, payload: Dict[str, str], session: Optional[requests.Session] = None) -> IXCResponse:
-    url = f"{cfg['base_url']}{endpoint_path}"
-    headers = build_headers(cfg)
-    s = session or requests.Session()
+# ----------------------------
+# Métricas por requisição (latência, retries, backoff, bytes)
+# ----------------------------
 
-    last_text = ""
-    last_data: Optional[dict] = None
-    last_status: Optional[int] = None
+@dataclass
+class RequestSample:
+    host: str
+    op: str  # head | post | put | listar
+    endpoint: str
+    http_status: Optional[int]
+    ok: bool
+    started: float  # time.time() do início
+    seconds: float  # tempo total, incluindo o backoff e a espera do rate limit
+    backoff_seconds: float  # dormindo após 429/5xx/erro de rede (o servidor pediu calma)
+    attempts: int
+    bytes_sent: int
+    bytes_received: int
+    throttle_seconds: float = 0.0  # esperando o rate limit do próprio cliente (IXC_RATE_LIMIT)
+
+
+def _endpoint_label(endpoint_path: str) -> str:
+    """'/webservice/v1/su_oss_assunto/123' -> '/webservice/v1/su_oss_assunto/{id}' (agrupa as métricas)."""
+    head, _, tail = endpoint_path.rstrip("/").rpartition("/")
+    return f"{head}/{{id}}" if tail.isdigit() else endpoint_path
+
+
+def _host_label(base_url: str) -> str:
+    return base_url.split("://", 1)[-1].split("/", 1)[0]
+
+
+class RequestMetrics:
+    """Amostras das chamadas ao IXC (janela limitada, thread-safe), compartilhadas pelo processo."""
+
+    def __init__(self, max_samples: int = 100_000) -> None:
+        self._samples: deque = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def record(self, sample: RequestSample) -> None:
+        with self._lock:
+            self._samples.append(sample)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+    def samples(self) -> List[RequestSample]:
+        with self._lock:
+            return list(self._samples)
+
+    def aggregate(self) -> List[Dict[str, Any]]:
+        """Agregados exatos por host/operação/endpoint (latência sem backoff nem rate limit, em segundos)."""
+        rows = [asdict(x) for x in self.samples()]
+        if not rows:
+            return []
+        df = pd.DataFrame(rows)
+        df["latency"] = df["seconds"] - df["backoff_seconds"] - df["throttle_seconds"]
+        df["finished"] = df["started"] + df["seconds"]
+        out: List[Dict[str, Any]] = []
+        for (host, op, endpoint), g in df.groupby(["host", "op", "endpoint"], sort=True):
+            span = max(float(g["finished"].max() - g["started"].min()), 1e-9)
+            q = g["latency"].quantile([0.5, 0.95, 0.99])
+            out.append({
+                "host": host,
+                "op": op,
+                "endpoint": endpoint,
+                "requests": len(g),
+                "errors": int((~g["ok"]).sum()),
+                "retries": int((g["attempts"] - 1).clip(lower=0).sum()),
+                "p50": float(q.loc[0.5]),
+                "p95": float(q.loc[0.95]),
+                "p99": float(q.loc[0.99]),
+                "latency_sum": float(g["latency"].sum()),
+                "req_s": len(g) / span,
+                "seconds": float(g["seconds"].sum()),
+                "backoff_seconds": float(g["backoff_seconds"].sum()),
+                "throttle_seconds": float(g["throttle_seconds"].sum()),
+                "bytes_sent": int(g["bytes_sent"].sum()),
+                "bytes_received": int(g["bytes_received"].sum()),
+            })
+        return out
+
+    def summary(self) -> pd.DataFrame:
+        """Tabela do painel: uma linha por host/operação/endpoint."""
+        rows = []
+        for a in self.aggregate():
+            rows.append({
+                "host": a["host"],
+                "op": a["op"],
+                "endpoint": a["endpoint"],
+                "requests": a["requests"],
+                "errors": a["errors"],
+                "retries": a["retries"],
+                "p50_ms": round(a["p50"] * 1000, 1),
+                "p95_ms": round(a["p95"] * 1000, 1),
+                "p99_ms": round(a["p99"] * 1000, 1),
+                "req_s": round(a["req_s"], 2),
+                "backoff_pct": round(a["backoff_seconds"] / max(a["seconds"], 1e-9) * 100, 1),
+                "throttle_pct": round(a["throttle_seconds"] / max(a["seconds"], 1e-9) * 100, 1),
+                "kb_sent": round(a["bytes_sent"] / 1024, 1),
+                "kb_received": round(a["bytes_received"] / 1024, 1),
+            })
+        return pd.DataFrame(rows)
+
+    def to_json(self) -> str:
+        return json.dumps({"endpoints": self.aggregate(), "samples": [asdict(x) for x in self.samples()]}, ensure_ascii=False)
+
+    def to_prometheus(self) -> str:
+        """Formato texto do Prometheus (counters + summary de latência por endpoint)."""
+
+        def labels(**kw: Any) -> str:
+            esc = {k: str(v).replace("\\", "\\\\").replace('"', '\\"') for k, v in kw.items()}
+            return "{" + ",".join(f'{k}="{v}"' for k, v in esc.items()) + "}"
+
+        lines: List[str] = [
+            "# HELP ixc_requests_total Requisicoes ao IXC por host, operacao, endpoint e status HTTP.",
+            "# TYPE ixc_requests_total counter",
+        ]
+        by_status: Dict[Tuple[str, str, str, str], int] = {}
+        for x in self.samples():
+            k = (x.host, x.op, x.endpoint, str(x.http_status or "erro"))
+            by_status[k] = by_status.get(k, 0) + 1
+        for (host, op, endpoint, status), n in sorted(by_status.items()):
+            lines.append(f"ixc_requests_total{labels(host=host, op=op, endpoint=endpoint, status=status)} {n}")
+
+        groups = self.aggregate()
+        lines += [
+            "# HELP ixc_request_latency_seconds Latencia por requisicao (sem backoff nem rate limit).",
+            "# TYPE ixc_request_latency_seconds summary",
+        ]
+        for a in groups:
+            base = dict(host=a["host"], op=a["op"], endpoint=a["endpoint"])
+            for qname, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+                lines.append(f"ixc_request_latency_seconds{labels(**base, quantile=qname)} {a[key]:.6f}")
+            lines.append(f"ixc_request_latency_seconds_sum{labels(**base)} {a['latency_sum']:.6f}")
+            lines.append(f"ixc_request_latency_seconds_count{labels(**base)} {a['requests']}")
+
+        series = [
+            ("ixc_request_retries_total", "counter", "Tentativas extras (retries).", "retries"),
+            ("ixc_request_backoff_seconds_total", "counter", "Tempo dormindo em backoff.", "backoff_seconds"),
+            ("ixc_request_throttle_seconds_total", "counter", "Tempo esperando o rate limit do cliente.", "throttle_seconds"),
+            ("ixc_request_bytes_sent_total", "counter", "Bytes enviados.", "bytes_sent"),
+            ("ixc_request_bytes_received_total", "counter", "Bytes recebidos.", "bytes_received"),
+            ("ixc_requests_per_second", "gauge", "Vazao observada na janela.", "req_s"),
+        ]
+        for name, kind, help_text, key in series:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for a in groups:
+                base = dict(host=a["host"], op=a["op"], endpoint=a["endpoint"])
+                lines.append(f"{name}{labels(**base)} {a[key]:g}" if isinstance(a[key], float) else f"{name}{labels(**base)} {a[key]}")
+        return "\n".join(lines) + "\n"
+
+
+@st.cache_resource(show_spinner=False)
+def get_request_metrics() -> RequestMetrics:
+    return RequestMetrics()
+
+
+# ============================
+# Cassete HTTP (gravar / reproduzir offline)
+# ============================
+#
+# IXC_CASSETTE=caminho.ndjson.gz + IXC_CASSETTE_MODE=record grava cada chamada (método, path, header
+# ixcsoft, body, status, resposta, tempo) — sem host, Authorization nem Cookie. Com replay /
+# replay_timed as sessões do app respondem do arquivo, sem rede (replay_timed dorme o tempo original).
+# Chamada sem gravação idêntica falha como erro de conexão; IXC_CASSETTE_FALLBACK=1 devolve a última
+# resposta gravada do mesmo endpoint (conta como falta e como fallback nas métricas).
+
+CASSETTE_MODES = ("record", "replay", "replay_timed")
+
+
+def _cassette_key(method: str, path: str, ixcsoft: str, body: Optional[bytes]) -> str:
+    digest = hashlib.sha1(body or b"").hexdigest()[:16]
+    return f"{method.upper()} {path} {ixcsoft} {digest}"
+
+
+class Cassette:
+    """Arquivo NDJSON gzip de interações; thread-safe. Em replay, respostas iguais saem na ordem gravada."""
+
+    def __init__(self, path: str, mode: str, fallback: bool = False) -> None:
+        self.path = Path(path)
+        self.mode = mode
+        self.fallback = fallback
+        self._lock = threading.Lock()
+        self._fh = None
+        self._exact: Dict[str, deque] = {}
+        self._by_endpoint: Dict[str, List[dict]] = {}
+        self.recorded = 0
+        self.misses = 0
+        self.fallbacks = 0
+        if mode == "record":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = gzip.open(self.path, "at", encoding="utf-8")
+            atexit.register(self.close)
+        else:
+            self._load()
 
-    for attempt in range(1, cfg["max_retries"] + 1):
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+    def _load(self) -> None:
         try:
-            resp = s.post(
-                url,
-                headers=headers,
-                data=json.dumps(payload, ensure_ascii=False),
-                timeout=cfg["timeout_seconds"],
-            )
-            last_status = resp.status_code
-            last_text = resp.text or ""
-            try:
-                last_data = resp.json()
-            except Exception:
-                last_data = None
+            with gzip.open(self.path, "rt", encoding="utf-8") as fh:
+                for line in fh:
+                    if line.strip():
+                        self._index(json.loads(line))
+        except EOFError:
+            pass  # gravação interrompida: aproveita o que chegou inteiro
+
+    def _index(self, e: dict) -> None:
+        self._exact.setdefault(e["key"], deque()).append(e)
+        self._by_endpoint.setdefault(f"{e['method']} {_endpoint_label(e['path'])}", []).append(e)
+        self.recorded += 1
+
+    def record(self, request: requests.PreparedRequest, resp: requests.Response, seconds: float) -> None:
+        path = requests.utils.urlparse(request.url).path
+        body = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+        e = {
+            "key": _cassette_key(request.method or "", path, request.headers.get("ixcsoft", ""), body),
+            "method": request.method,
+            "path": path,
+            "ixcsoft": request.headers.get("ixcsoft", ""),
+            "body": (body or b"").decode("utf-8", errors="replace")[:5000],
+            "status": resp.status_code,
+            "content_type": resp.headers.get("Content-Type", ""),
+            "response": resp.content.decode("utf-8", errors="replace"),
+            "seconds": round(seconds, 4),
+        }
+        with self._lock:
+            self._fh.write(json.dumps(e, ensure_ascii=False) + "\n")
+            self._fh.flush()
+            self.recorded += 1
+
+    def lookup(self, request: requests.PreparedRequest) -> Optional[dict]:
+        """Mesma chamada (método+path+body) na ordem gravada; senão None (ou, com ``fallback``, a última do mesmo endpoint)."""
+        path = requests.utils.urlparse(request.url).path
+        body = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+        key = _cassette_key(request.method or "", path, request.headers.get("ixcsoft", ""), body)
+        with self._lock:
+            q = self._exact.get(key)
+            if q:
+                return q.popleft() if len(q) > 1 else q[0]
+            self.misses += 1
+            same = self._by_endpoint.get(f"{request.method} {_endpoint_label(path)}") if self.fallback else None
+            if same:
+                self.fallbacks += 1
+                return same[-1]
+            return None
+
+
+class CassetteAdapter(HTTPAdapter):
+    """Transport do requests que grava (record) ou responde do cassete (replay)."""
+
+    def __init__(self, cassette: Cassette) -> None:
+        super().__init__()
+        self.cassette = cassette
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        if self.cassette.mode == "record":
+            t0 = time.perf_counter()
+            resp = super().send(request, **kwargs)
+            self.cassette.record(request, resp, time.perf_counter() - t0)
+            return resp
+
+        e = self.cassette.lookup(request)
+        if e is None:
+            raise requests.ConnectionError(f"cassete sem gravação para {request.method} {request.path_url}", request=request)
+        if self.cassette.mode == "replay_timed":
+            time.sleep(float(e.get("seconds") or 0))
+
+        resp = requests.Response()
+        resp.status_code = int(e["status"])
+        resp.headers = CaseInsensitiveDict({"Content-Type": e.get("content_type") or "application/json"})
+        resp._content = (e.get("response") or "").encode("utf-8")
+        resp._content_consumed = True  # iter_content/close servem do _content (listar em streaming)
+        resp.encoding = "utf-8"
+        resp.url = request.url
+        resp.request = request
+        resp.reason = "replay"
+        return resp
+
+
+@st.cache_resource(show_spinner=False)
+def get_cassette(path: str, mode: str, fallback: bool = False) -> Optional[Cassette]:
+    if not path or mode not in CASSETTE_MODES:
+        return None
+    return Cassette(path, mode, fallback)
 
-            if 200 <= resp.status_code < 300:
-                return IXCResponse(ok=True, http_status=resp.status_code, data=last_data, text=last_text)
 
-            if resp.status_code in (429, 500, 502, 503, 504):
-                time.sleep(cfg["retry_backoff_seconds"] * attempt)
-                continue
+def new_session() -> requests.Session:
+    """Sessão HTTP do app; com IXC_CASSETTE/IXC_CASSETTE_MODE ligados, passa pelo cassete."""
+    s = requests.Session()
+    cassette = get_cassette(ENV_IXC_CASSETTE, ENV_IXC_CASSETTE_MODE, ENV_IXC_CASSETTE_FALLBACK)
+    if cassette is not None:
+        adapter = CassetteAdapter(cassette)
+        s.mount("http://", adapter)
+        s.mount("https://", adapter)
+    return s
 
-            return IXCResponse(ok=False, http_status=resp.status_code, data=last_data, text=last_text)
 
-        except requests.RequestException as e:
-            last_text = str(e)
-            last_status = None
-            last_data = None
-            time.sleep(cfg["retry_backoff_seconds"] * attempt)
+class RateLimiter:
+    """Intervalo mínimo entre requests para um host (vale para todas as threads e sessões)."""
+
+    def __init__(self, per_second: float) -> None:
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> float:
+        """Reserva o próximo horário livre e dorme até ele. Retorna os segundos esperados."""
+        if not self.interval:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next)
+            self._next = at + self.interval
+        delay = at - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+@st.cache_resource(show_spinner=False)
+def get_rate_limiter(base_url: str, per_second: float) -> RateLimiter:
+    return RateLimiter(per_second)
+
+
+RP_AUTO_MIN = 100
+RP_AUTO_MAX = 5000
+RP_AUTO_MAX_PAGE_BYTES = 16_000_000
 
-    return IXCResponse(ok=False, http_status=last_status, data=last_data, text=last_text)
 
+class RpTuner:
+    """
+    rp automático do listar: mede cada página (tempo e bytes) e dobra/divide o rp rumo ao tempo-alvo.
+    Só muda o rp quando o deslocamento já lido é múltiplo do novo valor (page * rp continua exato).
+    Guarda o último rp escolhido por host para a próxima listagem começar dele.
+    """
 
-def put_to_endpoint(cfg: Dict[str, Any], endpoint_path: str, payload: Dict[str, str], session: Optional[requests.Session] = None) -> IXCResponse:
+    def __init__(self, target_seconds: float) -> None:
+        self.target = float(target_seconds)
+        self._best: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def start(self, base_url: str, rp: int) -> int:
+        with self._lock:
+            return self._best.get(base_url, rp)
+
+    def next_rp(self, base_url: str, rp: int, offset: int, seconds: float, nbytes: int) -> Tuple[int, str]:
+        """(rp da próxima página, motivo) depois de uma página cheia lida em ``seconds``."""
+        new, why = rp, "ok"
+        if seconds > self.target * 1.5 and rp % 2 == 0 and rp // 2 >= RP_AUTO_MIN:
+            new, why = rp // 2, "lenta"
+        elif seconds < self.target / 2 and rp * 2 <= RP_AUTO_MAX and nbytes * 2 <= RP_AUTO_MAX_PAGE_BYTES:
+            new, why = (rp * 2, "rápida") if offset % (rp * 2) == 0 else (rp, "rápida (aguarda alinhar)")
+        with self._lock:
+            self._best[base_url] = new
+        return new, why
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._best)
+
+
+@st.cache_resource(show_spinner=False)
+def get_rp_tuner(target_seconds: float) -> RpTuner:
+    return RpTuner(target_seconds)
+
+
+def _backoff_sleep(cfg: Dict[str, Any], attempt: int, attempts: int) -> float:
+    """Dorme o backoff linear entre tentativas (não dorme depois da última). Retorna os segundos dormidos."""
+    if attempt >= attempts:
+        return 0.0
+    secs = float(cfg["retry_backoff_seconds"]) * attempt
+    time.sleep(secs)
+    return secs
+
+
+def _request_with_retry(
+    cfg: Dict[str, Any],
+    s: requests.Session,
+    method: str,
+    endpoint_path: str,
+    headers: Dict[str, str],
+    payload: Optional[Dict[str, Any]] = None,
+    *,
+    op: str,
+    stream_to: Optional[Callable[[requests.Response], Tuple[Any, int]]] = None,
+) -> IXCResponse:
+    """
+    Executa a chamada com retry/backoff (429/5xx e erros de rede) e registra a amostra nas métricas.
+    Com ``stream_to``, um 2xx tem o corpo entregue a ``stream_to(resp)`` (que devolve (data, bytes lidos)) em vez de
+    virar ``text``/``json()``; queda de conexão no meio também entra no retry. JSON inválido não é repetido.
+    """
     url = f"{cfg['base_url']}{endpoint_path}"
-    headers = build_headers(cfg)
-    s = session or requests.Session()
+    body = json.dumps(payload, ensure_ascii=False) if payload is not None else None
+    attempts = int(cfg["max_retries"])
+    limiter = get_rate_limiter(cfg["base_url"], float(cfg["rate_limit"])) if cfg.get("rate_limit") else None
 
     last_text = ""
     last_data: Optional[dict] = None
     last_status: Optional[int] = None
-
-    for attempt in range(1, cfg["max_retries"] + 1):
+    ok = False
+    n = 0
+    backoff = 0.0
+    throttle = 0.0
+    received = 0
+    started_wall = time.time()
+    started = time.perf_counter()
+
+    for attempt in range(1, attempts + 1):
+        n = attempt
+        if limiter is not None:
+            throttle += limiter.wait()  # espera imposta pelo próprio cliente, separada do backoff
         try:
-            resp = s.put(
-                url,
-                headers=headers,
-                data=json.dumps(payload, ensure_ascii=False),
-                timeout=cfg["timeout_seconds"],
-            )
-            last_text = (resp.text or "")[:5000]
+            resp = s.request(method, url, headers=headers, data=body, timeout=cfg["timeout_seconds"], stream=stream_to is not None)
             last_status = resp.status_code
+            if stream_to is not None and 200 <= resp.status_code < 300:
+                try:
+                    last_data, nbytes = stream_to(resp)
+                except ValueError as e:
+                    last_data, last_text = None, f"JSON inválido na resposta: {e}"
+                    break
+                finally:
+                    resp.close()
+                received += nbytes
+                last_text = ""
+                ok = True
+                break
+            last_text = resp.text or ""
+            received += len(resp.content or b"")
             try:
                 last_data = resp.json()
             except Exception:
                 last_data = None
 
             if 200 <= resp.status_code < 300:
-                return IXCResponse(ok=True, http_status=resp.status_code, data=last_data, text=last_text)
+                ok = True
+                break
 
-            if resp.status_code in (429, 500, 502, 503, 504):
-                time.sleep(cfg["retry_backoff_seconds"] * attempt)
+            if resp.status_code in RETRY_STATUSES:
+                backoff += _backoff_sleep(cfg, attempt, attempts)
                 continue
 
-            return IXCResponse(ok=False, http_status=resp.status_code, data=last_data, text=last_text)
+            break
 
         except requests.RequestException as e:
             last_text = str(e)
             last_status = None
-            time.sleep(cfg["retry_backoff_seconds"] * attempt)
+            last_data = None
+            backoff += _backoff_sleep(cfg, attempt, attempts)
+
+    get_request_metrics().record(RequestSample(
+        host=_host_label(cfg["base_url"]),
+        op=op,
+        endpoint=_endpoint_label(endpoint_path),
+        http_status=last_status,
+        ok=ok,
+        started=started_wall,
+        seconds=time.perf_counter() - started,
+        backoff_seconds=backoff,
+        throttle_seconds=throttle,
+        attempts=n,
+        bytes_sent=len(body.encode("utf-8")) * n if body else 0,
+        bytes_received=received,
+    ))
+    return IXCResponse(ok=ok, http_status=last_status, data=last_data, text=last_text)
 
-    return IXCResponse(ok=False, http_status=last_status, data=last_data, text=last_text)
+
+def test_auth(cfg: Dict[str, Any], session: Optional[requests.Session] = None) -> Dict[str, Any]:
+    """Faz um HEAD no endpoint do IXC (sem body) para validar se o Authorization está ok."""
+    url = f"{cfg['base_url']}{ENDPOINT_ASSUNTO}"
+    headers = build_headers(cfg)
+    s = session or new_session()
+    started_wall = time.time()
+    started = time.perf_counter()
+    status: Optional[int] = None
+    try:
+        resp = s.request("HEAD", url, headers=headers, timeout=cfg["timeout_seconds"])
+        status = resp.status_code
+        return {
+            "ok": resp.status_code != 401,
+            "status_code": resp.status_code,
+            "response_headers": dict(resp.headers),
+            "response_text": (resp.text or "")[:500],
+        }
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+    finally:
+        get_request_metrics().record(RequestSample(
+            host=_host_label(cfg["base_url"]),
+            op="head",
+            endpoint=ENDPOINT_ASSUNTO,
+            http_status=status,
+            ok=status is not None and status != 401,
+            started=started_wall,
+            seconds=time.perf_counter() - started,
+            backoff_seconds=0.0,
+            attempts=1,
+            bytes_sent=0,
+            bytes_received=0,
+        ))
+
+
+def post_to_endpoint(cfg: Dict[str, Any], endpoint_path: str, payload: Dict[str, str], session: Optional[requests.Session] = None) -> IXCResponse:
+    s = session or new_session()
+    resp = _request_with_retry(cfg, s, "POST", endpoint_path, build_headers(cfg), payload, op="post")
+    if _write_succeeded(resp):
+        get_listing_cache().invalidate(cfg["base_url"], endpoint_path)
+    return resp
+
+
+def put_to_endpoint(
+    cfg: Dict[str, Any],
+    endpoint_path: str,
+    payload: Dict[str, str],
+    session: Optional[requests.Session] = None,
+    *,
+    patch_cache: bool = True,
+) -> IXCResponse:
+    """PUT de um registro; ``patch_cache=False`` quando quem chama aplica o lote no cache de uma vez (patch_many)."""
+    s = session or new_session()
+    resp = _request_with_retry(cfg, s, "PUT", endpoint_path, build_headers(cfg), payload, op="put")
+    resp.text = resp.text[:5000]
+    if patch_cache and _write_succeeded(resp):
+        base_path, _, rid = endpoint_path.rstrip("/").rpartition("/")
+        get_listing_cache().patch(cfg["base_url"], base_path, rid, payload)
+    return resp
 
 
 def parse_ixc_list_response(data: Any) -> Optional[List[dict]]:
@@ -642,105 +1445,400 @@ def parse_ixc_list_response(data: Any) -> Optional[List[dict]]:
     return None
 
 
+def _with_id(rr: dict) -> dict:
+    """Garante a chave ``id`` (algumas versões só mandam ``tabela.id``); altera e devolve ``rr``."""
+    if "id" not in rr:
+        for k in list(rr.keys()):
+            if str(k).endswith(".id"):
+                rr["id"] = rr.get(k)
+                break
+    return rr
+
+
 def ensure_id(records: List[dict]) -> List[dict]:
-    out: List[dict] = []
-    for r in records:
-        rr = dict(r or {})
-        if "id" not in rr:
-            for k in list(rr.keys()):
-                if str(k).endswith(".id"):
-                    rr["id"] = rr.get(k)
-                    break
-        out.append(rr)
-    return out
+    return [_with_id(dict(r or {})) for r in records]
+
+
+# ----------------------------
+# Listar em streaming: o corpo é decodificado aos pedaços, registro a registro
+# ----------------------------
+
+LIST_KEYS = ("registros", "rows", "data")
+STREAM_CHUNK_BYTES = 64 * 1024
+_JSON_WS = re.compile(r"[ \t\n\r]*")
 
 
-def listar_assuntos_todos(cfg: Dict[str, Any], rp: int = 1000, max_pages: int = 50, max_total: int = 0, session: Optional[requests.Session] = None) -> Tuple[List[dict], List[dict]]:
+class _JsonStream:
+    """Leitor incremental de JSON sobre pedaços de bytes (``raw_decode`` no que já chegou, pede mais se faltar)."""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._dec = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.nbytes = 0
+
+    def _more(self) -> bool:
+        if self.eof:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self.eof = True
+            self.buf = self.buf[self.pos:] + self._utf8.decode(b"", final=True)
+        else:
+            self.nbytes += len(chunk)
+            self.buf = self.buf[self.pos:] + self._utf8.decode(chunk)
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self.pos = _JSON_WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._more():
+                raise ValueError("JSON truncado")
+
+    def char(self, expected: str) -> str:
+        c = self.peek()
+        if c not in expected:
+            raise ValueError(f"JSON inesperado: {c!r} (esperado {expected!r})")
+        self.pos += 1
+        return c
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                obj, end = self._dec.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._more():
+                    continue
+                raise
+            if end >= len(self.buf) and not self.eof and self._more():
+                continue  # número no fim do pedaço pode continuar no próximo
+            self.pos = end
+            return obj
+
+
+def stream_list_response(chunks: Iterable[bytes], on_record) -> Tuple[Dict[str, Any], int]:
+    """
+    Decodifica a resposta do listar sem montar a página inteira: cada item de ``registros`` / ``rows[].cell`` /
+    ``data`` vai para ``on_record(dict)`` assim que chega. Retorna (demais chaves do topo, bytes lidos);
+    a lista aparece nos metadados como ``"<n itens>"``, igual ao debug das páginas. JSON inválido -> ValueError.
+    """
+    js = _JsonStream(chunks)
+    meta: Dict[str, Any] = {}
+    js.char("{")
+    if js.peek() == "}":
+        return meta, js.nbytes
+    while True:
+        key = js.value()
+        js.char(":")
+        if key in LIST_KEYS and js.peek() == "[":
+            js.char("[")
+            n = 0
+            if js.peek() == "]":
+                js.char("]")
+            else:
+                while True:
+                    item = js.value()
+                    if isinstance(item, dict):
+                        if key == "rows" and isinstance(item.get("cell"), dict):
+                            item = item["cell"]
+                        on_record(_with_id(item))
+                        n += 1
+                    if js.char(",]") == "]":
+                        break
+            meta[key] = f"<{n} itens>"
+        else:
+            meta[key] = js.value()
+        if js.char(",}") == "}":
+            return meta, js.nbytes
+
+
+class ColumnAccumulator:
+    """
+    Registros da listagem direto em colunas. Só a página em curso fica em listas Python; ``commit`` converte a
+    página para Arrow (strings normalizadas, como ``records_to_arrow``) e ``discard`` a descarta (retry/falha).
+    """
+
+    def __init__(self) -> None:
+        self._chunks: List[pa.Table] = []
+        self._cols: Dict[str, List[Any]] = {}
+        self._pending = 0
+        self._ready: Optional[Tuple[pa.Table, Any]] = None
+        self.rows = 0
+        self.last_id: Any = None  # id do último registro confirmado (keyset)
+        self.last_chunk: Optional[pa.Table] = None
+
+    def append(self, rec: Dict[str, Any]) -> None:
+        n = self._pending
+        cols = self._cols
+        for k, v in rec.items():
+            col = cols.get(k)
+            if col is None:
+                col = cols[k] = [None] * n
+            col.append(v)
+        self._pending = n + 1
+        if len(rec) != len(cols):
+            for col in cols.values():
+                if len(col) == n:
+                    col.append(None)
+
+    def adopt(self, chunk: pa.Table, last_id: Any) -> None:
+        """Página já normalizada (cache por conteúdo): entra no lugar dos registros no próximo ``commit``."""
+        self.discard()
+        self._ready = (chunk, last_id)
+
+    @property
+    def pending(self) -> int:
+        return self._ready[0].num_rows if self._ready is not None else self._pending
+
+    def commit(self) -> int:
+        if self._ready is not None:
+            chunk, last_id = self._ready
+        elif self._pending:
+            ids = self._cols.get("id")
+            last_id = ids[-1] if ids else self.last_id
+            names = [str(k) for k in self._cols]
+            arrays = [normalize_arrow_column(v) for v in self._cols.values()]
+            chunk = pa.Table.from_arrays(arrays, names=names)
+        else:
+            chunk = None
+        n = chunk.num_rows if chunk is not None else 0
+        if n:
+            self._chunks.append(chunk)
+            self.rows += n
+            self.last_id = last_id
+        self.last_chunk = chunk if n else None
+        self.discard()
+        return n
+
+    def discard(self) -> None:
+        self._cols = {}
+        self._pending = 0
+        self._ready = None
+
+    def to_table(self, limit: int = 0) -> pa.Table:
+        if not self._chunks:
+            return pa.table({})
+        table = pa.concat_tables(self._chunks, promote_options="default") if len(self._chunks) > 1 else self._chunks[0]
+        if table.num_rows and any(c.null_count for c in table.columns):
+            # coluna que só aparece em algumas páginas: vazio, como registro sem a chave em records_to_arrow
+            table = pa.Table.from_arrays([pc.fill_null(c, "") for c in table.columns], names=table.column_names)
+        return table.slice(0, limit) if limit else table
+
+
+class PageCache:
+    """
+    Páginas do listar já normalizadas (tabela Arrow), pela hash do corpo da resposta: página byte a byte igual à
+    da última busca não é decodificada nem normalizada de novo. Conteúdo endereçado pela hash não fica velho;
+    o limite é só de memória (``max_bytes``, descarta as menos usadas).
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = int(max_bytes)
+        self._entries: "OrderedDict[bytes, Tuple[Dict[str, Any], pa.Table, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(body: bytes) -> bytes:
+        return hashlib.blake2b(body, digest_size=16).digest()
+
+    def get(self, digest: bytes) -> Optional[Tuple[Dict[str, Any], pa.Table, Any]]:
+        with self._lock:
+            hit = self._entries.get(digest)
+            if hit is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return hit
+
+    def put(self, digest: bytes, meta: Dict[str, Any], chunk: pa.Table, last_id: Any) -> None:
+        if chunk.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(digest, None)
+            if old is not None:
+                self._bytes -= old[1].nbytes
+            self._entries[digest] = (meta, chunk, last_id)
+            self._bytes += chunk.nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, dropped, _) = self._entries.popitem(last=False)
+                self._bytes -= dropped.nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"pages": len(self._entries), "mb": round(self._bytes / 1e6, 1), "hits": self.hits, "misses": self.misses}
+
+
+@st.cache_resource(show_spinner=False)
+def get_page_cache() -> Optional[PageCache]:
+    return PageCache(int(ENV_IXC_PAGE_CACHE_MB * 1e6)) if ENV_IXC_PAGE_CACHE_MB > 0 else None
+
+
+def _slices(body: bytes, size: int = STREAM_CHUNK_BYTES) -> Iterator[bytes]:
+    view = memoryview(body)
+    for i in range(0, len(body), size):
+        yield bytes(view[i:i + size])
+
+
+def listar_assuntos_todos(cfg: Dict[str, Any], rp: int = 1000, max_pages: int = 50, max_total: int = 0, session: Optional[requests.Session] = None, *, auto_rp: bool = False, keyset: bool = False) -> Tuple[List[dict], List[dict]]:
     """
     Lista assuntos com GET + header ixcsoft:listar e JSON no body (como no cURL).
-    - rp: registros por página (>=1)
+    - rp: registros por página (>=1); com auto_rp, só o valor inicial (ver RpTuner)
+    - keyset: pagina por ``id > último id`` em vez de ``page=N`` (ver listar_todos)
     - max_pages: limite de páginas para segurança
     - max_total: limite total de registros (0 = todos)
     Retorna (records, debug_pages).
     """
-    url = f"{cfg['base_url']}{ENDPOINT_ASSUNTO}"
+    return listar_todos(cfg, ENDPOINT_ASSUNTO, rp=rp, max_pages=max_pages, max_total=max_total, session=session, auto_rp=auto_rp, keyset=keyset)
+
+
+def listar_todos(cfg: Dict[str, Any], endpoint_path: str, rp: int = 1000, max_pages: int = 50, max_total: int = 0, session: Optional[requests.Session] = None, *, auto_rp: bool = False, keyset: bool = False, start_after: int = 0, sink: Optional[ColumnAccumulator] = None) -> Tuple[List[dict], List[dict]]:
+    """
+    Listar paginado de qualquer tabela do webservice (ordenado por id). Retorna (records, debug_pages).
+    Com ``auto_rp`` o rp muda entre páginas (RpTuner) e o limite de segurança passa a ser de registros:
+    max_pages * rp inicial. Cada página do debug traz o rp usado, os bytes e, no automático, o rp seguinte.
+    Com ``sink`` as páginas são decodificadas em streaming direto nele e ``records`` volta vazio (``listar_colunar``).
+    Com ``keyset`` cada página pede ``id > último id lido`` (página 1): custo constante mesmo no fim de tabelas
+    grandes, sem pular/repetir linhas se entrarem registros durante a listagem, e o rp muda livremente. Página
+    que falha deixa ``resume_after`` no debug; ``start_after`` retoma dali (implica keyset).
+    """
+    table = endpoint_path.rstrip("/").rsplit("/", 1)[-1]
     headers = build_headers(cfg)
     headers = dict(headers)
     headers["ixcsoft"] = "listar"
 
-    s = session or requests.Session()
+    s = session or new_session()
     _own_session = session is None
 
     rp = max(1, int(rp))
     max_pages = max(1, int(max_pages))
     max_total = max(0, int(max_total))
+    tuner = get_rp_tuner(ENV_IXC_RP_TARGET_SECONDS) if auto_rp else None
+    max_records = max_pages * rp
+    if tuner is not None:
+        rp = tuner.start(cfg["base_url"], rp)
+
+    keyset = keyset or start_after > 0
+    last_id = max(0, int(start_after))
 
     all_records: List[dict] = []
     debug_pages: List[dict] = []
+    consume = None
+    page_cache = get_page_cache() if sink is not None else None
+    streamed: Dict[str, Any] = {"bytes": 0, "digest": None, "meta": None, "hit": False}
+    if sink is not None:
+        def consume(r: requests.Response) -> Tuple[Any, int]:
+            sink.discard()  # retry depois de queda no meio da página: recomeça a página
+            streamed.update(digest=None, hit=False)
+            if page_cache is None:
+                meta, streamed["bytes"] = stream_list_response(r.iter_content(STREAM_CHUNK_BYTES), sink.append)
+                return meta, streamed["bytes"]
+            # com cache por conteúdo o corpo (bytes, ~1x o tamanho da página) é lido antes para ter a hash
+            body = r.content
+            digest = PageCache.digest(body)
+            hit = page_cache.get(digest)
+            if hit is not None:
+                meta, chunk, last_id = hit
+                sink.adopt(chunk, last_id)
+            else:
+                meta, _ = stream_list_response(_slices(body), sink.append)
+            streamed.update(bytes=len(body), digest=digest, meta=meta, hit=hit is not None)
+            return meta, len(body)
 
-    for page in range(1, max_pages + 1):
+    for n_page in range(1, max_pages * (RP_AUTO_MAX // RP_AUTO_MIN if tuner else 1) + 1):
+        offset = len(all_records) if sink is None else sink.rows
+        if tuner is not None and offset >= max_records:
+            break
+        if keyset:
+            query, oper, page = str(last_id), ">", 1
+        else:
+            query, oper, page = "1", ">=", offset // rp + 1  # sempre exato: o rp só muda com offset múltiplo dele
         payload = {
-            "qtype": "su_oss_assunto.id",
-            "query": "1",
-            "oper": ">=",
+            "qtype": f"{table}.id",
+            "query": query,
+            "oper": oper,
             "page": str(page),
             "rp": str(rp),
-            "sortname": "su_oss_assunto.id",
+            "sortname": f"{table}.id",
             "sortorder": "asc",
         }
 
-        last_text = ""
-        last_data: Optional[dict] = None
-        last_status: Optional[int] = None
-        ok = False
-
-        for attempt in range(1, cfg["max_retries"] + 1):
-            try:
-                resp = s.request(
-                    "GET",
-                    url,
-                    headers=headers,
-                    data=json.dumps(payload, ensure_ascii=False),
-                    timeout=cfg["timeout_seconds"],
-                )
-                last_text = (resp.text or "")[:5000]
-                last_status = resp.status_code
-                try:
-                    last_data = resp.json()
-                except Exception:
-                    last_data = None
-
-                if 200 <= resp.status_code < 300:
-                    ok = True
-                    break
+        t0 = time.perf_counter()
+        resp = _request_with_retry(cfg, s, "GET", endpoint_path, headers, payload, op="listar", stream_to=consume)
+        page_seconds = time.perf_counter() - t0
+        ok = resp.ok
+        last_status = resp.http_status
+        last_data = resp.data
+        last_text = resp.text[:5000]
+
+        debug_json = last_data
+        if ok and isinstance(last_data, dict):
+            # páginas OK: guarda só os metadados (os registros já vão para o store)
+            debug_json = {k: (f"<{len(v)} itens>" if isinstance(v, list) else v) for k, v in last_data.items()}
+        debug = {
+            "page": n_page,
+            "rp": rp,
+            "http_status": last_status,
+            "seconds": round(page_seconds, 3),
+            "bytes": len(resp.text.encode("utf-8")) if sink is None else streamed["bytes"],
+            "json": debug_json,
+            "text": last_text[:2000],
+        }
+        if keyset:
+            debug["after"] = last_id
+        if ok and streamed["digest"] is not None:
+            debug["page_cache"] = "hit" if streamed["hit"] else "miss"
+        debug_pages.append(debug)
 
-                if resp.status_code in (429, 500, 502, 503, 504):
-                    time.sleep(cfg["retry_backoff_seconds"] * attempt)
-                    continue
+        if not ok:
+            if sink is not None:
+                sink.discard()
+            if keyset:
+                debug["resume_after"] = last_id
+            break
 
+        if sink is None:
+            records = parse_ixc_list_response(last_data or {})
+            if not records:
                 break
-            except requests.RequestException as e:
-                last_text = str(e)
-                last_status = None
-                time.sleep(cfg["retry_backoff_seconds"] * attempt)
-
-        debug_pages.append({"page": page, "http_status": last_status, "json": last_data, "text": last_text[:2000]})
+            all_records.extend(records)
+            got, total = len(records), len(all_records)
+        else:
+            got = sink.commit()
+            total = sink.rows
+            if not got:
+                break
+            if page_cache is not None and not streamed["hit"] and streamed["digest"] is not None:
+                page_cache.put(streamed["digest"], streamed["meta"], sink.last_chunk, sink.last_id)
 
-        if not ok:
+        if max_total and total >= max_total:
+            all_records = all_records[:max_total]  # no sink, o corte fica para to_table(limit)
             break
 
-        records = parse_ixc_list_response(last_data or {})
-        if not records:
+        if got < rp:
             break
 
-        all_records.extend(records)
-
-        if max_total and len(all_records) >= max_total:
-            all_records = all_records[:max_total]
-            break
+        if keyset:
+            page_last = sink.last_id if sink is not None else _with_id(dict(records[-1])).get("id")
+            if not str(page_last).isdigit() or int(page_last) <= last_id:
+                debug["keyset_stop"] = f"último id {page_last!r} não avança além de {last_id}"
+                break
+            last_id = int(page_last)
 
-        if len(records) < rp:
-            break
+        if tuner is not None:
+            # no keyset qualquer rp serve (offset 0); no page=N o rp precisa alinhar com o que já foi lido
+            rp, debug["rp_auto"] = tuner.next_rp(cfg["base_url"], rp, 0 if keyset else total, page_seconds, debug["bytes"])
+            debug["rp_next"] = rp
 
     if _own_session:
         s.close()
@@ -748,37 +1846,322 @@ def listar_assuntos_todos(cfg: Dict[str, Any], rp: int = 1000, max_pages: int =
     return ensure_id(all_records), debug_pages
 
 
-# ============================
-# Payload normalization/validation
-# ============================
+def listar_colunar(cfg: Dict[str, Any], endpoint_path: str, rp: int = 1000, max_pages: int = 50, max_total: int = 0, session: Optional[requests.Session] = None, *, auto_rp: bool = False, keyset: bool = False, start_after: int = 0) -> Tuple[pa.Table, List[dict]]:
+    """``listar_todos`` em streaming: (tabela Arrow de strings normalizadas, debug_pages), sem lista de dicts."""
+    sink = ColumnAccumulator()
+    _, debug_pages = listar_todos(
+        cfg, endpoint_path, rp=rp, max_pages=max_pages, max_total=max_total, session=session,
+        auto_rp=auto_rp, keyset=keyset, start_after=start_after, sink=sink,
+    )
+    return sink.to_table(limit=max(0, int(max_total))), debug_pages
 
-REQUIRED_ASSUNTO = [
-    "assunto",
-    "ativo",
-    "layout_impressao",
-    "numero_de_vias",
-    "exige_comodato_finalizar_os",
-    "exige_produto_finalizar_os",
-    "tipo_comissao",
-    "considerar_sla",
-    "metas_horas_abertura_ticket",
-]
 
-COND_ASSUNTO = [
-    ("exige_comodato_finalizar_os", "quantidade_equipamentos"),
-    ("exige_produto_finalizar_os", "quantidade_produtos"),
-]
+def id_ranges(ids: Iterable[str], span: int) -> List[Tuple[int, int]]:
+    """Agrupa ids numéricos em faixas [início, fim] de no máximo ``span`` ids (cada faixa = um listar)."""
+    nums = sorted({int(r) for r in ids if str(r).isdigit()})
+    ranges: List[Tuple[int, int]] = []
+    for n in nums:
+        if ranges and n - ranges[-1][0] < span:
+            ranges[-1] = (ranges[-1][0], n)
+        else:
+            ranges.append((n, n))
+    return ranges
 
-REQUIRED_DIAGNOSTICO = ["descricao", "ativo"]
 
+def listar_por_ids(
+    cfg: Dict[str, Any],
+    endpoint_path: str,
+    ids: Iterable[str],
+    *,
+    span: int = 1000,
+    session: Optional[requests.Session] = None,
+) -> Tuple[Dict[str, dict], Dict[str, str], int]:
+    """
+    Busca só os registros de ``ids``: um listar (id >= início, rp = tamanho da faixa) por faixa de ``id_ranges``.
+    Retorna (registros por id, {id: erro} dos que não puderam ser conferidos, nº de requisições).
+    Ids ausentes da resposta não entram em nenhum dos dois (não existem mais no IXC).
+    """
+    table = endpoint_path.rstrip("/").rsplit("/", 1)[-1]
+    headers = dict(build_headers(cfg))
+    headers["ixcsoft"] = "listar"
+    wanted = {str(r) for r in ids}
+    s = session or new_session()
+    found: Dict[str, dict] = {}
+    failed: Dict[str, str] = {r: "id não numérico" for r in wanted if not r.isdigit()}
+    ranges = id_ranges(wanted, span)
+    for lo, hi in ranges:
+        payload = {
+            "qtype": f"{table}.id",
+            "query": str(lo),
+            "oper": ">=",
+            "page": "1",
+            "rp": str(hi - lo + 1),
+            "sortname": f"{table}.id",
+            "sortorder": "asc",
+        }
+        resp = _request_with_retry(cfg, s, "GET", endpoint_path, headers, payload, op="listar")
+        records = parse_ixc_list_response(resp.data or {}) if resp.ok else None
+        if records is None:
+            msg = f"listar falhou (HTTP {resp.http_status})"
+            failed.update({r: msg for r in wanted if r.isdigit() and lo <= int(r) <= hi})
+            continue
+        for rec in ensure_id(records):
+            rid = str(rec.get("id"))
+            if rid in wanted:
+                found[rid] = rec
+    if session is None:
+        s.close()
+    return found, failed, len(ranges)
 
-def _is_empty(v: Any) -> bool:
-    return v is None or (isinstance(v, str) and v.strip() == "")
 
+# ----------------------------
+# Cache de listagens compartilhado entre sessões
+# ----------------------------
 
-def normalize_value(v: Any) -> str:
-    if v is None:
-        return ""
+def _write_succeeded(resp: IXCResponse) -> bool:
+    """2xx sem ``type: error`` no corpo (o IXC responde 200 com erro de regra de negócio)."""
+    return resp.ok and not (isinstance(resp.data, dict) and resp.data.get("type") == "error")
+
+
+@dataclass
+class ListingEntry:
+    table: pa.Table  # imutável: sessões compartilham os mesmos buffers; patch gera uma tabela nova
+    debug_pages: List[dict]
+    stored_at: float
+    nbytes: int
+
+    @property
+    def age_seconds(self) -> float:
+        return time.monotonic() - self.stored_at
+
+
+def _patched_table(table: pa.Table, updates: Dict[str, Dict[str, str]]) -> Optional[pa.Table]:
+    """``table`` com os campos de cada payload trocados na linha ``id == rid`` de ``updates`` (rid -> payload).
+
+    Uma passada por coluna para o lote todo (``index_in`` + ``take``); None se nenhum id está na tabela.
+    """
+    if "id" not in table.column_names or not updates:
+        return None
+    rids = [str(r) for r in updates]
+    pos = pc.index_in(table.column("id"), value_set=pa.array(rids, pa.string()))
+    if pos.null_count == len(pos):
+        return None  # fora da faixa listada (max_total): nada a fazer
+    payloads = list(updates.values())
+    fields = {str(f) for p in payloads for f in p} - {"id"}
+    for f in fields:
+        if f not in table.column_names:
+            continue
+        new_vals = pa.array([str(p[f]).strip() if f in p else None for p in payloads], pa.string())
+        col = pc.coalesce(pc.take(new_vals, pos), table.column(f))  # nulo = linha fora do lote ou campo fora do payload
+        table = table.set_column(table.column_names.index(f), f, col)
+    return table
+
+
+class ListingCache:
+    """
+    Listagens completas por (host, credencial, endpoint, rp, páginas, limite), iguais para todas as sessões.
+    - expira em ``ttl`` segundos e descarta as menos usadas acima de ``max_bytes``
+    - uma listagem por chave de cada vez: quem chega durante a busca espera e reaproveita o resultado
+    - PUT com sucesso atualiza o registro nas entradas do host/endpoint; POST com sucesso as invalida
+    """
+
+    def __init__(self, ttl: float, max_bytes: int) -> None:
+        self.ttl = float(ttl)
+        self.max_bytes = int(max_bytes)
+        self._entries: "OrderedDict[tuple, ListingEntry]" = OrderedDict()
+        self._inflight: Dict[tuple, List[Any]] = {}  # chave -> [lock, quantos usam]; sai quando ninguém mais usa
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.patches = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_bytes > 0
+
+    @staticmethod
+    def key(cfg: Dict[str, Any], endpoint_path: str, rp: int, max_pages: int, max_total: int, auto_rp: bool = False, keyset: bool = False) -> tuple:
+        rp_key = f"auto:{int(rp)}" if auto_rp else int(rp)
+        return (
+            cfg["base_url"], credential_fingerprint(cfg), endpoint_path.rstrip("/"),
+            rp_key, int(max_pages), int(max_total), "keyset" if keyset else "page",
+        )
+
+    def get(self, key: tuple) -> Optional[ListingEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.age_seconds > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple, table: pa.Table, debug_pages: List[dict]) -> ListingEntry:
+        entry = ListingEntry(table, debug_pages, time.monotonic(), table.nbytes)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+        return entry
+
+    def _evict(self) -> None:
+        total = sum(e.nbytes for e in self._entries.values())
+        while total > self.max_bytes and self._entries:
+            _, old = self._entries.popitem(last=False)
+            total -= old.nbytes
+            self.evictions += 1
+
+    def fetch(self, key: tuple, loader, *, refresh: bool = False) -> Tuple[ListingEntry, bool]:
+        """(entrada, veio_do_cache). ``loader()`` devolve (tabela, debug_pages); falhas não entram no cache."""
+        if not self.enabled:
+            table, debug_pages = loader()
+            return ListingEntry(table, debug_pages, time.monotonic(), 0), False
+        with self._lock:
+            gate = self._inflight.setdefault(key, [threading.Lock(), 0])
+            gate[1] += 1
+        try:
+            with gate[0]:
+                if not refresh:
+                    entry = self.get(key)
+                    if entry is not None:
+                        return entry, True
+                with self._lock:
+                    self.misses += 1
+                table, debug_pages = loader()
+                complete = table.num_rows > 0 and bool(debug_pages) and debug_pages[-1].get("http_status") == 200
+                if not complete:
+                    return ListingEntry(table, debug_pages, time.monotonic(), 0), False
+                return self.put(key, table, debug_pages), False
+        finally:
+            with self._lock:
+                gate[1] -= 1
+                if gate[1] == 0:
+                    self._inflight.pop(key, None)
+
+    def _matching(self, base_url: str, endpoint_path: str) -> List[tuple]:
+        ep = endpoint_path.rstrip("/")
+        return [k for k in self._entries if k[0] == base_url and k[2] == ep]
+
+    def invalidate(self, base_url: str, endpoint_path: str) -> int:
+        """Remove as listagens do endpoint nesse host (todas as credenciais: a base é a mesma)."""
+        with self._lock:
+            keys = self._matching(base_url, endpoint_path)
+            for k in keys:
+                del self._entries[k]
+            self.invalidations += len(keys)
+        return len(keys)
+
+    def patch(self, base_url: str, endpoint_path: str, rid: str, payload: Dict[str, str]) -> int:
+        return self.patch_many(base_url, endpoint_path, {str(rid): payload})
+
+    def patch_many(self, base_url: str, endpoint_path: str, updates: Dict[str, Dict[str, str]]) -> int:
+        """Aplica PUTs bem-sucedidos (rid -> payload) nas listagens em cache (tabela nova; quem já leu continua com a antiga).
+
+        O Arrow roda fora do lock global; a tabela nova só entra se a entrada não mudou nesse meio-tempo
+        (senão refaz sobre a atual, para dois PUTs simultâneos não se perderem).
+        """
+        updates = {str(r): p for r, p in updates.items()}
+        with self._lock:
+            keys = self._matching(base_url, endpoint_path)
+        for k in keys:
+            while True:
+                with self._lock:
+                    entry = self._entries.get(k)
+                if entry is None:
+                    break  # invalidada/descartada enquanto isso
+                table = _patched_table(entry.table, updates)
+                if table is None:
+                    break
+                with self._lock:
+                    if self._entries.get(k) is entry:
+                        self._entries[k] = ListingEntry(table, entry.debug_pages, entry.stored_at, table.nbytes)
+                        self.patches += 1
+                        break
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "mb": round(sum(e.nbytes for e in self._entries.values()) / 1e6, 1),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "patches": self.patches,
+            }
+
+
+@st.cache_resource(show_spinner=False)
+def get_listing_cache() -> ListingCache:
+    return ListingCache(ENV_IXC_LISTING_CACHE_TTL_SECONDS, int(ENV_IXC_LISTING_CACHE_MB * 1e6))
+
+
+def listar_compartilhado(
+    cfg: Dict[str, Any],
+    endpoint_path: str,
+    rp: int = 1000,
+    max_pages: int = 50,
+    max_total: int = 0,
+    session: Optional[requests.Session] = None,
+    *,
+    refresh: bool = False,
+    auto_rp: bool = False,
+    keyset: bool = False,
+) -> Tuple[ListingEntry, bool]:
+    """``listar_colunar`` pelo cache compartilhado. Retorna (entrada, veio_do_cache)."""
+    cache = get_listing_cache()
+    key = cache.key(cfg, endpoint_path, rp, max_pages, max_total, auto_rp, keyset)
+    return cache.fetch(
+        key,
+        lambda: listar_colunar(
+            cfg, endpoint_path, rp=rp, max_pages=max_pages, max_total=max_total, session=session,
+            auto_rp=auto_rp, keyset=keyset,
+        ),
+        refresh=refresh,
+    )
+
+
+# ============================
+# Payload normalization/validation
+# ============================
+
+REQUIRED_ASSUNTO = [
+    "assunto",
+    "ativo",
+    "layout_impressao",
+    "numero_de_vias",
+    "exige_comodato_finalizar_os",
+    "exige_produto_finalizar_os",
+    "tipo_comissao",
+    "considerar_sla",
+    "metas_horas_abertura_ticket",
+]
+
+COND_ASSUNTO = [
+    ("exige_comodato_finalizar_os", "quantidade_equipamentos"),
+    ("exige_produto_finalizar_os", "quantidade_produtos"),
+]
+
+REQUIRED_DIAGNOSTICO = ["descricao", "ativo"]
+
+
+def _is_empty(v: Any) -> bool:
+    return v is None or (isinstance(v, str) and v.strip() == "")
+
+
+def normalize_value(v: Any) -> str:
+    if v is None:
+        return ""
     try:
         if pd.isna(v):
             return ""
@@ -801,85 +2184,1762 @@ def normalize_value(v: Any) -> str:
 
 
 
-def parse_bool_value(v: Any) -> bool:
-    """Converte valores variados (bool/str/int) para bool (checkbox do Streamlit)."""
-    if isinstance(v, bool):
-        return v
-    if v is None:
-        return False
-    try:
-        if isinstance(v, float) and pd.isna(v):
-            return False
-    except Exception:
-        pass
-    s = str(v).strip().lower()
-    if s in ("1", "true", "t", "yes", "y", "s", "sim", "on"):
-        return True
-    return False
+def parse_bool_value(v: Any) -> bool:
+    """Converte valores variados (bool/str/int) para bool (checkbox do Streamlit)."""
+    if isinstance(v, bool):
+        return v
+    if v is None:
+        return False
+    try:
+        if isinstance(v, float) and pd.isna(v):
+            return False
+    except Exception:
+        pass
+    s = str(v).strip().lower()
+    if s in ("1", "true", "t", "yes", "y", "s", "sim", "on"):
+        return True
+    return False
+
+
+def row_to_payload(row: pd.Series) -> Dict[str, str]:
+    return {str(k).strip(): normalize_value(v) for k, v in row.items()}
+
+
+def validate_required(payload: Dict[str, str], required: List[str]) -> List[str]:
+    errors: List[str] = []
+    for f in required:
+        if f not in payload or _is_empty(payload.get(f)):
+            errors.append(f"Campo obrigatório ausente/vazio: {f}")
+    return errors
+
+
+def validate_assunto(payload: Dict[str, str]) -> List[str]:
+    errors = validate_required(payload, REQUIRED_ASSUNTO)
+    for flag_field, qty_field in COND_ASSUNTO:
+        flag_val = (payload.get(flag_field) or "").strip().upper()
+        if flag_val == "S":
+            qty_val = (payload.get(qty_field) or "").strip()
+            if qty_val in ("", "0", "0.0"):
+                errors.append(f"Campo '{qty_field}' é obrigatório quando '{flag_field}' = 'S'")
+    return errors
+
+
+def validate_diagnostico(payload: Dict[str, str]) -> List[str]:
+    return validate_required(payload, REQUIRED_DIAGNOSTICO)
+
+
+def fold_text(v: Any) -> str:
+    """'  Diagnósticos ' -> 'diagnosticos' (compara nomes sem acento, caixa e espaços nas pontas)."""
+    plain = unicodedata.normalize("NFKD", str(v)).encode("ascii", "ignore").decode("ascii")
+    return " ".join(plain.split()).lower()
+
+
+# ============================
+# Tabelas de referência (nome -> id) no import
+# ============================
+
+@dataclass(frozen=True)
+class LookupSpec:
+    """Campo do payload que referencia outra tabela do IXC (declarado em IXC_LOOKUPS)."""
+    field: str
+    table: str
+    label_field: str = "descricao"
+
+
+LOOKUP_EMPTY_VALUES = ("", "0")  # 0 = "nenhum" nos campos de id do IXC
+LOOKUP_RP = 1000
+LOOKUP_MAX_PAGES = 200  # tabelas de referência maiores que isso ficam sem conferência
+
+
+def lookup_specs(endpoint_path: str, overrides: str = ENV_IXC_LOOKUPS) -> List[LookupSpec]:
+    """Specs do endpoint em IXC_LOOKUPS (``su_oss_assunto.campo=tabela:coluna_nome``, separados por ``;``).
+
+    Não há lista embutida: nomes de tabela/coluna variam entre versões do IXC e um palpite errado recusaria
+    localmente valores que o servidor aceita.
+    """
+    table = endpoint_path.rstrip("/").rsplit("/", 1)[-1]
+    specs: Dict[str, LookupSpec] = {}
+    for item in overrides.replace("\n", ";").split(";"):
+        key, _, target = item.strip().partition("=")
+        owner, _, field_name = key.strip().partition(".")
+        if owner != table or not field_name or not target:
+            continue
+        ref, _, label = target.strip().partition(":")
+        specs[field_name] = LookupSpec(field_name, ref.strip(), label.strip() or "descricao")
+    return list(specs.values())
+
+
+@st.cache_data(ttl=ENV_IXC_LOOKUP_TTL_SECONDS, show_spinner=False, max_entries=256)
+def fetch_lookup_table(base_url: str, fingerprint: str, table: str, label_field: str, _cfg: Dict[str, Any]) -> Dict[str, str]:
+    """id -> nome de uma tabela do IXC (listar por id até o fim), em cache por host/credencial por IXC_LOOKUP_TTL_SECONDS.
+
+    Tabela incompleta não entra no cache: passar do limite ou parar no meio levanta erro e o campo fica sem
+    conferência (em vez de recusar ids válidos que ficaram fora do mapa).
+    """
+    records, debug_pages = listar_todos(
+        _cfg, f"/webservice/v1/{table}", rp=LOOKUP_RP, max_pages=LOOKUP_MAX_PAGES, keyset=True
+    )
+    last = debug_pages[-1] if debug_pages else {}
+    data = last.get("json")
+    if last.get("http_status") != 200 or (isinstance(data, dict) and data.get("type") == "error"):
+        raise RuntimeError(f"listar {table} falhou (HTTP {last.get('http_status')}): {str(data or last.get('text'))[:200]}")
+    if last.get("keyset_stop"):
+        raise RuntimeError(f"listar {table} parou no meio: {last['keyset_stop']}")
+    if len(records) >= LOOKUP_RP * LOOKUP_MAX_PAGES:
+        raise RuntimeError(f"{table} tem mais de {LOOKUP_RP * LOOKUP_MAX_PAGES} registros; conferência desligada")
+    return {str(r.get("id")): normalize_value(r.get(label_field)) for r in records if r.get("id") is not None}
+
+
+class LookupTable:
+    """Resolve o valor de uma célula: id existente, nome (sem acento/caixa) -> id, ou erro."""
+
+    def __init__(self, spec: LookupSpec, labels: Dict[str, str]) -> None:
+        self.spec = spec
+        self.labels = labels
+        self.by_name: Dict[str, List[str]] = {}
+        for rid, name in labels.items():
+            if name:
+                self.by_name.setdefault(fold_text(name), []).append(rid)
+
+    def resolve(self, value: str) -> Tuple[str, Optional[str]]:
+        """(valor para o payload, erro ou None)."""
+        if value in LOOKUP_EMPTY_VALUES or value in self.labels:
+            return value, None
+        ids = self.by_name.get(fold_text(value), [])
+        if len(ids) == 1:
+            return ids[0], None
+        where = self.spec.table
+        if len(ids) > 1:
+            return value, f"{self.spec.field}: '{value}' é ambíguo em {where} (ids {', '.join(ids[:5])})"
+        if value.lstrip("-").isdigit():
+            return value, f"{self.spec.field}: id {value} não existe em {where}"
+        return value, f"{self.spec.field}: '{value}' não encontrado em {where}"
+
+
+@dataclass
+class LookupStage:
+    summary: List[Dict[str, Any]]
+    failed: List[str]  # tabelas que não deu para buscar (campo fica sem checagem)
+
+    @property
+    def invalid_rows(self) -> int:
+        return sum(s["linhas_invalidas"] for s in self.summary)
+
+    @property
+    def has_invalid(self) -> bool:
+        return self.invalid_rows > 0
+
+    def summary_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.summary)
+
+
+def load_lookup_tables(cfg: Dict[str, Any], specs: List[LookupSpec]) -> Tuple[Dict[str, LookupTable], List[str]]:
+    """Uma busca por tabela referenciada (várias specs podem apontar para a mesma tabela)."""
+    tables: Dict[str, LookupTable] = {}
+    failed: List[str] = []
+    fp = credential_fingerprint(cfg)
+    for spec in specs:
+        try:
+            labels = fetch_lookup_table(cfg["base_url"], fp, spec.table, spec.label_field, cfg)
+        except Exception as e:  # noqa: BLE001 — sem a tabela o campo só deixa de ser checado
+            failed.append(f"{spec.field} ({spec.table}): {e}")
+            continue
+        tables[spec.field] = LookupTable(spec, labels)
+    return tables, failed
+
+
+class LookupResolver:
+    """Tabelas buscadas uma vez; ``resolve`` trata a planilha bloco a bloco (CSV/Parquet chegam em blocos) e soma o resumo."""
+
+    def __init__(self, cfg: Dict[str, Any], endpoint_path: str, columns: Iterable[str]) -> None:
+        cols = set(columns)
+        specs = [sp for sp in lookup_specs(endpoint_path) if sp.field in cols]
+        self.tables, self.failed = load_lookup_tables(cfg, specs)
+        self._counts = {f: {"nomes_resolvidos": 0, "linhas_invalidas": 0} for f in self.tables}
+
+    def resolve(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[Any, List[str]]]:
+        """(bloco com nomes trocados por ids, erros por índice de linha); um valor distinto por vez."""
+        out = df.copy(deep=False)
+        errors: Dict[Any, List[str]] = {}
+        for field_name, table in self.tables.items():
+            if field_name not in df.columns:
+                continue
+            values = df[field_name].map(normalize_value)
+            resolved: Dict[str, str] = {}
+            bad: Dict[str, str] = {}
+            for v in values.unique():
+                new, err = table.resolve(v)
+                if err:
+                    bad[v] = err
+                elif new != v:
+                    resolved[v] = new
+            if resolved:
+                out[field_name] = values.map(lambda v: resolved.get(v, v))
+            bad_mask = values.isin(list(bad))
+            for idx, v in values[bad_mask].items():
+                errors.setdefault(idx, []).append(bad[v])
+            counts = self._counts[field_name]
+            counts["nomes_resolvidos"] += int(values.isin(list(resolved)).sum())
+            counts["linhas_invalidas"] += int(bad_mask.sum())
+        return out, errors
+
+    def stage(self) -> LookupStage:
+        summary = [
+            {
+                "campo": field_name,
+                "tabela": table.spec.table,
+                "registros": len(table.labels),
+                **self._counts[field_name],
+            }
+            for field_name, table in self.tables.items()
+        ]
+        return LookupStage(summary, list(self.failed))
+
+
+# ============================
+# Gerenciar Assuntos — store colunar da sessão
+# ============================
+
+PAGE_SIZE_OPTIONS = [100, 250, 500, 1000]
+DEFAULT_PAGE_SIZE = 500
+
+FLAG_VALUES = {"S", "N", ""}
+FLAG_DTYPE = pd.CategoricalDtype(["S", "N", ""])
+STRING_DTYPE = pd.StringDtype("pyarrow")
+
+
+def _is_flag_column(uniques: set) -> bool:
+    return bool(uniques) and uniques <= FLAG_VALUES and bool(uniques & {"S", "N"})
+
+
+def normalize_arrow_column(values: List[Any]) -> pa.Array:
+    """Equivalente vetorizado de ``normalize_value`` para uma coluna inteira."""
+    try:
+        arr = pa.array(values, type=pa.string())
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # coluna com tipos mistos (int/float/bool...): cai no caminho item a item
+        return pa.array([normalize_value(v) for v in values], type=pa.string())
+    return _normalize_arrow_strings(arr)
+
+
+def _normalize_arrow_strings(arr: pa.Array) -> pa.Array:
+    arr = pc.fill_null(pc.utf8_trim_whitespace(arr), "")
+    return pc.if_else(pc.equal(pc.utf8_lower(arr), "nan"), "", arr)
+
+
+def records_to_arrow(records: List[dict]) -> pa.Table:
+    """Converte os registros JSON da listagem em uma tabela Arrow só de strings normalizadas.
+
+    Caminho rápido: todos os valores são str/None -> uma única conversão para struct Arrow.
+    """
+    columns: Dict[str, None] = {}
+    for r in records:
+        for k in r:
+            columns.setdefault(str(k))
+    names = list(columns)
+    if not names:
+        return pa.table({})
+
+    try:
+        structs = pa.array(records, type=pa.struct([(c, pa.string()) for c in names]))
+        arrays = [_normalize_arrow_strings(a) for a in structs.flatten()]
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        arrays = [normalize_arrow_column([r.get(c) for r in records]) for c in names]
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def arrow_to_compact_series(arr: Any) -> pd.Series:
+    """Coluna Arrow (string) -> Series sem copiar os buffers de string; flags S/N viram categóricas."""
+    s = pd.Series(pd.arrays.ArrowStringArray(pa.chunked_array([arr]) if isinstance(arr, pa.Array) else arr))
+    if _is_flag_column(set(pc.unique(arr).to_pylist())):
+        return s.astype(FLAG_DTYPE)
+    return s
+
+
+def frame_to_arrow(df: pd.DataFrame, columns: Optional[List[str]] = None) -> pa.Table:
+    """DataFrame do store -> tabela Arrow (colunas string Arrow passam sem cópia; categorias viram string)."""
+    table = pa.Table.from_pandas(df[columns] if columns else df, preserve_index=False)
+    for i, f in enumerate(table.schema):
+        if pa.types.is_dictionary(f.type):
+            table = table.set_column(i, f.name, pc.cast(table.column(i), pa.string()))
+    return table
+
+
+def frame_to_csv_bytes(df: pd.DataFrame, columns: Optional[List[str]] = None) -> bytes:
+    """CSV (utf-8 com BOM, como os demais relatórios) escrito direto da tabela Arrow."""
+    buf = pa.BufferOutputStream()
+    pacsv.write_csv(frame_to_arrow(df, columns), buf)
+    return b"\xef\xbb\xbf" + buf.getvalue().to_pybytes()
+
+
+def frame_to_xlsx_bytes(df: pd.DataFrame, columns: List[str], chunk_rows: int = 5000) -> bytes:
+    """xlsx em streaming (openpyxl write_only): lotes de ``chunk_rows`` linhas, células como texto."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("assuntos")
+    ws.append(columns)
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows][columns].astype(STRING_DTYPE).fillna("")
+        for row in chunk.itertuples(index=False, name=None):
+            ws.append([v if v != "" else None for v in row])
+    with tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_BYTES) as out:
+        wb.save(out)
+        out.seek(0)
+        return out.read()
+
+
+# sem zero à esquerda ("0012" é código, não número) e só o que cabe no tipo: até 18 dígitos em int64,
+# até 15 na parte inteira de float64; fora disso a coluna segue string
+INT_VALUE_RE = r"^-?(0|[1-9][0-9]{0,17})$"
+FLOAT_VALUE_RE = r"^-?(0|[1-9][0-9]{0,14})(\.[0-9]+)?$"
+DATETIME_VALUE_RE = r"^[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2}$"
+
+
+def _all_match(values: pa.Array, pattern: str) -> bool:
+    return len(values) > 0 and bool(pc.all(pc.match_substring_regex(values, pattern)).as_py())
+
+
+def typed_export_table(table: pa.Table) -> pa.Table:
+    """Tabela string do IXC -> colunas tipadas para Parquet/NDJSON: "" vira nulo, inteiros -> int64,
+    decimais -> float64 (códigos com zero à esquerda ou longos demais seguem string), datas -> timestamp, baixa cardinalidade -> dictionary; o resto segue string."""
+    cols: Dict[str, pa.Array] = {}
+    for name in table.column_names:
+        arr = table.column(name).combine_chunks()
+        if pa.types.is_dictionary(arr.type):
+            arr = pc.cast(arr, pa.string())
+        if not pa.types.is_string(arr.type) and not pa.types.is_large_string(arr.type):
+            cols[name] = arr
+            continue
+        arr = pc.if_else(pc.equal(arr, ""), pa.scalar(None, arr.type), arr)
+        present = pc.drop_null(arr)
+        if _all_match(present, INT_VALUE_RE):
+            arr = pc.cast(arr, pa.int64())
+        elif _all_match(present, FLOAT_VALUE_RE):
+            arr = pc.cast(arr, pa.float64())
+        elif _all_match(present, DATETIME_VALUE_RE):
+            arr = pc.strptime(arr, format="%Y-%m-%d %H:%M:%S", unit="s", error_is_null=True)
+        elif len(present) and len(pc.unique(present)) * 20 <= len(present):
+            arr = pc.dictionary_encode(arr)  # baixa cardinalidade (S/N, M/E, AB...)
+        cols[name] = arr
+    return pa.table(cols)
+
+
+def table_to_parquet_bytes(table: pa.Table) -> bytes:
+    buf = pa.BufferOutputStream()
+    pq.write_table(table, buf, compression="zstd")
+    return buf.getvalue().to_pybytes()
+
+
+def table_to_ndjson_gz(table: pa.Table, batch_rows: int = 5000) -> bytes:
+    """NDJSON (um objeto por linha, serializador C do pandas) com gzip, em lotes de ``batch_rows``."""
+    int_types = {pa.int32(): pd.Int32Dtype(), pa.int64(): pd.Int64Dtype()}
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode="wb", compresslevel=6) as gz:
+        for batch in table.to_batches(max_chunksize=batch_rows):
+            frame = batch.to_pandas(types_mapper=int_types.get)
+            text = frame.to_json(orient="records", lines=True, force_ascii=False, date_format="iso")
+            gz.write((text if text.endswith("\n") else text + "\n").encode("utf-8"))
+    return buf.getvalue()
+
+
+def build_subjects_frame(records: List[dict]) -> Optional[pd.DataFrame]:
+    """Monta o DataFrame compacto da listagem, indexado por ``id`` (str). None se não houver 'id'."""
+    return subjects_frame_from_arrow(records_to_arrow(records))
+
+
+def subjects_frame_from_arrow(table: pa.Table) -> Optional[pd.DataFrame]:
+    """``build_subjects_frame`` a partir da tabela já normalizada (``listar_colunar`` / cache de listagens)."""
+    if "id" not in table.column_names:
+        return None
+
+    data: Dict[str, pd.Series] = {}
+    for col in table.column_names:
+        if col == "selecionar":
+            continue
+        data[col] = arrow_to_compact_series(table.column(col))
+
+    if "selecionar" in table.column_names:
+        sel = [parse_bool_value(v) for v in table.column("selecionar").to_pylist()]
+    else:
+        sel = [False] * table.num_rows
+    del table
+
+    out = pd.DataFrame(data, copy=False)
+    out.insert(0, "selecionar", pd.array(sel, dtype=bool))
+    out.index = pd.Index(out["id"].to_numpy(dtype=object))
+    dup = out.index.duplicated(keep="first")
+    return out.loc[~dup] if dup.any() else out
+
+
+@dataclass
+class SubjectStore:
+    """Estado da tela Gerenciar Assuntos: uma única cópia colunar dos assuntos.
+
+    - ``df``: valores atuais (editados), indexado por ``id``; ``selecionar`` é bool
+    - ``original``: overlay só das células alteradas -> {id: {coluna: valor_original}}
+    """
+
+    df: pd.DataFrame
+    original: Dict[str, Dict[str, str]] = field(default_factory=dict)
+
+    @property
+    def editable_columns(self) -> List[str]:
+        return [c for c in self.df.columns if c not in ("selecionar", "id")]
+
+    def _assign(self, ids: Any, col: str, value: str) -> None:
+        s = self.df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype) and value not in s.cat.categories:
+            self.df[col] = s.cat.add_categories([value])
+        self.df.loc[ids, col] = value
+
+    def current_value(self, rid: str, col: str) -> str:
+        return normalize_value(self.df.at[rid, col])
+
+    def original_value(self, rid: str, col: str) -> str:
+        changed = self.original.get(rid)
+        if changed and col in changed:
+            return changed[col]
+        return self.current_value(rid, col)
+
+    def current_row(self, rid: str) -> Dict[str, str]:
+        return {c: self.current_value(rid, c) for c in self.editable_columns}
+
+    def original_row(self, rid: str) -> Dict[str, str]:
+        row = self.current_row(rid)
+        row.update(self.original.get(rid, {}))
+        return row
+
+    def set_cell(self, rid: str, col: str, value: str) -> None:
+        before = self.current_value(rid, col)
+        if before == value:
+            return
+        changed = self.original.setdefault(rid, {})
+        if col not in changed:
+            changed[col] = before
+        elif changed[col] == value:
+            # voltou ao valor original: sai do overlay
+            del changed[col]
+            if not changed:
+                del self.original[rid]
+        self._assign(rid, col, value)
+
+    def set_many(self, ids: List[str], col: str, value: str) -> int:
+        """Edição em massa: grava ``value`` em ``col`` para ``ids``; retorna quantas células mudaram."""
+        n = 0
+        for rid in ids:
+            if rid in self.df.index and self.current_value(rid, col) != value:
+                self.set_cell(rid, col, value)
+                n += 1
+        return n
+
+    def apply_editor_changes(self, before: pd.DataFrame, after: pd.DataFrame) -> int:
+        """Aplica as células que o ``st.data_editor`` devolveu diferentes; retorna quantas mudaram."""
+        n = 0
+        for col in after.columns:
+            if col == "id" or col not in before.columns:
+                continue
+            if col == "selecionar":
+                sel = after[col].map(parse_bool_value).astype(bool)
+                diff = sel.ne(before[col])
+                if diff.any():
+                    self.df.loc[sel.index[diff], "selecionar"] = sel[diff]
+                continue
+            a = before[col].astype(STRING_DTYPE).fillna("")
+            b = after[col].astype(STRING_DTYPE).fillna("")
+            diff = a.ne(b)
+            if not diff.any():
+                continue
+            for rid, val in b[diff].items():
+                self.set_cell(str(rid), col, normalize_value(val))
+                n += 1
+        return n
+
+    def diff_workbook(self, edited: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
+        """Compara uma planilha editada (lida como texto) com os valores atuais, por ``id``.
+
+        Retorna (mudanças [id, campo, atual, novo], ids da planilha que não estão na listagem).
+        Só as colunas editáveis presentes nas duas entram; a comparação é vetorizada por coluna.
+        """
+        cols = [c for c in self.editable_columns if c in edited.columns]
+        new = edited[["id"] + cols].astype(STRING_DTYPE).fillna("")
+        for c in new.columns:
+            new[c] = new[c].str.strip()
+        new = new[new["id"] != ""].drop_duplicates("id", keep="last")
+
+        cur = self.df[cols].astype(STRING_DTYPE).fillna("")
+        merged = new.merge(cur, left_on="id", right_index=True, how="left", suffixes=("", "__atual"), indicator=True)
+        unknown = merged.loc[merged["_merge"] == "left_only", "id"].tolist()
+        merged = merged[merged["_merge"] == "both"]
+
+        parts = []
+        for c in cols:
+            diff = merged[c].ne(merged[f"{c}__atual"])
+            if diff.any():
+                parts.append(pd.DataFrame({
+                    "id": merged.loc[diff, "id"].to_numpy(dtype=object),
+                    "campo": c,
+                    "atual": merged.loc[diff, f"{c}__atual"].to_numpy(dtype=object),
+                    "novo": merged.loc[diff, c].to_numpy(dtype=object),
+                }))
+        changes = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["id", "campo", "atual", "novo"])
+        return changes, unknown
+
+    def apply_changes(self, changes: pd.DataFrame) -> int:
+        """Aplica as mudanças de ``diff_workbook`` no overlay (ficam prontas para o PUT)."""
+        for rid, col, value in changes[["id", "campo", "novo"]].itertuples(index=False, name=None):
+            self.set_cell(str(rid), col, normalize_value(value))
+        return len(changes)
+
+    def commit(self, rid: str) -> None:
+        """Marca a linha como salva no IXC: os valores atuais passam a ser os originais."""
+        self.original.pop(rid, None)
+
+    def conflicts(self, rid: str, server: Dict[str, Any]) -> List[Tuple[str, str, str, str]]:
+        """Campos que mudaram no IXC desde a listagem e que o PUT da linha inteira sobrescreveria.
+
+        Retorna [(campo, original, no IXC, nosso)]; campo que o IXC já tem igual ao nosso não conta.
+        """
+        out = []
+        for col in self.editable_columns:
+            if col not in server:
+                continue
+            remote = normalize_value(server[col])
+            before = self.original_value(rid, col)
+            mine = self.current_value(rid, col)
+            if remote != before and remote != mine:
+                out.append((col, before, remote, mine))
+        return out
+
+    def rebase(self, rid: str, server: Dict[str, Any]) -> None:
+        """Traz a linha para a versão do IXC, mantendo só as nossas edições por cima dela."""
+        changed = self.original.get(rid, {})
+        for col in self.editable_columns:
+            if col not in server:
+                continue
+            remote = normalize_value(server[col])
+            if col in changed:
+                if remote == self.current_value(rid, col):
+                    del changed[col]
+                else:
+                    changed[col] = remote
+            elif remote != self.current_value(rid, col):
+                self._assign(rid, col, remote)
+        if rid in self.original and not self.original[rid]:
+            del self.original[rid]
+
+    def changed_ids(self) -> List[str]:
+        return [rid for rid in self.df.index if rid in self.original]
+
+    def selected_ids(self) -> List[str]:
+        return self.df.index[self.df["selecionar"].to_numpy()].tolist()
+
+    def sorted_index(self, rows: pd.Index, col: str, ascending: bool = True) -> pd.Index:
+        """Ordena ``rows`` pela coluna ``col`` (numérica quando todos os valores são números)."""
+        s = self.df.loc[rows, col]
+        if not isinstance(s.dtype, pd.CategoricalDtype):
+            num = pd.to_numeric(s, errors="coerce")
+            if num.notna().all():
+                s = num
+        return s.sort_values(ascending=ascending, kind="stable").index
+
+    def filter_mask(self, text: str) -> Optional[pd.Series]:
+        """Máscara booleana das linhas que contêm ``text`` em qualquer campo (None = sem filtro)."""
+        ft = (text or "").strip().lower()
+        if not ft:
+            return None
+        mask = pd.Series(False, index=self.df.index)
+        for col in self.df.columns:
+            if col == "selecionar":
+                continue
+            s = self.df[col]
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                hit_cats = s.cat.categories.str.lower().str.contains(ft, regex=False)
+                codes = s.cat.codes.to_numpy()
+                mask |= pd.Series((codes >= 0) & hit_cats[codes], index=self.df.index)
+            else:
+                # string Arrow: pc.match_substring direto nos buffers, sem criar colunas lower()
+                mask |= s.str.contains(ft, case=False, regex=False).fillna(False).astype(bool)
+        return mask
+
+    def memory_bytes(self) -> int:
+        overlay = sum(len(k) + sum(len(c) + len(v) for c, v in d.items()) for k, d in self.original.items())
+        return int(self.df.memory_usage(deep=True).sum()) + overlay
+
+
+rerun_budget.mark("definições (módulo)")
+
+
+# ============================
+# Sidebar (buttons — same tab)
+# ============================
+
+with st.sidebar:
+    logo = static_assets.file_bytes(APP_DIR / "assets" / "logo-isp-consulte.png")
+    if logo is not None:
+        st.image(logo, use_container_width=True)  # bytes já em memória: sem abrir o PNG do disco a cada rerun
+    else:
+        st.markdown("<div class='sidebar-title'>ISP Consulte</div>", unsafe_allow_html=True)
+    st.markdown("<hr style='opacity:.25; margin:10px 0 14px 0;'>", unsafe_allow_html=True)
+
+
+if st.sidebar.button("🏠 " + tr("home"), use_container_width=True):
+    set_page("home")
+
+if st.sidebar.button("🧾 " + tr("create_subjects"), use_container_width=True):
+    set_page("subjects")
+
+if st.sidebar.button("📝 " + tr("manage_subjects"), use_container_width=True):
+    set_page("manage_subjects")
+
+if st.sidebar.button("🩺 " + tr("create_diagnostics"), use_container_width=True):
+    set_page("diagnostics")
+
+if st.sidebar.button("📚 " + tr("import_workbook"), use_container_width=True):
+    set_page("workbook")
+st.sidebar.markdown("---")
+if st.sidebar.button("⚙️ " + tr("settings"), use_container_width=True):
+    set_page("settings")
+
+
+cfg = get_runtime_config()
+rerun_budget.mark("sidebar")
+
+
+# ============================
+# Progresso com atualização limitada
+# ============================
+
+def _fmt_eta(seconds: float) -> str:
+    seconds = max(0, int(seconds))
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h:d}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
+
+
+class ProgressReporter:
+    """Barra de progresso + status que só redesenha a cada ``min_interval`` segundos ou ``every_rows`` linhas.
+
+    Cada chamada ``st.progress``/``st.info`` é um delta no websocket; aqui o loop só soma contadores
+    e a UI acompanha no seu próprio ritmo (linhas/s, ETA, OK / validação / API).
+    """
+
+    OUTCOMES = ("ok", "validation", "api")
+
+    def __init__(
+        self,
+        total: int,
+        label: str,
+        *,
+        min_interval: float = ENV_IXC_PROGRESS_INTERVAL_SECONDS,
+        every_rows: int = 0,
+        profiler: Optional[PhaseProfiler] = None,
+    ) -> None:
+        self.total = max(int(total), 0)
+        self.label = label
+        self.min_interval = max(float(min_interval), 0.0)
+        self.every_rows = max(int(every_rows), 0)
+        self.done = 0
+        self.counts: Dict[str, int] = {k: 0 for k in self.OUTCOMES}
+        self.started = time.perf_counter()
+        self._last_render = 0.0
+        self._last_done = 0
+        self._profiler = profiler
+        self._bar = st.progress(0)
+        self._status = st.empty()
+
+    def step(self, outcome: str, item: str = "") -> None:
+        """Registra uma linha concluída (``ok`` | ``validation`` | ``api``)."""
+        self.done += 1
+        self.counts[outcome] = self.counts.get(outcome, 0) + 1
+        now = time.perf_counter()
+        due_time = now - self._last_render >= self.min_interval
+        due_rows = bool(self.every_rows) and self.done - self._last_done >= self.every_rows
+        if due_time or due_rows or self.done >= self.total:
+            self._render(item, now)
+
+    def rate(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        rate = self.rate()
+        eta = (self.total - self.done) / rate if rate > 0 else 0.0
+        return (
+            f"[{self.done}/{self.total}] {rate:.1f} linhas/s — ETA {_fmt_eta(eta)} — "
+            f"OK: {self.counts['ok']} | validação: {self.counts['validation']} | API: {self.counts['api']}"
+        )
+
+    def _render(self, item: str, now: float) -> None:
+        self._last_render = now
+        self._last_done = self.done
+        with self._profiler.span("render") if self._profiler else nullcontext():
+            self._bar.progress(min(int(self.done / max(self.total, 1) * 100), 100))
+            msg = f"{self.label} {self.summary()}"
+            if item:
+                msg += f" — {item}"
+            if self.counts["validation"] or self.counts["api"]:
+                self._status.warning(msg)
+            else:
+                self._status.info(msg)
+
+    def error(self, msg: str) -> None:
+        """Erro que interrompe o loop: mostra na hora, sem esperar o intervalo."""
+        self._render("", time.perf_counter())
+        self._status.error(f"{msg} — {self.summary()}")
+
+    def finish(self) -> None:
+        self._bar.progress(100 if self.done >= self.total else min(int(self.done / max(self.total, 1) * 100), 100))
+        msg = f"{self.label} {self.summary()}"
+        if self.counts["validation"] or self.counts["api"]:
+            self._status.warning(msg)
+        else:
+            self._status.success(msg)
+
+
+# ============================
+# Perfil por fase (opt-in: IXC_PROFILE=1 ou Configurações)
+# ============================
+
+class PhaseProfiler:
+    """Acumula o tempo gasto em cada fase de uma execução (leitura, normalização, validação, HTTP...).
+
+    Desligado, ``span()`` devolve um context manager vazio. Com ``cprofile=True`` a execução inteira
+    também passa pelo cProfile e o .prof é gravado em ``IXC_PROFILE_DIR`` para análise offline; as threads
+    de trabalho (estágios do pipeline, jobs do fan-out) entram por ``wrap_thread`` e são somadas no mesmo .prof.
+    Fases medidas em threads paralelas somam tempo de várias threads: o % é sobre o tempo das threads que a mediram.
+    """
+
+    def __init__(self, run_name: str, *, enabled: bool, cprofile: bool = False, out_dir: str = ENV_IXC_PROFILE_DIR) -> None:
+        self.run_name = run_name
+        self.enabled = enabled
+        self.cprofile = enabled and cprofile
+        self.out_dir = Path(out_dir)
+        self.totals: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.threads: Dict[str, set] = {}  # fase -> threads que a mediram
+        self.dump_path: Optional[Path] = None
+        self._lock = threading.Lock()
+        self._profile: Optional[cProfile.Profile] = None
+        self._thread_profiles: List[cProfile.Profile] = []
+        self._owner: Optional[int] = None
+        self._owner_total = 0.0
+        self._started = 0.0
+        self._wall = 0.0
+
+    def add(self, phase: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        tid = threading.get_ident()
+        with self._lock:
+            self.totals[phase] = self.totals.get(phase, 0.0) + seconds
+            self.calls[phase] = self.calls.get(phase, 0) + 1
+            self.threads.setdefault(phase, set()).add(tid)
+            if tid == self._owner:
+                self._owner_total += seconds
+
+    @contextmanager
+    def _timed(self, phase: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - t0)
+
+    def span(self, phase: str):
+        return self._timed(phase) if self.enabled else nullcontext()
+
+    def wrap_thread(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """``fn`` com um cProfile próprio na thread que a roda (o cProfile só enxerga a thread que o liga)."""
+        if not self.cprofile:
+            return fn
+
+        def run(*args: Any, **kwargs: Any) -> Any:
+            prof = cProfile.Profile()
+            try:
+                prof.enable()
+            except ValueError:
+                # Python 3.12+: um profiler por processo (sys.monitoring), e o da thread principal já vê esta
+                return fn(*args, **kwargs)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                prof.disable()
+                with self._lock:
+                    self._thread_profiles.append(prof)
+
+        return run
+
+    def __enter__(self) -> "PhaseProfiler":
+        self._started = time.perf_counter()
+        self._owner = threading.get_ident()
+        if self.cprofile:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._wall = time.perf_counter() - self._started
+        if self._profile is not None:
+            self._profile.disable()
+            with self._lock:
+                thread_profiles, self._thread_profiles = self._thread_profiles, []
+            try:
+                stats = pstats.Stats(self._profile)
+                for prof in thread_profiles:
+                    stats.add(prof)
+                self.out_dir.mkdir(parents=True, exist_ok=True)
+                self.dump_path = self.out_dir / f"{self.run_name}_{time.strftime('%Y%m%d-%H%M%S')}.prof"
+                stats.dump_stats(str(self.dump_path))
+            except (OSError, TypeError):  # TypeError: nenhuma chamada registrada
+                self.dump_path = None
+            self._profile = None
+
+    def breakdown(self) -> pd.DataFrame:
+        wall = self._wall or (time.perf_counter() - self._started if self._started else 0.0)
+        rows = [
+            {
+                "fase": phase,
+                "chamadas": self.calls[phase],
+                "threads": len(self.threads[phase]),
+                "total_s": round(total, 4),
+                "media_ms": round(total / max(self.calls[phase], 1) * 1000, 3),
+                "pct_execucao": round(total / (wall * len(self.threads[phase])) * 100, 1) if wall else 0.0,
+            }
+            for phase, total in sorted(self.totals.items(), key=lambda kv: -kv[1])
+        ]
+        # só a thread que abriu a execução: as outras rodam em paralelo e somariam mais que o tempo total
+        accounted = self._owner_total
+        if wall:
+            rows.append({"fase": "(total da execução)", "chamadas": 1, "threads": 1, "total_s": round(wall, 4),
+                         "media_ms": round(wall * 1000, 3), "pct_execucao": 100.0})
+            rows.append({"fase": "(fora das fases)", "chamadas": 0, "threads": 1, "total_s": round(max(wall - accounted, 0.0), 4),
+                         "media_ms": 0.0, "pct_execucao": round(max(wall - accounted, 0.0) / wall * 100, 1)})
+        return pd.DataFrame(rows)
+
+    def render(self) -> None:
+        if not self.enabled or not self.totals:
+            return
+        with st.expander(f"⏱️ {tr('profile_breakdown')} — {self.run_name}", expanded=False):
+            st.dataframe(self.breakdown(), use_container_width=True, hide_index=True)
+            if any(len(t) > 1 or self._owner not in t for t in self.threads.values()):
+                st.caption(tr("profile_threads_note"))
+            if self.dump_path is not None:
+                st.caption(f"cProfile: `{self.dump_path}` (python -m pstats / snakeviz)")
+
+
+def new_profiler(run_name: str, cfg: Dict[str, Any]) -> PhaseProfiler:
+    return PhaseProfiler(run_name, enabled=bool(cfg.get("profile")), cprofile=bool(cfg.get("profile_cprofile")))
+
+
+NO_PROFILE = PhaseProfiler("off", enabled=False)
+
+
+# ============================
+# Relatórios em disco (CSV + NDJSON incrementais)
+# ============================
+
+REPORT_SPOOL_BYTES = 8 * 1024 * 1024
+REPORT_PARQUET_BATCH = 5000
+RESULT_PREVIEW_ROWS = 1000
+# colunas numéricas dos relatórios (o resto vai como string)
+REPORT_INT_COLUMNS = {"linha_excel": pa.int32(), "http_status": pa.int32()}
+
+
+class ReportWriter:
+    """Relatório CSV (gzip opcional), JSON compacto (NDJSON.gz) e Parquet gravados incrementalmente.
+
+    Cada arquivo fica em memória até ``REPORT_SPOOL_BYTES`` e depois vai para um temporário em
+    disco; o Parquet sai em lotes de ``REPORT_PARQUET_BATCH`` linhas com colunas tipadas. A tela
+    guarda só as últimas ``RESULT_PREVIEW_ROWS`` linhas. A memória não cresce com o tamanho da execução.
+    """
+
+    def __init__(self, prefix: str, *, gzip_output: bool = False) -> None:
+        self.gzip_output = gzip_output
+        self.csv_name = f"relatorio_{prefix}.csv" + (".gz" if gzip_output else "")
+        self.ndjson_name = f"compact_{prefix}.ndjson.gz"
+        self.parquet_name = f"relatorio_{prefix}.parquet"
+        self.rows = 0
+        self.preview: deque = deque(maxlen=RESULT_PREVIEW_ROWS)
+        self._csv_file = tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_BYTES)
+        self._ndjson_file = tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_BYTES)
+        self._parquet_file = tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_BYTES)
+        self._csv = self._open_text(self._csv_file, "utf-8-sig", gzip_output)  # BOM: Excel abre com acento certo
+        self._ndjson = self._open_text(self._ndjson_file, "utf-8", True)
+        self._csv_writer: Optional[csv.DictWriter] = None
+        self._parquet_writer: Optional[pq.ParquetWriter] = None
+        self._parquet_schema: Optional[pa.Schema] = None
+        self._pending: List[Dict[str, Any]] = []
+        self._closed = False
+
+    @staticmethod
+    def _open_text(raw: Any, encoding: str, gz: bool) -> io.TextIOWrapper:
+        stream = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) if gz else raw
+        return io.TextIOWrapper(stream, encoding=encoding, newline="")
+
+    def write(self, result: Dict[str, Any], compact: Optional[Dict[str, Any]] = None) -> None:
+        """Uma linha do relatório; sem ``compact``, o NDJSON recebe a própria linha."""
+        if self._csv_writer is None:
+            self._csv_writer = csv.DictWriter(self._csv, fieldnames=list(result), extrasaction="ignore")
+            self._csv_writer.writeheader()
+        self._csv_writer.writerow(result)
+        self._ndjson.write(json.dumps(compact if compact is not None else result, ensure_ascii=False, default=str))
+        self._ndjson.write("\n")
+        self._pending.append(result)
+        if len(self._pending) >= REPORT_PARQUET_BATCH:
+            self._flush_parquet()
+        self.preview.append(result)
+        self.rows += 1
+
+    def _flush_parquet(self) -> None:
+        if not self._pending:
+            return
+        if self._parquet_schema is None:
+            self._parquet_schema = pa.schema(
+                [(name, REPORT_INT_COLUMNS.get(name, pa.string())) for name in self._pending[0]]
+            )
+            self._parquet_writer = pq.ParquetWriter(self._parquet_file, self._parquet_schema, compression="zstd")
+        arrays = []
+        for f in self._parquet_schema:
+            values = [r.get(f.name) for r in self._pending]
+            if pa.types.is_integer(f.type):
+                values = [int(v) if str(v).strip().lstrip("-").isdigit() else None for v in values]
+            else:
+                values = [None if v is None else str(v) for v in values]
+            arrays.append(pa.array(values, type=f.type))
+        self._parquet_writer.write_table(pa.Table.from_arrays(arrays, schema=self._parquet_schema))
+        self._pending = []
+
+    def close(self) -> None:
+        """Fecha gzip/texto/Parquet sem apagar os temporários (os downloads leem depois)."""
+        if self._closed:
+            return
+        self._flush_parquet()
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        for text in (self._csv, self._ndjson):
+            text.flush()
+            inner = text.detach()
+            if isinstance(inner, gzip.GzipFile):
+                inner.close()
+        self._closed = True
+
+    def _read(self, raw: Any) -> bytes:
+        self.close()
+        raw.seek(0)
+        return raw.read()
+
+    def csv_bytes(self) -> bytes:
+        return self._read(self._csv_file)
+
+    def ndjson_bytes(self) -> bytes:
+        return self._read(self._ndjson_file)
+
+    def parquet_bytes(self) -> bytes:
+        return self._read(self._parquet_file)
+
+    def preview_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(list(self.preview))
+
+    def dispose(self) -> None:
+        self.close()
+        self._csv_file.close()
+        self._ndjson_file.close()
+        self._parquet_file.close()
+
+
+def new_report_writer(state_key: str, prefix: str, cfg: Dict[str, Any]) -> ReportWriter:
+    """Novo relatório da sessão; descarta (apaga os temporários) o da execução anterior."""
+    old = st.session_state.get(state_key)
+    if isinstance(old, ReportWriter):
+        old.dispose()
+    writer = ReportWriter(prefix, gzip_output=bool(cfg.get("gzip_reports")))
+    st.session_state[state_key] = writer
+    return writer
+
+
+def report_downloads(writer: ReportWriter, key_prefix: str) -> None:
+    """Botões de download servidos do disco (callable: só lê o arquivo quando o usuário clica)."""
+    writer.close()
+    c1, c2, c3 = st.columns([1, 1, 1])
+    with c1:
+        st.download_button(
+            tr("download_csv"),
+            data=writer.csv_bytes,
+            file_name=writer.csv_name,
+            mime="application/gzip" if writer.gzip_output else "text/csv",
+            on_click="ignore",
+            key=f"dlcsv_{key_prefix}",
+        )
+    with c2:
+        st.download_button(
+            tr("download_json"),
+            data=writer.ndjson_bytes,
+            file_name=writer.ndjson_name,
+            mime="application/gzip",
+            on_click="ignore",
+            key=f"dlj_{key_prefix}",
+        )
+    with c3:
+        st.download_button(
+            tr("download_parquet"),
+            data=writer.parquet_bytes,
+            file_name=writer.parquet_name,
+            mime="application/vnd.apache.parquet",
+            on_click="ignore",
+            key=f"dlpq_{key_prefix}",
+        )
+
+
+# ============================
+# Processamento por linha (import / save), sem UI
+# ============================
+
+@dataclass
+class RowOutcome:
+    outcome: str  # ok | validation | api
+    item_name: str
+    payload: Dict[str, str]
+    result: Dict[str, Any]  # linha do relatório CSV
+    compact: Dict[str, Any]  # item do JSON compacto (payload + retorno)
+
+
+def _api_message(resp: IXCResponse, *, ok: bool) -> str:
+    if isinstance(resp.data, dict):
+        if ok:
+            return str(resp.data.get("message") or resp.data.get("msg") or "")
+        return str(resp.data.get("message") or resp.data.get("msg") or resp.data)
+    return "" if ok else resp.text
+
+
+def import_row(
+    cfg: Dict[str, Any],
+    endpoint_path: str,
+    name_col: str,
+    validate_fn,
+    idx: Any,
+    row: pd.Series,
+    *,
+    dry_run: bool,
+    session: Optional[requests.Session] = None,
+    prof: PhaseProfiler = NO_PROFILE,
+) -> RowOutcome:
+    """Uma linha da planilha: payload -> validação -> POST (ou só validação no dry run)."""
+    with prof.span("row_to_payload"):
+        payload = row_to_payload(row)
+    with prof.span("validate"):
+        validation_errors = validate_fn(payload)
+    return dispatch_payload(
+        cfg, endpoint_path, name_col, idx, payload, validation_errors, dry_run=dry_run, session=session, prof=prof
+    )
+
+
+def dispatch_payload(
+    cfg: Dict[str, Any],
+    endpoint_path: str,
+    name_col: str,
+    idx: Any,
+    payload: Dict[str, str],
+    validation_errors: List[str],
+    *,
+    dry_run: bool,
+    session: Optional[requests.Session] = None,
+    prof: PhaseProfiler = NO_PROFILE,
+) -> RowOutcome:
+    """Payload já validado: registra o erro de validação, o dry run ou faz o POST."""
+    item_name = payload.get(name_col, f"(linha {idx})")
+    result_row: Dict[str, Any] = {
+        "linha_excel": int(idx) + 2,
+        name_col: item_name,
+        "status": "",
+        "http_status": "",
+        "mensagem": "",
+    }
+
+    if validation_errors:
+        result_row.update({"status": "ERRO_VALIDACAO", "mensagem": " | ".join(validation_errors)})
+        compact = {
+            name_col: item_name,
+            "linha_excel": result_row["linha_excel"],
+            "ok": False,
+            "tipo": "validacao",
+            "erros": validation_errors,
+            "payload": payload,
+        }
+        return RowOutcome("validation", item_name, payload, result_row, compact)
+
+    if dry_run:
+        result_row.update({"status": "OK_VALIDADO", "mensagem": "Payload válido (dry run)."})
+        compact = {
+            name_col: item_name,
+            "linha_excel": result_row["linha_excel"],
+            "ok": True,
+            "tipo": "dry_run",
+            "payload": payload,
+        }
+        return RowOutcome("ok", item_name, payload, result_row, compact)
+
+    with prof.span("http"):
+        resp = post_to_endpoint(cfg, endpoint_path, payload, session=session)
+
+    ok = _write_succeeded(resp)  # 200 com type:error é rejeição, como no PUT
+    compact = {
+        name_col: item_name,
+        "linha_excel": result_row["linha_excel"],
+        "ok": ok,
+        "http_status": resp.http_status,
+        "response_json": resp.data,
+        "response_text": resp.text[:5000],
+        "payload": payload,
+    }
+    status = "CRIADO" if ok else "ERRO_API"
+    result_row.update({"status": status, "http_status": resp.http_status, "mensagem": _api_message(resp, ok=ok)})
+    return RowOutcome("ok" if ok else "api", item_name, payload, result_row, compact)
+
+
+def save_subject(
+    cfg: Dict[str, Any],
+    rid: str,
+    payload: Dict[str, str],
+    *,
+    validate_before: bool,
+    session: Optional[requests.Session] = None,
+    prof: PhaseProfiler = NO_PROFILE,
+    patch_cache: bool = True,
+) -> Tuple[str, Dict[str, Any]]:
+    """PUT de um assunto (com validação opcional). Retorna (outcome, linha do relatório)."""
+    if validate_before:
+        with prof.span("validate"):
+            v = validate_assunto(payload)
+        if v:
+            return "validation", {"id": rid, "status": "ERRO_VALIDACAO", "http_status": "", "mensagem": " | ".join(v)}
+
+    with prof.span("save_http"):
+        resp = put_to_endpoint(cfg, f"{ENDPOINT_ASSUNTO}/{rid}", payload, session=session, patch_cache=patch_cache)
+    if _write_succeeded(resp):  # 200 com type:error é rejeição: a edição continua pendente no store
+        return "ok", {"id": rid, "status": "OK", "http_status": resp.http_status, "mensagem": _api_message(resp, ok=True)}
+    return "api", {"id": rid, "status": "ERRO", "http_status": resp.http_status, "mensagem": _api_message(resp, ok=False)[:1500]}
+
+
+# ============================
+# Import em pipeline (leitura -> normalização -> validação -> envio)
+# ============================
+
+_PIPELINE_END = object()
+
+
+@dataclass
+class _StageError:
+    stage: str
+    error: BaseException
+
+
+class ImportPipeline:
+    """Estágios em threads ligados por filas limitadas; o envio é serial (mantém a ordem da planilha).
+
+    ``chunks`` são blocos da planilha (um só no .xlsx; CSV/Parquet são lidos bloco a bloco pelo próprio estágio
+    de leitura, então o primeiro POST sai antes do arquivo terminar de ser lido). ``prepare`` roda em cada bloco
+    antes das linhas seguirem (ex.: ``LookupResolver.resolve``) e devolve o bloco e os erros por linha.
+
+    Só a thread principal (a do Streamlit) consome ``outcomes()`` e mexe em ``st``; as threads de
+    trabalho nunca tocam na UI. Enquanto um POST espera a rede, os estágios anteriores já estão
+    normalizando/validando as próximas linhas.
+    """
+
+    def __init__(
+        self,
+        cfg: Dict[str, Any],
+        endpoint_path: str,
+        name_col: str,
+        validate_fn,
+        chunks: Iterable[pd.DataFrame],
+        *,
+        dry_run: bool,
+        stop_on_error: bool = False,
+        prepare: Optional[Callable[[pd.DataFrame], Tuple[pd.DataFrame, Dict[Any, List[str]]]]] = None,
+        queue_size: int = ENV_IXC_PIPELINE_QUEUE_SIZE,
+        prof: PhaseProfiler = NO_PROFILE,
+    ) -> None:
+        self.cfg = cfg
+        self.endpoint_path = endpoint_path
+        self.name_col = name_col
+        self.validate_fn = validate_fn
+        self.chunks = chunks
+        self.dry_run = dry_run
+        self.stop_on_error = stop_on_error
+        self.prepare = prepare
+        self.row_errors: Dict[Any, List[str]] = {}  # erros já conhecidos por linha (ex.: referências inválidas)
+        self.prof = prof
+        self._q_rows: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._q_payloads: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._q_valid: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._q_out: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._started = 0.0
+        self.first_dispatch_seconds: Optional[float] = None
+
+    # ----------------------------
+    # Plumbing
+    # ----------------------------
+
+    def _put(self, q: queue.Queue, item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue) -> Any:
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _PIPELINE_END
+
+    def _stage(self, name: str, q_in: Optional[queue.Queue], q_out: queue.Queue, fn) -> None:
+        try:
+            if q_in is None:
+                for item in fn(None):
+                    if not self._put(q_out, item):
+                        return
+            else:
+                while True:
+                    item = self._get(q_in)
+                    if item is _PIPELINE_END or isinstance(item, _StageError):
+                        self._put(q_out, item)
+                        return
+                    for out in fn(item):
+                        if not self._put(q_out, out):
+                            return
+                return
+        except BaseException as e:  # noqa: BLE001 — repassa para a thread principal mostrar
+            self._put(q_out, _StageError(name, e))
+            return
+        self._put(q_out, _PIPELINE_END)
+
+    # ----------------------------
+    # Estágios
+    # ----------------------------
+
+    def _read(self, _: Any) -> Iterator[Tuple[Any, pd.Series]]:
+        for chunk in self.chunks:
+            if self.prepare is not None:
+                with self.prof.span("lookups"):
+                    chunk, errors = self.prepare(chunk)
+                # preenchido antes das linhas entrarem na fila: a validação sempre vê os erros do bloco
+                for idx, errs in errors.items():
+                    self.row_errors.setdefault(idx, []).extend(errs)
+            yield from chunk.iterrows()
+
+    def _normalize(self, item: Tuple[Any, pd.Series]) -> Iterator[Tuple[Any, Dict[str, str]]]:
+        idx, row = item
+        with self.prof.span("row_to_payload"):
+            payload = row_to_payload(row)
+        yield idx, payload
+
+    def _validate(self, item: Tuple[Any, Dict[str, str]]) -> Iterator[Tuple[Any, Dict[str, str], List[str]]]:
+        idx, payload = item
+        with self.prof.span("validate"):
+            errors = self.validate_fn(payload) + self.row_errors.get(idx, [])
+        yield idx, payload, errors
+
+    def _dispatch_loop(self) -> None:
+        sess = new_session()
+        try:
+            while True:
+                item = self._get(self._q_valid)
+                if item is _PIPELINE_END or isinstance(item, _StageError):
+                    self._put(self._q_out, item)
+                    return
+                idx, payload, errors = item
+                if self.first_dispatch_seconds is None:
+                    self.first_dispatch_seconds = time.perf_counter() - self._started
+                out = dispatch_payload(
+                    self.cfg, self.endpoint_path, self.name_col, idx, payload, errors,
+                    dry_run=self.dry_run, session=sess, prof=self.prof,
+                )
+                if not self._put(self._q_out, out):
+                    return
+                if self.stop_on_error and out.outcome != "ok":
+                    self._put(self._q_out, _PIPELINE_END)
+                    self._stop.set()
+                    return
+        except BaseException as e:  # noqa: BLE001
+            self._put(self._q_out, _StageError("dispatch", e))
+        finally:
+            sess.close()
+
+    # ----------------------------
+    # API (thread principal)
+    # ----------------------------
+
+    def start(self) -> "ImportPipeline":
+        self._started = time.perf_counter()
+        targets = [
+            ("read", lambda: self._stage("read", None, self._q_rows, self._read)),
+            ("normalize", lambda: self._stage("normalize", self._q_rows, self._q_payloads, self._normalize)),
+            ("validate", lambda: self._stage("validate", self._q_payloads, self._q_valid, self._validate)),
+            ("dispatch", self._dispatch_loop),
+        ]
+        for name, target in targets:
+            t = threading.Thread(target=self.prof.wrap_thread(target), name=f"import-{name}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def outcomes(self) -> Iterator[RowOutcome]:
+        """Resultados na ordem da planilha; levanta o erro de qualquer estágio."""
+        while True:
+            try:
+                item = self._q_out.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set() and self._q_out.empty():
+                    return
+                continue
+            if item is _PIPELINE_END:
+                return
+            if isinstance(item, _StageError):
+                self.stop()
+                raise RuntimeError(f"Falha no estágio '{item.stage}' do import: {item.error}") from item.error
+            yield item
+
+    def stop(self) -> None:
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=5)
+
+
+# ============================
+# Várias bases (fan-out)
+# ============================
+
+FANOUT_STATUS_OK = "OK"
+FANOUT_STATUS_ERRORS = "COM_ERROS"
+FANOUT_STATUS_STOPPED = "PARADO"
+FANOUT_STATUS_FAILED = "FALHOU"
+
+
+@dataclass
+class TargetProfile:
+    name: str
+    base_url: str
+    auth_basic: str
+    cookie: str = ""
+    rate_limit: float = 0.0  # req/s; 0 = usa o limite geral
+
+
+def parse_target_profiles(text: str) -> Tuple[List[TargetProfile], List[str]]:
+    """Uma base por linha: ``nome;host;token[;cookie[;req/s]]`` (``#`` comenta). Retorna (perfis, erros)."""
+    profiles: List[TargetProfile] = []
+    errors: List[str] = []
+    seen: set = set()
+    for n, line in enumerate((text or "").splitlines(), start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = [_sanitize(p) for p in line.split(";")]
+        if len(parts) < 3 or not all(parts[:3]):
+            errors.append(f"linha {n}: esperado nome;host;token[;cookie[;req/s]]")
+            continue
+        name, host, token = parts[:3]
+        if name in seen:
+            errors.append(f"linha {n}: nome repetido '{name}'")
+            continue
+        try:
+            rate = float(parts[4].replace(",", ".")) if len(parts) > 4 and parts[4] else 0.0
+        except ValueError:
+            errors.append(f"linha {n}: req/s inválido '{parts[4]}'")
+            continue
+        seen.add(name)
+        profiles.append(TargetProfile(name, host.rstrip("/"), token, parts[3] if len(parts) > 3 else "", rate))
+    return profiles, errors
+
+
+def profile_config(base_cfg: Dict[str, Any], profile: TargetProfile) -> Dict[str, Any]:
+    """cfg da execução com host/token/cookie/limite da base (timeout e retries continuam os gerais)."""
+    out = dict(base_cfg)
+    out.update(
+        base_url=profile.base_url,
+        auth_basic=profile.auth_basic,
+        cookie=profile.cookie,
+        rate_limit=profile.rate_limit or float(base_cfg.get("rate_limit") or 0.0),
+    )
+    return out
+
+
+@dataclass
+class ImportJob:
+    """Uma planilha indo para um endpoint de uma base; ``tags`` identificam o job nos relatórios."""
+    tags: Dict[str, str]
+    cfg: Dict[str, Any]
+    endpoint_path: str
+    name_col: str
+    validate_fn: Any
+    source: "UploadSource"
+
+    @property
+    def label(self) -> str:
+        return " / ".join(self.tags.values())
+
+
+@dataclass
+class JobRun:
+    job: ImportJob
+    counts: Dict[str, int] = field(default_factory=lambda: {k: 0 for k in ProgressReporter.OUTCOMES})
+    seconds: float = 0.0
+    first_dispatch_seconds: Optional[float] = None
+    stopped: bool = False
+    error: str = ""
+    lookups: Optional[LookupStage] = None
+
+    @property
+    def status(self) -> str:
+        if self.error:
+            return FANOUT_STATUS_FAILED
+        if self.stopped:
+            return FANOUT_STATUS_STOPPED
+        return FANOUT_STATUS_ERRORS if self.counts["validation"] or self.counts["api"] else FANOUT_STATUS_OK
+
+
+class FanOutImport:
+    """Vários imports ao mesmo tempo (bases, abas ou os dois): um ``ImportPipeline`` com sessão própria por job.
+
+    Até ``max_workers`` jobs rodam juntos; o limite de req/s é o do host de cada um. Os resultados chegam
+    numa fila única etiquetados com o job; só a thread principal consome ``outcomes()``.
+    """
+
+    def __init__(
+        self,
+        jobs: List[ImportJob],
+        *,
+        dry_run: bool,
+        stop_on_error: bool = False,
+        resolve: bool = False,
+        max_workers: int = ENV_IXC_FANOUT_WORKERS,
+        queue_size: int = ENV_IXC_PIPELINE_QUEUE_SIZE,
+        prof: PhaseProfiler = NO_PROFILE,
+    ) -> None:
+        self.jobs = jobs
+        self.dry_run = dry_run
+        self.stop_on_error = stop_on_error
+        self.resolve = resolve  # um LookupResolver por job (os ids mudam de base para base)
+        self.max_workers = max(1, min(int(max_workers), len(jobs) or 1))
+        self.prof = prof
+        self.runs: List[JobRun] = [JobRun(j) for j in jobs]
+        self._q: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def _put(self, item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run_job(self, run: JobRun) -> None:
+        job = run.job
+        if self._stop.is_set():
+            self._put((job, _PIPELINE_END))
+            return
+        started = time.perf_counter()
+        resolver: Optional[LookupResolver] = None
+        if self.resolve:
+            try:
+                with self.prof.span("lookups"):
+                    resolver = LookupResolver(job.cfg, job.endpoint_path, job.source.columns)
+            except Exception as e:  # noqa: BLE001
+                run.error = f"Falha ao resolver referências: {e}"
+                run.seconds = time.perf_counter() - started
+                self._put((job, _PIPELINE_END))
+                return
+        pipeline = ImportPipeline(
+            job.cfg, job.endpoint_path, job.name_col, job.validate_fn, job.source.chunks(),
+            dry_run=self.dry_run, stop_on_error=self.stop_on_error,
+            prepare=resolver.resolve if resolver else None, prof=self.prof,
+        ).start()
+        try:
+            for out in pipeline.outcomes():
+                run.counts[out.outcome] += 1
+                if not self._put((job, out)):
+                    return
+                if self.stop_on_error and out.outcome != "ok":
+                    run.stopped = True
+                    break
+        except RuntimeError as e:
+            run.error = str(e)
+        finally:
+            pipeline.stop()
+            if resolver is not None:
+                run.lookups = resolver.stage()
+            run.seconds = time.perf_counter() - started
+            run.first_dispatch_seconds = pipeline.first_dispatch_seconds
+            self._put((job, _PIPELINE_END))
+
+    def start(self) -> "FanOutImport":
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fanout")
+        for run in self.runs:
+            self._pool.submit(self.prof.wrap_thread(self._run_job), run)
+        return self
+
+    def outcomes(self) -> Iterator[Tuple[ImportJob, RowOutcome]]:
+        """(job, resultado) na ordem em que os jobs respondem; termina quando todos acabam."""
+        pending = len(self.jobs)
+        while pending:
+            try:
+                job, item = self._q.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            if item is _PIPELINE_END:
+                pending -= 1
+                continue
+            yield job, item
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def summary_frame(self) -> pd.DataFrame:
+        """Uma linha por job: contagens, tempo, vazão e situação."""
+        rows = []
+        for run in self.runs:
+            done = sum(run.counts.values())
+            rows.append({
+                **run.job.tags,
+                "host": run.job.cfg["base_url"],
+                "status": run.status,
+                "ok": run.counts["ok"],
+                "validacao": run.counts["validation"],
+                "api": run.counts["api"],
+                "linhas_s": round(done / run.seconds, 1) if run.seconds > 0 else 0.0,
+                "segundos": round(run.seconds, 2),
+                "refs_invalidas": run.lookups.invalid_rows if run.lookups else "",
+                "erro": "; ".join([run.error] + (run.lookups.failed if run.lookups else [])).strip("; "),
+            })
+        return pd.DataFrame(rows)
+
+
+# ============================
+# Shared import UI
+# ============================
+
+UPLOAD_TYPES = ["xlsx", "csv", "parquet"]
+CHUNKED_UPLOAD_TYPES = ("csv", "parquet")  # lidos em blocos durante o envio; .xlsx é lido inteiro
+UPLOAD_PREVIEW_ROWS = 50
+CSV_DELIMITERS = (";", ",", "\t", "|")
+CSV_BLOCK_BYTES = 4 * 1024 * 1024
+PARQUET_BATCH_ROWS = 50_000
+
+
+# backend do read_excel -> módulo que precisa estar instalado (em ordem de preferência no "auto")
+XLSX_BACKENDS = {"calamine": "python_calamine", "openpyxl": "openpyxl"}
+XLSX_HINT_BYTES = 5 * 1024 * 1024
 
 
-def row_to_payload(row: pd.Series) -> Dict[str, str]:
-    return {str(k).strip(): normalize_value(v) for k, v in row.items()}
+def available_xlsx_backends() -> List[str]:
+    return [name for name, module in XLSX_BACKENDS.items() if importlib.util.find_spec(module) is not None]
 
 
-def validate_required(payload: Dict[str, str], required: List[str]) -> List[str]:
-    errors: List[str] = []
-    for f in required:
-        if f not in payload or _is_empty(payload.get(f)):
-            errors.append(f"Campo obrigatório ausente/vazio: {f}")
-    return errors
+def xlsx_backend(preferred: str = ENV_IXC_XLSX_BACKEND) -> str:
+    """Backend efetivo: o pedido (IXC_XLSX_BACKEND) se instalado; senão o mais rápido disponível."""
+    available = available_xlsx_backends()
+    if preferred in available:
+        return preferred
+    return available[0] if available else "openpyxl"
 
 
-def validate_assunto(payload: Dict[str, str]) -> List[str]:
-    errors = validate_required(payload, REQUIRED_ASSUNTO)
-    for flag_field, qty_field in COND_ASSUNTO:
-        flag_val = (payload.get(flag_field) or "").strip().upper()
-        if flag_val == "S":
-            qty_val = (payload.get(qty_field) or "").strip()
-            if qty_val in ("", "0", "0.0"):
-                errors.append(f"Campo '{qty_field}' é obrigatório quando '{flag_field}' = 'S'")
-    return errors
+def read_xlsx(data: bytes, *, sheet_name: Any = 0, dtype: Any = None, backend: Optional[str] = None) -> Any:
+    """``pd.read_excel`` pelo backend escolhido (calamine, em Rust, quando instalado; openpyxl senão).
 
+    Os dois devolvem os mesmos dtypes e o mesmo ``normalize_value`` por célula (bench/xlsx_backends.py confere).
+    """
+    return pd.read_excel(io.BytesIO(data), sheet_name=sheet_name, dtype=dtype, engine=backend or xlsx_backend())
 
-def validate_diagnostico(payload: Dict[str, str]) -> List[str]:
-    return validate_required(payload, REQUIRED_DIAGNOSTICO)
 
+@st.cache_data(show_spinner=False, max_entries=4)
+def read_sheet(data: bytes, as_text: bool = False) -> pd.DataFrame:
+    """Lê a planilha uma vez por upload (os reruns e o clique em "Criar" reaproveitam o resultado)."""
+    df = read_xlsx(data, dtype=str if as_text else None)
+    df.columns = [str(c).strip() for c in df.columns]
+    return df
 
-# ============================
-# Sidebar (buttons — same tab)
-# ============================
 
-with st.sidebar:
-    logo_path = Path(__file__).parent / "assets" / "logo-isp-consulte.png"
-    if logo_path.exists():
-        st.image(str(logo_path), use_container_width=True)
+def sniff_csv(data: bytes, sample_bytes: int = 64 * 1024) -> Tuple[str, str]:
+    """(encoding, delimitador) de um CSV: UTF-8 (com ou sem BOM) ou cp1252, o "CSV" do Excel pt-BR.
+
+    O delimitador é o mais frequente no cabeçalho entre ``;``, ``,``, tab e ``|``.
+    """
+    if data.startswith(codecs.BOM_UTF8):
+        encoding = "utf-8-sig"
     else:
-        st.markdown("<div class='sidebar-title'>ISP Consulte</div>", unsafe_allow_html=True)
-    st.markdown("<hr style='opacity:.25; margin:10px 0 14px 0;'>", unsafe_allow_html=True)
+        try:
+            # final=False: um caractere cortado no fim da amostra não conta como erro
+            codecs.getincrementaldecoder("utf-8")().decode(data[:sample_bytes], final=False)
+            encoding = "utf-8"
+        except UnicodeDecodeError:
+            encoding = "cp1252"
+    header = data[:sample_bytes].decode(encoding, errors="replace").lstrip("\ufeff").splitlines()
+    first = header[0] if header else ""
+    delimiter = max(CSV_DELIMITERS, key=first.count) if first else ";"
+    return encoding, delimiter
+
+
+def iter_csv_chunks(data: bytes, *, block_bytes: int = CSV_BLOCK_BYTES) -> Iterator[pa.RecordBatch]:
+    """CSV em blocos de ~``block_bytes`` (leitor em streaming do Arrow); tudo como texto, vazio = nulo."""
+    encoding, delimiter = sniff_csv(data)
+    buf = pa.py_buffer(data)
+    if encoding == "utf-8-sig":
+        buf, encoding = buf.slice(len(codecs.BOM_UTF8)), "utf-8"
+    header = next(csv.reader(io.StringIO(data[:64 * 1024].decode(encoding, errors="replace").lstrip("\ufeff")), delimiter=delimiter), [])
+    reader = pacsv.open_csv(
+        pa.BufferReader(buf),
+        read_options=pacsv.ReadOptions(encoding=encoding, block_size=block_bytes),
+        parse_options=pacsv.ParseOptions(delimiter=delimiter, newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(
+            column_types={name: pa.string() for name in header},
+            strings_can_be_null=True,
+            null_values=[""],
+        ),
+    )
+    yield from reader
 
 
-if st.sidebar.button("🏠 " + tr("home"), use_container_width=True):
-    set_page("home")
+def iter_parquet_chunks(data: bytes, *, batch_rows: int = PARQUET_BATCH_ROWS) -> Iterator[pa.RecordBatch]:
+    """Parquet em lotes de ``batch_rows`` linhas (um row group por vez)."""
+    pf = pq.ParquetFile(pa.BufferReader(pa.py_buffer(data)))
+    yield from pf.iter_batches(batch_size=batch_rows)
 
-if st.sidebar.button("🧾 " + tr("create_subjects"), use_container_width=True):
-    set_page("subjects")
 
-if st.sidebar.button("📝 " + tr("manage_subjects"), use_container_width=True):
-    set_page("manage_subjects")
+def upload_chunks(data: bytes, filename: str) -> Iterator[pd.DataFrame]:
+    """CSV/Parquet -> um DataFrame por bloco Arrow (o bloco Arrow é descartado em seguida), colunas aparadas.
 
-if st.sidebar.button("🩺 " + tr("create_diagnostics"), use_container_width=True):
-    set_page("diagnostics")
-st.sidebar.markdown("---")
-if st.sidebar.button("⚙️ " + tr("settings"), use_container_width=True):
-    set_page("settings")
+    O índice continua de um bloco para o outro (linha do arquivo - 2, como no .xlsx). As colunas seguem texto:
+    "01234" continua com o zero à esquerda e códigos longos não estouram int64.
+    """
+    ext = Path(filename or "").suffix.lower().lstrip(".")
+    batches = iter_csv_chunks(data) if ext == "csv" else iter_parquet_chunks(data)
+    start = 0
+    for batch in batches:
+        df = batch.to_pandas()
+        df.columns = [str(c).strip() for c in df.columns]
+        df.index = pd.RangeIndex(start, start + len(df))
+        start += len(df)
+        yield df
 
 
-cfg = get_runtime_config()
+def read_upload(data: bytes, filename: str) -> pd.DataFrame:
+    """Planilha enviada (.xlsx, .csv ou .parquet) inteira num DataFrame (o import usa ``upload_source``)."""
+    ext = Path(filename or "").suffix.lower().lstrip(".")
+    if ext not in CHUNKED_UPLOAD_TYPES:
+        return read_sheet(data)
+    frames = list(upload_chunks(data, filename))
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames) if len(frames) > 1 else frames[0]
 
 
-# ============================
-# Shared import UI
-# ============================
+def drop_empty_names(df: pd.DataFrame, name_col: str) -> pd.DataFrame:
+    df = df[~df[name_col].isna()]
+    return df[df[name_col].astype(str).str.strip() != ""]
+
+
+@dataclass
+class UploadSource:
+    """Linhas de uma planilha para o import. ``chunks()`` recomeça do início a cada chamada (um job do fan-out
+    por chamada); no CSV/Parquet relê o arquivo bloco a bloco, então a planilha nunca fica inteira em pandas."""
+    columns: List[str]
+    rows: int  # linhas no arquivo
+    total: int  # linhas que vão para o pipeline (sem as de nome vazio, se for o caso)
+    preview: pd.DataFrame
+    chunks: Callable[[], Iterator[pd.DataFrame]]
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, rows: Optional[int] = None) -> "UploadSource":
+        return cls([str(c) for c in df.columns], len(df) if rows is None else rows, len(df), df.head(UPLOAD_PREVIEW_ROWS), lambda: iter([df]))
+
+
+def _count_named_rows(batch: pa.RecordBatch, name_col: str) -> int:
+    """Linhas com ``name_col`` preenchido (mesmo critério de ``drop_empty_names``), sem passar pelo pandas."""
+    col = batch.column(batch.schema.get_field_index(name_col))
+    if not pa.types.is_string(col.type) and not pa.types.is_large_string(col.type):
+        col = pc.cast(col, pa.string())
+    return int(pc.sum(pc.not_equal(pc.utf8_trim_whitespace(col), "")).as_py() or 0)
+
+
+def upload_source(data: bytes, filename: str, name_col: str, skip_empty: bool) -> UploadSource:
+    """.xlsx: lido inteiro (``read_sheet``, com cache). CSV/Parquet: uma passada só no Arrow para colunas,
+    contagem e prévia; os blocos em pandas só existem durante o envio, um por vez."""
+    ext = Path(filename or "").suffix.lower().lstrip(".")
+    if ext not in CHUNKED_UPLOAD_TYPES:
+        df = read_sheet(data)
+        rows = len(df)
+        if skip_empty and name_col in df.columns:
+            df = drop_empty_names(df, name_col)
+        return UploadSource.from_frame(df, rows)
+
+    def chunks() -> Iterator[pd.DataFrame]:
+        for df in upload_chunks(data, filename):
+            if skip_empty and name_col in df.columns:
+                df = drop_empty_names(df, name_col)
+            if len(df):
+                yield df
+
+    batches = iter_csv_chunks(data) if ext == "csv" else iter_parquet_chunks(data)
+    columns: List[str] = []
+    rows = total = 0
+    for batch in batches:
+        raw_names = batch.schema.names
+        columns = columns or [str(c).strip() for c in raw_names]
+        rows += batch.num_rows
+        if skip_empty and name_col in columns:
+            total += _count_named_rows(batch, raw_names[columns.index(name_col)])
+        else:
+            total += batch.num_rows
+    preview = next(chunks(), pd.DataFrame(columns=columns)).head(UPLOAD_PREVIEW_ROWS)
+    return UploadSource(columns, rows, total, preview, chunks)
+
+
+def cached_upload_source(uploaded: Any, name_col: str, skip_empty: bool, key: str) -> UploadSource:
+    """``upload_source`` memoizado na sessão pelo id do upload (os reruns não relêem nem fazem hash do arquivo)."""
+    memo_key = (uploaded.file_id, name_col, skip_empty)
+    memo = st.session_state.get(key)
+    if memo is not None and memo[0] == memo_key:
+        return memo[1]
+    source = upload_source(uploaded.getvalue(), uploaded.name, name_col, skip_empty)
+    st.session_state[key] = (memo_key, source)
+    return source
+
+
+# abas da pasta combinada -> (endpoint, coluna do nome, validação)
+WORKBOOK_SHEETS: Dict[str, Tuple[str, str, Any]] = {
+    "Assuntos": (ENDPOINT_ASSUNTO, "assunto", validate_assunto),
+    "Diagnósticos": (ENDPOINT_DIAGNOSTICO, "descricao", validate_diagnostico),
+}
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def read_workbook(data: bytes) -> Dict[str, pd.DataFrame]:
+    """Todas as abas numa leitura só (o zip do .xlsx é aberto uma vez), por nome da aba."""
+    sheets = read_xlsx(data, sheet_name=None)
+    for df in sheets.values():
+        df.columns = [str(c).strip() for c in df.columns]
+    return sheets
+
+
+def match_workbook_sheets(sheets: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """Abas da pasta que correspondem a WORKBOOK_SHEETS, na ordem de WORKBOOK_SHEETS."""
+    by_key = {fold_text(name): df for name, df in sheets.items()}
+    return {label: by_key[fold_text(label)] for label in WORKBOOK_SHEETS if fold_text(label) in by_key}
+
 
 def import_page(
     *,
@@ -889,9 +3949,33 @@ def import_page(
     validate_fn,
     skip_label: str,
     report_prefix: str,
+) -> None:
+    prof = new_profiler(f"import_{report_prefix}", cfg)
+    with prof:
+        _import_page(
+            page_title=page_title,
+            endpoint_path=endpoint_path,
+            name_col=name_col,
+            validate_fn=validate_fn,
+            skip_label=skip_label,
+            report_prefix=report_prefix,
+            prof=prof,
+        )
+    prof.render()
+
+
+def _import_page(
+    *,
+    page_title: str,
+    endpoint_path: str,
+    name_col: str,
+    validate_fn,
+    skip_label: str,
+    report_prefix: str,
+    prof: PhaseProfiler,
 ) -> None:
     st.title(page_title)
-    st.caption("Envie o .xlsx, valide e crie no IXC com progresso e relatório de erros.")
+    st.caption("Envie o .xlsx (ou .csv/.parquet), valide e crie no IXC com progresso e relatório de erros.")
 
     with st.expander(tr("templates"), expanded=False):
         templates_block()
@@ -905,7 +3989,7 @@ def import_page(
             st.write(f"- Cookie informado: `{bool(_sanitize(cfg.get('cookie') or ''))}`")
             st.write(f"- Endpoint: `{cfg['base_url']}{endpoint_path}`")
 
-    uploaded = st.file_uploader(tr("upload_xlsx"), type=["xlsx"], key=f"uploader_{report_prefix}")
+    uploaded = st.file_uploader(tr("upload_sheet"), type=UPLOAD_TYPES, key=f"uploader_{report_prefix}")
 
     colA, colB, colC, colD = st.columns([1, 1, 1, 1])
     with colA:
@@ -916,171 +4000,375 @@ def import_page(
         skip_empty = st.checkbox(skip_label, value=True, key=f"skip_{report_prefix}")
     with colD:
         show_payload_preview = st.checkbox("Mostrar preview do payload", value=False, key=f"preview_{report_prefix}")
+    resolve = lookup_checkbox(endpoint_path, report_prefix)
+
+    fanout_targets = fanout_picker(report_prefix)
 
     if uploaded is None:
         st.info(tr("need_file"))
         return
 
     try:
-        df = pd.read_excel(uploaded)
+        with prof.span("read_excel"):
+            source = cached_upload_source(uploaded, name_col, skip_empty, key=f"upload_source_{report_prefix}")
     except Exception as e:
-        st.error(f"Não consegui ler o arquivo .xlsx: {e}")
+        st.error(f"Não consegui ler o arquivo {Path(uploaded.name).suffix}: {e}")
         return
 
-    if df.empty:
+    if uploaded.name.lower().endswith(".xlsx") and uploaded.size >= XLSX_HINT_BYTES and xlsx_backend() == "openpyxl":
+        st.caption(tr("hint_xlsx_calamine"))
+    if uploaded.name.lower().endswith(".csv"):
+        encoding, delimiter = sniff_csv(uploaded.getvalue())
+        st.caption(tr("msg_csv_detected").format(encoding=encoding, delimiter={"\t": "tab"}.get(delimiter, delimiter)))
+
+    if not source.rows:
         st.warning("A planilha está vazia.")
         return
 
-    df.columns = [str(c).strip() for c in df.columns]
-    if name_col not in df.columns:
+    if name_col not in source.columns:
         st.error(tr("need_column") + f"'{name_col}'")
         return
 
-    df_work = df.copy()
-    if skip_empty:
-        df_work = df_work[~df_work[name_col].isna()]
-        df_work = df_work[df_work[name_col].astype(str).str.strip() != ""]
-
-    total = len(df_work)
+    total = source.total
 
     st.subheader(tr("summary"))
     st.write(f"**Total para criar:** {total}")
-    st.write(f"**Total de colunas (campos):** {len(df_work.columns)}")
+    st.write(f"**Total de colunas (campos):** {len(source.columns)}")
 
-    with st.expander(tr("preview_sheet")):
-        st.dataframe(df_work.head(50), use_container_width=True)
+    with st.expander(tr("preview_sheet")), prof.span("render"):
+        st.dataframe(source.preview, use_container_width=True)
 
     run = st.button(tr("run_validate") if dry_run else tr("run_create"), type="primary", key=f"run_{report_prefix}")
     if not run:
         return
 
+    if st.session_state.get(f"fanout_{report_prefix}"):
+        if not fanout_targets:
+            st.error(tr("msg_fanout_none"))
+            return
+        jobs = [
+            ImportJob({"base": p.name}, profile_config(cfg, p), endpoint_path, name_col, validate_fn, source)
+            for p in fanout_targets
+        ]
+        _run_jobs(jobs, report_prefix=report_prefix, dry_run=dry_run, stop_on_error=stop_on_error, resolve=resolve, prof=prof)
+        return
+
     if not dry_run and (not cfg["base_url"] or not cfg["auth_basic"]):
         st.error("Configure Host e Token antes de criar.")
         return
 
-    progress = st.progress(0)
-    status = st.empty()
+    resolver: Optional[LookupResolver] = None
+    if resolve and cfg["base_url"] and cfg["auth_basic"]:
+        try:
+            with st.spinner(tr("msg_resolving_lookups")), prof.span("lookups"):
+                resolver = LookupResolver(cfg, endpoint_path, source.columns)
+        except Exception as e:
+            st.error(f"Falha ao resolver referências: {e}")
+            return
+
+    reporter = ProgressReporter(total, tr("run_validate") if dry_run else tr("run_create"), profiler=prof)
 
-    results: List[Dict[str, Any]] = []
-    responses_compact: List[Dict[str, Any]] = []
+    report = new_report_writer(f"report_import_{report_prefix}", f"import_{report_prefix}", cfg)
     created = 0
     errors = 0
 
-    for i, (idx, row) in enumerate(df_work.iterrows(), start=1):
-        payload = row_to_payload(row)
-        item_name = payload.get(name_col, f"(linha {idx})")
-        validation_errors = validate_fn(payload)
+    pipeline = ImportPipeline(
+        cfg, endpoint_path, name_col, validate_fn, source.chunks(),
+        dry_run=dry_run, stop_on_error=stop_on_error, prepare=resolver.resolve if resolver else None, prof=prof,
+    ).start()
+    try:
+        for out in pipeline.outcomes():
+            if show_payload_preview:
+                with st.expander(f"Payload (linha {out.result['linha_excel'] - 2}) — {out.item_name}"):
+                    st.json(out.payload)
 
-        if show_payload_preview:
-            with st.expander(f"Payload (linha {idx}) — {item_name}"):
-                st.json(payload)
+            with prof.span("report"):
+                report.write(out.result, out.compact)
+            reporter.step(out.outcome, out.item_name)
 
-        result_row: Dict[str, Any] = {
-            "linha_excel": int(idx) + 2,
-            name_col: item_name,
-            "status": "",
-            "http_status": "",
-            "mensagem": "",
-        }
+            if out.outcome == "ok":
+                created += 1
+                continue
 
-        if validation_errors:
             errors += 1
-            msg = " | ".join(validation_errors)
-            result_row.update({"status": "ERRO_VALIDACAO", "mensagem": msg})
-            results.append(result_row)
-            responses_compact.append({
-                name_col: item_name,
-                "linha_excel": result_row["linha_excel"],
-                "ok": False,
-                "tipo": "validacao",
-                "erros": validation_errors,
-                "payload": payload,
-            })
-
             if stop_on_error:
-                status.error(f"Erro de validação na linha {result_row['linha_excel']}: {item_name}")
+                if out.outcome == "validation":
+                    reporter.error(f"Erro de validação na linha {out.result['linha_excel']}: {out.item_name}")
+                else:
+                    reporter.error(f"Erro na API ao criar '{out.item_name}'.")
                 break
+        else:
+            reporter.finish()
+    except RuntimeError as e:
+        reporter.error(str(e))
+    finally:
+        pipeline.stop()
 
-            status.warning(f"[{i}/{total}] Validação falhou: {item_name}")
-            progress.progress(int(i / max(total, 1) * 100))
-            continue
+    if pipeline.first_dispatch_seconds is not None:
+        st.caption(tr("msg_first_dispatch").format(seconds=pipeline.first_dispatch_seconds))
+    if resolver is not None:
+        lookup_summary(resolver.stage())
 
-        if dry_run:
-            created += 1
-            result_row.update({"status": "OK_VALIDADO", "mensagem": "Payload válido (dry run)."})
-            results.append(result_row)
-            responses_compact.append({
-                name_col: item_name,
-                "linha_excel": result_row["linha_excel"],
-                "ok": True,
-                "tipo": "dry_run",
-                "payload": payload,
-            })
-            status.info(f"[{i}/{total}] Validado: {item_name}")
-            progress.progress(int(i / max(total, 1) * 100))
-            continue
+    st.divider()
+    st.subheader(tr("result"))
+    st.write(f"✅ {tr('created')}: **{created}**")
+    st.write(f"❌ {tr('errors')}: **{errors}**")
 
-        status.info(f"[{i}/{total}] Criando: {item_name}")
-        resp = post_to_endpoint(cfg, endpoint_path, payload)
+    with prof.span("report"):
+        result_df = report.preview_frame()
+        report.close()
+    if report.rows > len(result_df):
+        st.caption(tr("msg_report_preview").format(n=len(result_df), total=report.rows))
+    with prof.span("render"):
+        st.dataframe(result_df, use_container_width=True, height=420)
 
-        responses_compact.append({
-            name_col: item_name,
-            "linha_excel": result_row["linha_excel"],
-            "ok": resp.ok,
-            "http_status": resp.http_status,
-            "response_json": resp.data,
-            "response_text": resp.text[:5000],
-            "payload": payload,
-        })
-
-        if resp.ok:
-            created += 1
-            msg = ""
-            if isinstance(resp.data, dict):
-                msg = str(resp.data.get("message") or resp.data.get("msg") or "")
-            result_row.update({"status": "CRIADO", "http_status": resp.http_status, "mensagem": msg})
-            results.append(result_row)
-        else:
-            errors += 1
-            msg = ""
-            if isinstance(resp.data, dict):
-                msg = str(resp.data.get("message") or resp.data.get("msg") or resp.data)
-            else:
-                msg = resp.text
-            result_row.update({"status": "ERRO_API", "http_status": resp.http_status, "mensagem": msg})
-            results.append(result_row)
+    st.subheader(tr("downloads"))
+    report_downloads(report, report_prefix)
+
+
+def fanout_picker(key_prefix: str) -> List[TargetProfile]:
+    """Expander do modo várias bases; devolve as bases escolhidas ([] = só a base das Configurações)."""
+    targets, target_errors = parse_target_profiles(cfg.get("targets") or "")
+    if not targets and not target_errors:
+        return []
+    chosen: List[TargetProfile] = []
+    with st.expander(tr("fanout_title"), expanded=False):
+        if target_errors:
+            st.warning(tr("msg_fanout_invalid").format(errors="; ".join(target_errors)))
+        fanout = st.checkbox(tr("label_fanout"), value=False, key=f"fanout_{key_prefix}", disabled=not targets)
+        names = st.multiselect(
+            tr("label_fanout_targets"),
+            [p.name for p in targets],
+            default=[p.name for p in targets],
+            key=f"fanout_targets_{key_prefix}",
+            disabled=not fanout,
+        )
+        st.dataframe(
+            pd.DataFrame([
+                {"base": p.name, "host": p.base_url, "token": mask_middle(p.auth_basic), "req/s": p.rate_limit or cfg["rate_limit"] or ""}
+                for p in targets
+            ]),
+            use_container_width=True,
+            hide_index=True,
+        )
+        if fanout:
+            chosen = [p for p in targets if p.name in names]
+    return chosen
+
+
+def lookup_checkbox(endpoint_path: str, key_prefix: str) -> bool:
+    """Opção "resolver nomes -> ids" (só aparece se IXC_LOOKUPS declara campos de referência do endpoint)."""
+    specs = lookup_specs(endpoint_path)
+    if not specs:
+        return False
+    return st.checkbox(
+        tr("label_resolve_lookups"),
+        value=False,
+        key=f"lookups_{key_prefix}",
+        help=tr("help_resolve_lookups").format(fields=", ".join(sp.field for sp in specs)),
+    )
+
+
+def lookup_summary(stage: LookupStage) -> None:
+    for msg in stage.failed:
+        st.warning(tr("msg_lookup_failed").format(detail=msg))
+    if stage.summary:
+        with st.expander(tr("lookups_title"), expanded=stage.has_invalid):
+            st.dataframe(stage.summary_frame(), use_container_width=True, hide_index=True)
 
-            if stop_on_error:
-                status.error(f"Erro na API ao criar '{item_name}'.")
-                break
 
-        progress.progress(int(i / max(total, 1) * 100))
+def _run_jobs(
+    jobs: List[ImportJob],
+    *,
+    report_prefix: str,
+    dry_run: bool,
+    stop_on_error: bool,
+    prof: PhaseProfiler,
+    resolve: bool = False,
+) -> None:
+    """Roda os jobs em paralelo com um relatório único e mostra o resultado por job (e a matriz linha x base)."""
+    label = tr("run_validate") if dry_run else tr("run_create")
+    reporter = ProgressReporter(sum(j.source.total for j in jobs), f"{label} ({len(jobs)} jobs)", profiler=prof)
+    report = new_report_writer(f"report_import_{report_prefix}", f"import_{report_prefix}_jobs", cfg)
+    # mesma coluna de nome em todos os jobs: o relatório mantém o nome dela
+    name_key = jobs[0].name_col if len({j.name_col for j in jobs}) == 1 else "item"
+    by_base = all("base" in j.tags for j in jobs)
+    matrix: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+
+    fan = FanOutImport(jobs, dry_run=dry_run, stop_on_error=stop_on_error, resolve=resolve, prof=prof).start()
+    try:
+        for job, out in fan.outcomes():
+            row = {
+                **job.tags,
+                "linha_excel": out.result["linha_excel"],
+                name_key: out.item_name,
+                "status": out.result["status"],
+                "http_status": out.result["http_status"],
+                "mensagem": out.result["mensagem"],
+            }
+            with prof.span("report"):
+                report.write(row, {**job.tags, **out.compact})
+            if by_base:
+                rest = {k: v for k, v in job.tags.items() if k != "base"}
+                key = (*rest.values(), row["linha_excel"])
+                matrix.setdefault(key, {**rest, "linha_excel": row["linha_excel"], name_key: out.item_name})[job.tags["base"]] = row["status"]
+            reporter.step(out.outcome, f"{job.label}: {out.item_name}")
+        reporter.finish()
+    finally:
+        fan.stop()
 
     st.divider()
-    st.subheader(tr("result"))
-    st.write(f"✅ {tr('created')}: **{created}**")
-    st.write(f"❌ {tr('errors')}: **{errors}**")
+    st.subheader(tr("fanout_matrix"))
+    with prof.span("render"):
+        st.dataframe(fan.summary_frame(), use_container_width=True, hide_index=True)
+    for run in fan.runs:
+        if run.error:
+            st.error(f"{run.job.label}: {run.error}")
+    stages = [(run.job.label, run.lookups) for run in fan.runs if run.lookups is not None and run.lookups.summary]
+    if stages:
+        with st.expander(tr("lookups_title"), expanded=any(stage.has_invalid for _, stage in stages)):
+            st.dataframe(
+                pd.concat([stage.summary_frame().assign(job=label) for label, stage in stages], ignore_index=True),
+                use_container_width=True,
+                hide_index=True,
+            )
 
-    result_df = pd.DataFrame(results)
-    st.dataframe(result_df, use_container_width=True, height=420)
+    if by_base:
+        bases = list(dict.fromkeys(j.tags["base"] for j in jobs))
+        matrix_df = pd.DataFrame([matrix[k] for k in sorted(matrix)])
+        matrix_df = matrix_df.reindex(columns=[c for c in matrix_df.columns if c not in bases] + bases).fillna("")
+        with st.expander(tr("fanout_rows"), expanded=False), prof.span("render"):
+            if len(matrix_df) > RESULT_PREVIEW_ROWS:
+                st.caption(tr("msg_report_preview").format(n=RESULT_PREVIEW_ROWS, total=len(matrix_df)))
+            st.dataframe(matrix_df.head(RESULT_PREVIEW_ROWS), use_container_width=True, hide_index=True)
+    else:
+        with prof.span("report"):
+            result_df = report.preview_frame()
+        if report.rows > len(result_df):
+            st.caption(tr("msg_report_preview").format(n=len(result_df), total=report.rows))
+        with prof.span("render"):
+            st.dataframe(result_df, use_container_width=True, height=420)
 
     st.subheader(tr("downloads"))
-    result_csv = result_df.to_csv(index=False).encode("utf-8-sig")
-    st.download_button(
-        tr("download_csv"),
-        data=result_csv,
-        file_name=f"relatorio_import_{report_prefix}.csv",
-        mime="text/csv",
-        key=f"dlcsv_{report_prefix}",
+    if by_base:
+        st.download_button(
+            tr("download_fanout_matrix"),
+            data=lambda: frame_to_csv_bytes(matrix_df),
+            file_name=f"matriz_{report_prefix}_bases.csv",
+            mime="text/csv",
+            on_click="ignore",
+            key=f"dlmatrix_{report_prefix}",
+        )
+    report_downloads(report, report_prefix)
+
+
+def page_workbook() -> None:
+    prof = new_profiler("import_pasta", cfg)
+    with prof:
+        _page_workbook(prof)
+    prof.render()
+
+
+def _page_workbook(prof: PhaseProfiler) -> None:
+    """Uma pasta com as abas Assuntos e Diagnósticos: lida uma vez, cada aba com a sua validação, envio em paralelo."""
+    st.title(tr("page_workbook_title"))
+    st.caption(tr("hint_workbook"))
+
+    with st.expander(tr("templates"), expanded=False):
+        templates_block()
+
+    uploaded = st.file_uploader(tr("upload_xlsx"), type=["xlsx"], key="uploader_pasta")
+
+    colA, colB, colC = st.columns([1, 1, 1])
+    with colA:
+        dry_run = st.checkbox("Somente validar (dry run)", value=False, key="dry_pasta")
+    with colB:
+        stop_on_error = st.checkbox("Parar no primeiro erro", value=False, key="stop_pasta")
+    with colC:
+        skip_empty = st.checkbox("Pular linhas com o nome vazio", value=True, key="skip_pasta")
+    lookup_fields = sorted({sp.field for ep, _, _ in WORKBOOK_SHEETS.values() for sp in lookup_specs(ep)})
+    resolve = bool(lookup_fields) and st.checkbox(
+        tr("label_resolve_lookups"),
+        value=False,
+        key="lookups_pasta",
+        help=tr("help_resolve_lookups").format(fields=", ".join(lookup_fields)),
+    )
+
+    fanout_targets = fanout_picker("pasta")
+
+    if uploaded is None:
+        st.info(tr("need_file"))
+        return
+
+    try:
+        with prof.span("read_excel"):
+            sheets = match_workbook_sheets(read_workbook(uploaded.getvalue()))
+    except Exception as e:
+        st.error(f"Não consegui ler o arquivo .xlsx: {e}")
+        return
+
+    for label in WORKBOOK_SHEETS:
+        if label not in sheets:
+            st.warning(tr("msg_workbook_missing_sheet").format(sheet=label))
+    if not sheets:
+        st.error(tr("msg_workbook_no_sheets").format(sheets=", ".join(WORKBOOK_SHEETS)))
+        return
+
+    work: Dict[str, pd.DataFrame] = {}
+    with prof.span("prepare"):
+        for label, df in sheets.items():
+            name_col = WORKBOOK_SHEETS[label][1]
+            if name_col not in df.columns:
+                st.error(f"{label}: " + tr("need_column") + f"'{name_col}'")
+                continue
+            if skip_empty:
+                df = drop_empty_names(df, name_col)
+            if not df.empty:
+                work[label] = df
+    if not work:
+        st.warning("A planilha está vazia.")
+        return
+
+    st.subheader(tr("summary"))
+    st.dataframe(
+        pd.DataFrame([
+            {"aba": label, "endpoint": WORKBOOK_SHEETS[label][0], "linhas": len(df), "colunas": len(df.columns)}
+            for label, df in work.items()
+        ]),
+        use_container_width=True,
+        hide_index=True,
     )
+    with st.expander(tr("preview_sheet")), prof.span("render"):
+        for tab, (label, df) in zip(st.tabs(list(work)), work.items()):
+            with tab:
+                st.dataframe(df.head(50), use_container_width=True)
+
+    run = st.button(tr("run_validate") if dry_run else tr("run_create"), type="primary", key="run_pasta")
+    if not run:
+        return
 
-    compact_json = json.dumps(responses_compact, ensure_ascii=False, indent=2).encode("utf-8")
-    st.download_button(
-        tr("download_json"),
-        data=compact_json,
-        file_name=f"compact_{report_prefix}.json",
-        mime="application/json",
-        key=f"dlj_{report_prefix}",
+    fanout = bool(st.session_state.get("fanout_pasta"))
+    if fanout and not fanout_targets:
+        st.error(tr("msg_fanout_none"))
+        return
+    if not fanout and not dry_run and (not cfg["base_url"] or not cfg["auth_basic"]):
+        st.error("Configure Host e Token antes de criar.")
+        return
+
+    targets: List[Tuple[Dict[str, str], Dict[str, Any]]] = (
+        [({"base": p.name}, profile_config(cfg, p)) for p in fanout_targets] if fanout else [({}, cfg)]
+    )
+    jobs = [
+        ImportJob(
+            {**tags, "aba": label}, job_cfg, WORKBOOK_SHEETS[label][0], WORKBOOK_SHEETS[label][1], WORKBOOK_SHEETS[label][2],
+            UploadSource.from_frame(df),
+        )
+        for tags, job_cfg in targets
+        for label, df in work.items()
+    ]
+    _run_jobs(
+        jobs, report_prefix="pasta", dry_run=dry_run, stop_on_error=stop_on_error,
+        resolve=resolve and (fanout or bool(cfg["base_url"] and cfg["auth_basic"])), prof=prof,
     )
 
 
@@ -1140,7 +4428,9 @@ def page_settings() -> None:
 
     cfg = get_runtime_config()
 
-    tab_auth, tab_pers = st.tabs([f"🔐 {tr('tab_auth')}", f"🎨 {tr('tab_personalization')}"])
+    tab_auth, tab_pers, tab_metrics = st.tabs(
+        [f"🔐 {tr('tab_auth')}", f"🎨 {tr('tab_personalization')}", f"📈 {tr('tab_metrics')}"]
+    )
 
     with tab_auth:
 
@@ -1195,6 +4485,42 @@ def page_settings() -> None:
                     step=0.5,
                     key="form_cfg_retry_backoff_seconds",
                 )
+                profile = st.checkbox(
+                    tr("label_profile"),
+                    value=bool(cfg["profile"]),
+                    key="form_cfg_profile",
+                    help="Também ativável com IXC_PROFILE=1 no .env.",
+                )
+                profile_cprofile = st.checkbox(
+                    tr("label_profile_cprofile"),
+                    value=bool(cfg["profile_cprofile"]),
+                    key="form_cfg_profile_cprofile",
+                    help=f"Arquivos .prof em {ENV_IXC_PROFILE_DIR} (IXC_PROFILE_DIR).",
+                )
+                gzip_reports = st.checkbox(
+                    tr("label_gzip_reports"),
+                    value=bool(cfg["gzip_reports"]),
+                    key="form_cfg_gzip_reports",
+                    help="Também ativável com IXC_GZIP_REPORTS=1 no .env.",
+                )
+                rate_limit = st.number_input(
+                    tr("label_rate_limit"),
+                    min_value=0.0,
+                    max_value=1000.0,
+                    value=float(cfg["rate_limit"]),
+                    step=1.0,
+                    key="form_cfg_rate_limit",
+                    help="Padrão: IXC_RATE_LIMIT no .env.",
+                )
+
+            targets = st.text_area(
+                tr("label_targets"),
+                value=cfg["targets"],
+                key="form_cfg_targets",
+                height=120,
+                placeholder="cliente_a;https://ixc.cliente-a.com.br;17:xxxx\ncliente_b;https://ixc.cliente-b.com.br;9:yyyy;;5",
+                help="Uma base por linha: nome;host;token[;cookie[;req/s]]. Padrão: arquivo em IXC_TARGETS_FILE.",
+            )
 
             st.markdown("---")
             c1, c2, c3, c4 = st.columns([1, 1, 1, 2])
@@ -1207,6 +4533,12 @@ def page_settings() -> None:
                     step=1,
                     key="form_mg_rp",
                 )
+                rp_auto = st.checkbox(
+                    tr("label_rp_auto"),
+                    value=bool(st.session_state.get("mg_rp_auto", ENV_IXC_RP_AUTO)),
+                    key="form_mg_rp_auto",
+                    help=tr("help_rp_auto").format(target=ENV_IXC_RP_TARGET_SECONDS),
+                )
             with c2:
                 max_pages = st.number_input(
                     tr("label_max_pages"),
@@ -1216,6 +4548,12 @@ def page_settings() -> None:
                     step=1,
                     key="form_mg_max_pages",
                 )
+                keyset = st.checkbox(
+                    tr("label_keyset"),
+                    value=bool(st.session_state.get("mg_keyset", ENV_IXC_LIST_KEYSET)),
+                    key="form_mg_keyset",
+                    help=tr("help_keyset"),
+                )
             with c3:
                 max_total = st.number_input(
                     tr("label_max_total"),
@@ -1245,7 +4583,14 @@ def page_settings() -> None:
             st.session_state["cfg_timeout_seconds"] = float(ENV_IXC_TIMEOUT_SECONDS)
             st.session_state["cfg_max_retries"] = int(ENV_IXC_MAX_RETRIES)
             st.session_state["cfg_retry_backoff_seconds"] = float(ENV_IXC_RETRY_BACKOFF_SECONDS)
+            st.session_state["cfg_profile"] = ENV_IXC_PROFILE
+            st.session_state["cfg_profile_cprofile"] = ENV_IXC_PROFILE_CPROFILE
+            st.session_state["cfg_gzip_reports"] = ENV_IXC_GZIP_REPORTS
+            st.session_state["cfg_rate_limit"] = float(ENV_IXC_RATE_LIMIT)
+            st.session_state["cfg_targets"] = ENV_IXC_TARGETS
             st.session_state["mg_rp"] = 1000
+            st.session_state["mg_rp_auto"] = ENV_IXC_RP_AUTO
+            st.session_state["mg_keyset"] = ENV_IXC_LIST_KEYSET
             st.session_state["mg_max_pages"] = 50
             st.session_state["mg_max_total"] = 0
             st.success(tr("restored_env_ok"))
@@ -1258,8 +4603,15 @@ def page_settings() -> None:
             st.session_state["cfg_timeout_seconds"] = float(timeout_seconds)
             st.session_state["cfg_max_retries"] = int(max_retries)
             st.session_state["cfg_retry_backoff_seconds"] = float(retry_backoff_seconds)
+            st.session_state["cfg_profile"] = bool(profile)
+            st.session_state["cfg_profile_cprofile"] = bool(profile_cprofile)
+            st.session_state["cfg_gzip_reports"] = bool(gzip_reports)
+            st.session_state["cfg_rate_limit"] = float(rate_limit)
+            st.session_state["cfg_targets"] = targets or ""
             st.session_state["mg_rp"] = int(rp)
+            st.session_state["mg_rp_auto"] = bool(rp_auto)
             st.session_state["mg_max_pages"] = int(max_pages)
+            st.session_state["mg_keyset"] = bool(keyset)
             st.session_state["mg_max_total"] = int(max_total)
             st.success(tr("applied_session_ok"))
             st.rerun()
@@ -1307,6 +4659,78 @@ def page_settings() -> None:
         if changed:
             st.rerun()
 
+    with tab_metrics:
+        metrics_panel()
+
+
+def metrics_panel() -> None:
+    """Latência p50/p95/p99, retries, backoff e vazão por endpoint (todas as sessões deste servidor)."""
+    metrics = get_request_metrics()
+    st.caption(tr("metrics_help"))
+    cassette = get_cassette(ENV_IXC_CASSETTE, ENV_IXC_CASSETTE_MODE, ENV_IXC_CASSETTE_FALLBACK)
+    if cassette is not None:
+        st.info(tr("cassette_active").format(mode=cassette.mode, path=cassette.path, n=cassette.recorded, misses=cassette.misses,
+                                               fallbacks=cassette.fallbacks))
+    listing = get_listing_cache().stats()
+    st.caption(tr("listing_cache_stats").format(**listing))
+    page_cache = get_page_cache()
+    if page_cache is not None:
+        st.caption(tr("page_cache_stats").format(**page_cache.stats()))
+    summary = metrics.summary()
+    if summary.empty:
+        st.info(tr("metrics_empty"))
+    else:
+        st.dataframe(summary, use_container_width=True, hide_index=True)
+
+    m1, m2, m3 = st.columns([1, 1, 1])
+    with m1:
+        st.download_button(
+            tr("download_metrics_prom"),
+            data=lambda: metrics.to_prometheus(),
+            file_name="ixc_metrics.prom",
+            mime="text/plain",
+            on_click="ignore",
+            use_container_width=True,
+            key="dl_metrics_prom",
+        )
+    with m2:
+        st.download_button(
+            tr("download_metrics_json"),
+            data=lambda: metrics.to_json(),
+            file_name="ixc_metrics.json",
+            mime="application/json",
+            on_click="ignore",
+            use_container_width=True,
+            key="dl_metrics_json",
+        )
+    with m3:
+        if st.button(tr("btn_reset_metrics"), use_container_width=True):
+            metrics.reset()
+            st.rerun()
+
+
+def rerun_budget_panel(page: str) -> None:
+    """Tempo deste rerun por trecho do script + histórico por página (opt-in junto com o perfil por fase)."""
+    phases: Dict[str, float] = {}
+    for name, secs in rerun_budget.phases:
+        phases[name] = phases.get(name, 0.0) + secs
+    total = rerun_budget.total
+    fixed_ms = (total - phases.get("página", 0.0)) * 1000
+    with st.sidebar.expander(f"⏱️ {tr('rerun_budget')}", expanded=False):
+        st.dataframe(
+            pd.DataFrame(
+                [{"trecho": name, "ms": round(secs * 1000, 2), "pct": round(secs / total * 100, 1) if total else 0.0}
+                 for name, secs in phases.items()]
+            ),
+            use_container_width=True,
+            hide_index=True,
+        )
+        st.caption(tr("rerun_budget_summary").format(total=total * 1000, fixed=fixed_ms, budget=ENV_IXC_RERUN_BUDGET_MS))
+        if fixed_ms > ENV_IXC_RERUN_BUDGET_MS:
+            st.warning(tr("rerun_budget_over").format(fixed=fixed_ms, budget=ENV_IXC_RERUN_BUDGET_MS))
+        st.caption(tr("rerun_budget_history"))
+        st.dataframe(get_rerun_history().summary(), use_container_width=True, hide_index=True)
+
 
 def page_subjects() -> None:
     import_page(
@@ -1321,7 +4745,13 @@ def page_subjects() -> None:
 
 def page_manage_subjects() -> None:
     cfg = get_runtime_config()
+    prof = new_profiler("manage_subjects", cfg)
+    with prof:
+        _page_manage_subjects(cfg, prof)
+    prof.render()
+
 
+def _page_manage_subjects(cfg: Dict[str, Any], prof: PhaseProfiler) -> None:
     st.title(tr("page_manage_subjects_title"))
     st.caption(tr("manage_subjects_help"))
 
@@ -1342,6 +4772,11 @@ def page_manage_subjects() -> None:
                 value=int(st.session_state.get("mg_rp", 1000)),
                 step=1,
             )
+            rp_auto = st.checkbox(
+                tr("label_rp_auto"),
+                value=bool(st.session_state.get("mg_rp_auto", ENV_IXC_RP_AUTO)),
+                help=tr("help_rp_auto").format(target=ENV_IXC_RP_TARGET_SECONDS),
+            )
         with c2:
             # por segurança, limita em 50 páginas (pode ajustar depois)
             max_pages = st.number_input(
@@ -1351,6 +4786,11 @@ def page_manage_subjects() -> None:
                 value=int(st.session_state.get("mg_max_pages", 50)),
                 step=1,
             )
+            keyset = st.checkbox(
+                tr("label_keyset"),
+                value=bool(st.session_state.get("mg_keyset", ENV_IXC_LIST_KEYSET)),
+                help=tr("help_keyset"),
+            )
         with c3:
             max_total = st.number_input(
                 tr("label_max_total"),
@@ -1362,16 +4802,20 @@ def page_manage_subjects() -> None:
             )
 
         st.session_state["mg_rp"] = int(rp)
+        st.session_state["mg_rp_auto"] = bool(rp_auto)
         st.session_state["mg_max_pages"] = int(max_pages)
+        st.session_state["mg_keyset"] = bool(keyset)
         st.session_state["mg_max_total"] = int(max_total)
 
         st.write("**Endpoint:**")
         st.code(f"{cfg['base_url']}{ENDPOINT_ASSUNTO}")
 
-        b1, b2 = st.columns([1, 1])
+        b1, b2, b3 = st.columns([1, 1, 1])
         with b1:
             fetch = st.button(tr("btn_fetch_subjects"), type="primary", use_container_width=True)
         with b2:
+            reload = st.button(tr("btn_reload_subjects"), help=tr("help_reload_subjects"), use_container_width=True)
+        with b3:
             clear = st.button(tr("btn_clear_cache"), use_container_width=True)
 
         st.markdown("---")
@@ -1379,106 +4823,230 @@ def page_manage_subjects() -> None:
         st.session_state["mg_filter"] = filtro
 
     if clear:
-        for k in ["assuntos_records", "assuntos_df", "assuntos_df_original", "assuntos_debug_pages"]:
+        for k in ["assuntos_store", "assuntos_debug_pages", "assuntos_resume"]:
             st.session_state.pop(k, None)
         st.rerun()
 
-    if fetch:
+    if fetch or reload:
         prog = st.progress(0)
         status = st.empty()
         status.info("Buscando...")
 
-        sess = requests.Session()
-        records, debug_pages = listar_assuntos_todos(
-            cfg, rp=int(rp), max_pages=int(max_pages), max_total=int(max_total), session=sess
-        )
+        sess = new_session()
+        with prof.span("fetch"):
+            entry, cached = listar_compartilhado(
+                cfg, ENDPOINT_ASSUNTO, rp=int(rp), max_pages=int(max_pages), max_total=int(max_total),
+                session=sess, refresh=bool(reload), auto_rp=bool(rp_auto), keyset=bool(keyset),
+            )
+        debug_pages = entry.debug_pages
         st.session_state["assuntos_debug_pages"] = debug_pages
+        st.session_state.pop("assuntos_resume", None)
 
-        if not records:
+        if not entry.table.num_rows:
             st.warning("Nenhum assunto retornado, ou falha na listagem.")
             with st.expander("Debug da listagem"):
                 st.json(debug_pages)
             return
 
-        df = pd.DataFrame(records)
-        if "id" not in df.columns:
+        with prof.span("normalize"):
+            frame = subjects_frame_from_arrow(entry.table)
+        if frame is None:
             st.error("Resposta sem coluna 'id'.")
             with st.expander("Debug da listagem"):
                 st.json(debug_pages)
             return
 
-        # normaliza tudo para string (exceto seleção)
-        for col in df.columns:
-            if col == "id":
-                df[col] = df[col].astype(str)
-            else:
-                df[col] = df[col].apply(normalize_value)
-
-        if "selecionar" not in df.columns:
-            df.insert(0, "selecionar", False)
-        df["selecionar"] = df["selecionar"].map(parse_bool_value).astype(bool)
-
-        st.session_state["assuntos_records"] = records
-        st.session_state["assuntos_df_original"] = df.drop(columns=["selecionar"], errors="ignore").copy(deep=True)
-        st.session_state["assuntos_df"] = df
+        st.session_state["assuntos_store"] = SubjectStore(df=frame)
+        resume_after = debug_pages[-1].get("resume_after") if debug_pages else None
+        if resume_after:
+            # página falhou no meio: guarda a parte lida para continuar de id > resume_after
+            st.session_state["assuntos_resume"] = {"after": int(resume_after), "table": entry.table}
 
         prog.progress(100)
         status.success("Ok.")
-        st.success(tr("msg_loaded_n").format(n=len(df)))
-
-    df = st.session_state.get("assuntos_df")
-    df_original = st.session_state.get("assuntos_df_original")
-
-    # garante que "selecionar" seja booleano (checkbox)
-    if isinstance(df, pd.DataFrame) and "selecionar" in df.columns:
-        df["selecionar"] = df["selecionar"].map(parse_bool_value).astype(bool)
+        st.success(tr("msg_loaded_n").format(n=len(frame)))
+        if cached:
+            st.caption(tr("msg_listing_cached").format(age=_fmt_eta(entry.age_seconds)))
+        if rp_auto:
+            used = [str(p.get("rp")) for p in debug_pages]
+            st.caption(tr("msg_rp_auto_used").format(rps=" → ".join(dict.fromkeys(used)), pages=len(debug_pages)))
+
+    resume = st.session_state.get("assuntos_resume")
+    if resume is not None:
+        last = (st.session_state.get("assuntos_debug_pages") or [{}])[-1]
+        st.warning(tr("msg_listing_incomplete").format(
+            n=resume["table"].num_rows, after=resume["after"], status=last.get("http_status")
+        ))
+        store_now: Optional[SubjectStore] = st.session_state.get("assuntos_store")
+        if store_now is not None and store_now.original:
+            st.caption(tr("msg_resume_has_edits"))
+        elif st.button(tr("btn_resume_listing")):
+            with prof.span("fetch"):
+                more, more_debug = listar_colunar(
+                    cfg, ENDPOINT_ASSUNTO, rp=int(rp), max_pages=int(max_pages),
+                    max_total=max(0, int(max_total) - resume["table"].num_rows) if max_total else 0,
+                    session=new_session(), auto_rp=bool(rp_auto), start_after=resume["after"],
+                )
+            combined = pa.concat_tables([resume["table"], more], promote_options="default") if more.num_rows else resume["table"]
+            combined = pa.Table.from_arrays([pc.fill_null(c, "") for c in combined.columns], names=combined.column_names)
+            st.session_state["assuntos_debug_pages"] = st.session_state.get("assuntos_debug_pages", []) + more_debug
+            frame = subjects_frame_from_arrow(combined)
+            if frame is not None:
+                st.session_state["assuntos_store"] = SubjectStore(df=frame)
+            again = more_debug[-1].get("resume_after") if more_debug else None
+            if again:
+                st.session_state["assuntos_resume"] = {"after": int(again), "table": combined}
+            else:
+                st.session_state.pop("assuntos_resume", None)
+            st.rerun()
 
-    if df is None or df_original is None:
+    store: Optional[SubjectStore] = st.session_state.get("assuntos_store")
+    if store is None:
         st.info(tr("msg_no_data_manage"))
         return
+    df = store.df
 
     # colunas exibidas
     defaults = [c for c in ["selecionar", "id", "assunto", "ativo", "descricao"] if c in df.columns]
     cols = st.multiselect(tr("label_columns"), options=list(df.columns), default=defaults, key="mg_cols")
 
-    view = df.copy()
     filtro = str(st.session_state.get("mg_filter", "") or "")
-    if filtro.strip():
-        ft = filtro.strip().lower()
-        mask = view.apply(lambda r: any(ft in str(v).lower() for v in r.values), axis=1)
-        view = view.loc[mask]
+    with prof.span("filter"):
+        mask = store.filter_mask(filtro)
+    view_index = df.index if mask is None else df.index[mask.to_numpy()]
+
+    # ----------------------------
+    # Paginação/ordenação no servidor: o editor recebe só a página atual
+    # ----------------------------
+    sort_options = [c for c in df.columns if c != "selecionar"]
+    p1, p2, p3, p4 = st.columns([2, 1, 1, 1])
+    with p1:
+        sort_col = st.selectbox(
+            tr("label_sort_by"),
+            options=sort_options,
+            index=sort_options.index(st.session_state.get("mg_sort_col", "id")) if st.session_state.get("mg_sort_col", "id") in sort_options else 0,
+        )
+    with p2:
+        sort_asc = st.selectbox(
+            tr("label_sort_order"),
+            options=[True, False],
+            format_func=lambda x: tr("sort_asc") if x else tr("sort_desc"),
+            index=0 if st.session_state.get("mg_sort_asc", True) else 1,
+        )
+    with p3:
+        page_size = st.selectbox(
+            tr("label_page_size"),
+            options=PAGE_SIZE_OPTIONS,
+            index=PAGE_SIZE_OPTIONS.index(st.session_state.get("mg_page_size", DEFAULT_PAGE_SIZE)),
+        )
+    n_pages = max(1, -(-len(view_index) // int(page_size)))
+    with p4:
+        page = st.number_input(
+            tr("label_page"),
+            min_value=1,
+            max_value=n_pages,
+            value=min(int(st.session_state.get("mg_page", 1)), n_pages),
+            step=1,
+        )
+
+    st.session_state["mg_sort_col"] = sort_col
+    st.session_state["mg_sort_asc"] = bool(sort_asc)
+    st.session_state["mg_page_size"] = int(page_size)
+    st.session_state["mg_page"] = int(page)
 
-    if cols:
-        view = view[cols]
+    with prof.span("sort"):
+        ordered = store.sorted_index(view_index, sort_col, bool(sort_asc))
+    page_ids = ordered[(int(page) - 1) * int(page_size): int(page) * int(page_size)]
+    view = df.loc[page_ids, cols or list(df.columns)]
 
     st.markdown("### Lista de assuntos")
-    edited = st.data_editor(
-        view,
-        use_container_width=True,
-        height=520,
-        num_rows="fixed",
-        key="editor_assuntos",
-        column_config={"selecionar": st.column_config.CheckboxColumn("selecionar")},
-    )
+    st.caption(tr("msg_page_info").format(page=int(page), pages=n_pages, n=len(view_index)))
+    # chave por página/ordem/filtro: o estado interno do widget (posicional) não vaza entre páginas
+    editor_key = f"editor_assuntos_{int(page)}_{int(page_size)}_{sort_col}_{int(bool(sort_asc))}_{abs(hash(filtro)) % 10**8}"
+    with prof.span("render"):
+        edited = st.data_editor(
+            view,
+            use_container_width=True,
+            height=520,
+            num_rows="fixed",
+            hide_index=True,
+            disabled=["id"],
+            key=editor_key,
+            column_config={"selecionar": st.column_config.CheckboxColumn("selecionar")},
+        )
 
     # ----------------------------
-    # Reconcilia a edição (subconjunto) com o DF completo
+    # Reconcilia a edição (subconjunto) com o store: só as células alteradas
     # ----------------------------
-    full = df.copy()
-    if "id" in edited.columns and "id" in full.columns:
-        full_idx = full.set_index("id", drop=False)
-        edited_idx = edited.set_index("id", drop=False)
-        for rid, row in edited_idx.iterrows():
-            if rid in full_idx.index:
-                for col in edited_idx.columns:
-                    full_idx.at[rid, col] = row[col]
-        df_full_updated = full_idx.reset_index(drop=True)
-    else:
-        df_full_updated = edited.copy()
+    with prof.span("reconcile"):
+        store.apply_editor_changes(view, edited)
+
+    # Exportações geradas só no clique (direto das colunas Arrow do store):
+    # CSV = filtro atual; Parquet/NDJSON = listagem completa, com colunas tipadas
+    data_cols = [c for c in store.df.columns if c != "selecionar"]
+    x1, x2, x3 = st.columns([1, 1, 1])
+    with x1:
+        st.download_button(
+            tr("download_listing_csv"),
+            data=lambda: frame_to_csv_bytes(store.df.loc[view_index], data_cols),
+            file_name="assuntos_listagem.csv",
+            mime="text/csv",
+            on_click="ignore",
+            key="dl_listing_csv",
+        )
+    with x2:
+        st.download_button(
+            tr("download_listing_parquet"),
+            data=lambda: table_to_parquet_bytes(typed_export_table(frame_to_arrow(store.df, data_cols))),
+            file_name="assuntos_listagem.parquet",
+            mime="application/vnd.apache.parquet",
+            on_click="ignore",
+            key="dl_listing_parquet",
+        )
+    with x3:
+        st.download_button(
+            tr("download_listing_ndjson"),
+            data=lambda: table_to_ndjson_gz(typed_export_table(frame_to_arrow(store.df, data_cols))),
+            file_name="assuntos_listagem.ndjson.gz",
+            mime="application/gzip",
+            on_click="ignore",
+            key="dl_listing_ndjson",
+        )
 
-    if "selecionar" in df_full_updated.columns:
-        df_full_updated["selecionar"] = df_full_updated["selecionar"].map(parse_bool_value).astype(bool)
-    st.session_state["assuntos_df"] = df_full_updated
+    with st.expander(f"📥 {tr('edit_in_excel')}"):
+        st.caption(tr("hint_edit_in_excel"))
+        st.download_button(
+            tr("download_listing_xlsx"),
+            data=lambda: frame_to_xlsx_bytes(store.df.loc[view_index], data_cols),
+            file_name="assuntos_edicao.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            on_click="ignore",
+            key="dl_listing_xlsx",
+        )
+        edited_file = st.file_uploader(tr("upload_edited_xlsx"), type=["xlsx"], key="mg_upload_edited")
+        if edited_file is not None:
+            try:
+                with prof.span("read_excel"):
+                    edited_wb = read_sheet(edited_file.getvalue(), as_text=True)
+            except Exception as e:
+                edited_wb = None
+                st.error(f"Não consegui ler o arquivo .xlsx: {e}")
+            if edited_wb is not None and "id" not in edited_wb.columns:
+                st.error(tr("need_column") + "'id'")
+            elif edited_wb is not None:
+                with prof.span("diff"):
+                    wb_changes, wb_unknown = store.diff_workbook(edited_wb)
+                st.write(tr("msg_workbook_diff").format(
+                    cells=len(wb_changes), rows=wb_changes["id"].nunique(), unknown=len(wb_unknown)
+                ))
+                if len(wb_changes):
+                    st.dataframe(wb_changes.head(1000), use_container_width=True, hide_index=True, height=240)
+                if wb_unknown:
+                    st.caption("IDs fora da listagem (ignorados): " + ", ".join(wb_unknown[:50]))
+                if st.button(tr("btn_apply_workbook"), disabled=not len(wb_changes), key="mg_apply_workbook"):
+                    n = store.apply_changes(wb_changes)
+                    st.success(tr("msg_workbook_applied").format(n=n))
+                    st.rerun()
 
     # ----------------------------
     # Sessão: ações (seleção / edição em massa / salvar)
@@ -1488,27 +5056,19 @@ def page_manage_subjects() -> None:
 
     cS1, cS2, cS3, cS4 = st.columns([1, 1, 2, 2])
     with cS1:
-        sel_count = int(df_full_updated["selecionar"].map(parse_bool_value).sum()) if "selecionar" in df_full_updated.columns else 0
-        st.metric(tr("label_selected"), sel_count)
+        st.metric(tr("label_selected"), int(df["selecionar"].sum()))
 
     with cS2:
         if st.button(tr("btn_select_all_filtered")):
-            ids_visible = edited["id"].astype(str).tolist() if "id" in edited.columns else []
-            tmp = df_full_updated.copy()
-            if "id" in tmp.columns and "selecionar" in tmp.columns:
-                tmp["selecionar"] = tmp.apply(lambda r: True if str(r["id"]) in ids_visible else bool(r["selecionar"]), axis=1)
-                st.session_state["assuntos_df"] = tmp
-                st.rerun()
+            df.loc[view_index, "selecionar"] = True
+            st.rerun()
 
         if st.button(tr("btn_clear_selection")):
-            tmp = df_full_updated.copy()
-            if "selecionar" in tmp.columns:
-                tmp["selecionar"] = False
-                st.session_state["assuntos_df"] = tmp
-                st.rerun()
+            df["selecionar"] = False
+            st.rerun()
 
     with cS3:
-        bulk_field = st.selectbox(tr("label_bulk_field"), options=[c for c in df_full_updated.columns if c not in ("selecionar",)], index=0)
+        bulk_field = st.selectbox(tr("label_bulk_field"), options=store.editable_columns, index=0)
 
     with cS4:
         if bulk_field in ("ativo", "mostra_hotsite", "mostrar_no_service"):
@@ -1523,14 +5083,11 @@ def page_manage_subjects() -> None:
         st.caption(tr("hint_bulk"))
 
     if apply_bulk:
-        tmp = st.session_state["assuntos_df"].copy()
-        ids_sel = tmp.loc[tmp["selecionar"].map(parse_bool_value), "id"].astype(str).tolist() if "selecionar" in tmp.columns else []
+        ids_sel = store.selected_ids()
         if not ids_sel:
             st.warning(tr("msg_no_selection"))
         else:
-            for rid in ids_sel:
-                tmp.loc[tmp["id"].astype(str) == str(rid), bulk_field] = bulk_value
-            st.session_state["assuntos_df"] = tmp
+            store.set_many(ids_sel, bulk_field, normalize_value(bulk_value))
             st.success("Edição em massa aplicada.")
             st.rerun()
 
@@ -1544,40 +5101,38 @@ def page_manage_subjects() -> None:
         save_only_selected = st.checkbox(tr("chk_save_only_selected"), value=True)
     with cD:
         salvar = st.button(tr("btn_save_put"), type="primary", use_container_width=True)
+    cE, cF = st.columns([1, 2])
+    with cE:
+        check_conflicts = st.checkbox(tr("chk_check_conflicts"), value=True, help=tr("help_check_conflicts"))
+    with cF:
+        on_conflict = st.radio(
+            tr("label_on_conflict"),
+            options=["skip", "overwrite"],
+            format_func=lambda x: tr(f"on_conflict_{x}"),
+            horizontal=True,
+            disabled=not check_conflicts,
+        )
+
+    with st.expander("Memória da sessão"):
+        st.write(f"- Linhas: `{len(df)}` | Células alteradas: `{sum(len(d) for d in store.original.values())}`")
+        st.write(f"- Tamanho aproximado: `{store.memory_bytes() / 1_000_000:.2f} MB`")
 
     if not salvar:
         return
 
-    selected_ids = df_full_updated.loc[df_full_updated["selecionar"].map(parse_bool_value), "id"].astype(str).tolist() if "selecionar" in df_full_updated.columns else []
-
-    orig_idx = df_original.set_index("id", drop=False)
-    upd_idx = df_full_updated.drop(columns=["selecionar"], errors="ignore").set_index("id", drop=False)
+    selected_ids = store.selected_ids()
 
     if save_only_selected and selected_ids:
-        candidate_ids = [rid for rid in selected_ids if rid in upd_idx.index]
+        candidate_ids = selected_ids
     else:
-        candidate_ids = [rid for rid in upd_idx.index if rid in orig_idx.index]
-
-    changed_ids: List[str] = []
-    for rid in candidate_ids:
-        if rid not in orig_idx.index:
-            continue
-        if not only_changed:
-            changed_ids.append(rid)
-            continue
-
-        changed = False
-        for col in upd_idx.columns:
-            if col == "id":
-                continue
-            a = normalize_value(orig_idx.at[rid, col]) if col in orig_idx.columns else ""
-            b = normalize_value(upd_idx.at[rid, col]) if col in upd_idx.columns else ""
-            if a != b:
-                changed = True
-                break
+        candidate_ids = df.index.tolist()
 
-        if changed:
-            changed_ids.append(rid)
+    with prof.span("diff"):
+        if only_changed:
+            changed_set = set(store.original)
+            changed_ids: List[str] = [rid for rid in candidate_ids if rid in changed_set]
+        else:
+            changed_ids = list(candidate_ids)
 
     if save_only_selected and selected_ids and not changed_ids:
         st.warning("Nenhum item selecionado sofreu alteração.")
@@ -1586,6 +5141,38 @@ def page_manage_subjects() -> None:
         st.info("Nenhuma alteração detectada.")
         return
 
+    sess = new_session()
+    report = new_report_writer("report_save_assuntos", "save_assuntos", cfg)
+
+    # ----------------------------
+    # Concorrência otimista: relê só as linhas a salvar e compara com a versão listada
+    # ----------------------------
+    conflicts: Dict[str, str] = {}
+    if check_conflicts:
+        with prof.span("conflict_check"):
+            server, unchecked, n_req = listar_por_ids(cfg, ENDPOINT_ASSUNTO, changed_ids, session=sess)
+            for rid in changed_ids:
+                if rid in unchecked:
+                    conflicts[rid] = f"não conferido: {unchecked[rid]}"
+                elif rid not in server:
+                    conflicts[rid] = "não existe mais no IXC"
+                else:
+                    diffs = store.conflicts(rid, server[rid])
+                    if diffs:
+                        conflicts[rid] = " | ".join(
+                            f"{col}: '{before}' -> '{remote}' no IXC (nosso: '{mine}')" for col, before, remote, mine in diffs
+                        )
+        st.caption(tr("msg_conflicts_checked").format(n=len(changed_ids), req=n_req, conflicts=len(conflicts)))
+        if conflicts:
+            st.warning(tr("msg_conflicts_found").format(n=len(conflicts)))
+            if on_conflict == "skip":
+                for rid, reason in conflicts.items():
+                    report.write({"id": rid, "status": "CONFLITO", "http_status": "", "mensagem": reason})
+                    if rid in server:
+                        store.rebase(rid, server[rid])
+                changed_ids = [rid for rid in changed_ids if rid not in conflicts]
+                st.caption(tr("msg_conflicts_rebased"))
+
     overlay = st.empty()
     overlay.markdown(dedent("""
         <style>
@@ -1632,51 +5219,39 @@ section[data-testid="stSidebar"] .stButton { margin-bottom: 0.32rem !important;
         </div>
         """), unsafe_allow_html=True)
 
-    prog = st.progress(0)
+    reporter = ProgressReporter(len(changed_ids), tr("put_saving"), profiler=prof)
     ok = 0
-    err = 0
-    results: List[dict] = []
+    err = len(conflicts) if on_conflict == "skip" else 0
 
-    sess = requests.Session()
+    saved: Dict[str, Dict[str, str]] = {}  # cache de listagens recebe o lote inteiro no fim, não um patch por PUT
     try:
-        for i, rid in enumerate(changed_ids, start=1):
-            row = upd_idx.loc[rid].to_dict()
-
-            base_payload: Dict[str, str] = {}
-            for col in upd_idx.columns:
-                if col == "id":
-                    continue
-                base_payload[col] = normalize_value(row.get(col, ""))
-
-            if validate_before:
-                v = validate_assunto(base_payload)
-                if v:
-                    err += 1
-                    results.append({"id": rid, "status": "ERRO_VALIDACAO", "http_status": "", "mensagem": " | ".join(v)})
-                    prog.progress(int(i / len(changed_ids) * 100))
-                    continue
-
-            resp = put_to_endpoint(cfg, f"{ENDPOINT_ASSUNTO}/{rid}", base_payload, session=sess)
-            if resp.ok:
+        for rid in changed_ids:
+            payload = store.current_row(rid)
+            outcome, result = save_subject(
+                cfg, rid, payload, validate_before=validate_before, session=sess, prof=prof, patch_cache=False
+            )
+            if rid in conflicts and outcome == "ok":
+                result["mensagem"] = f"{result['mensagem']} | sobrescreveu: {conflicts[rid]}".lstrip(" |")
+            report.write(result)
+            reporter.step(outcome, rid)
+            if outcome == "ok":
                 ok += 1
-                msg = ""
-                if isinstance(resp.data, dict):
-                    msg = str(resp.data.get("message") or resp.data.get("msg") or "")
-                results.append({"id": rid, "status": "OK", "http_status": resp.http_status, "mensagem": msg})
+                store.commit(rid)
+                saved[rid] = payload
             else:
                 err += 1
-                msg = resp.text
-                if isinstance(resp.data, dict):
-                    msg = str(resp.data.get("message") or resp.data.get("msg") or resp.data)
-                results.append({"id": rid, "status": "ERRO", "http_status": resp.http_status, "mensagem": str(msg)[:1500]})
-
-            prog.progress(int(i / len(changed_ids) * 100))
+        reporter.finish()
     finally:
+        if saved:
+            get_listing_cache().patch_many(cfg["base_url"], ENDPOINT_ASSUNTO, saved)
         overlay.empty()
 
     st.success(tr("msg_finished").format(ok=ok, err=err))
-    df_res = pd.DataFrame(results)
+    df_res = report.preview_frame()
+    if report.rows > len(df_res):
+        st.caption(tr("msg_report_preview").format(n=len(df_res), total=report.rows))
     st.dataframe(df_res, use_container_width=True, height=360)
+    report_downloads(report, "save_assuntos")
 
     with st.expander("Debug da listagem (última busca)"):
         st.json(st.session_state.get("assuntos_debug_pages", []))
@@ -1694,6 +5269,8 @@ def page_diagnostics() -> None:
     )
 
 
+rerun_budget.mark("definições (páginas)")
+
 # Router
 key = st.session_state.page_key
 if key == "home":
@@ -1704,9 +5281,15 @@ elif key == "manage_subjects":
     page_manage_subjects()
 elif key == "diagnostics":
     page_diagnostics()
+elif key == "workbook":
+    page_workbook()
 elif key == "settings":
     page_settings()
 else:
     st.session_state.page_key = "home"
     st.rerun()
 
+rerun_budget.mark("página")
+if cfg.get("profile"):
+    get_rerun_history().record(key, rerun_budget, "página")
+    rerun_budget_panel(key)
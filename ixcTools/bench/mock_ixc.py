@@ -0,0 +1,309 @@
+# bench/mock_ixc.py
+# Servidor local que imita o webservice do IXC para benchmarks (sem tocar em base de produção).
+#
+# Implementa, para qualquer tabela em /webservice/v1/<tabela> (su_oss_assunto, su_diagnostico, ...):
+#  - GET + header "ixcsoft: listar" com JSON no body (qtype/query/oper/page/rp/sortname/sortorder)
+#  - POST (cria, devolve o id novo) e PUT /<id> (atualiza)
+#  - HEAD (teste de autenticação)
+# com latência, taxa de erro 5xx e injeção de 429 configuráveis. Sobe já com as tabelas de referência
+# (empresa_setor, vendedor, su_oss_layout_impressao) que o import usa para resolver nome -> id.
+#
+# Rodar sozinho:
+#   python bench/mock_ixc.py --port 8765 --seed-rows 50000 --latency-ms 5 --error-rate 0.01 --rate-429 0.01
+#   python bench/mock_ixc.py --port 8765 --seed-rows 50000 --row-latency-ms 2   # IXC fraco: rp alto = página lenta
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from workload import listing_records, lookup_tables
+
+PATH_RE = re.compile(r"^/webservice/v1/(?P<table>[a-z_]+)(?:/(?P<id>\d+))?/?$")
+
+
+class MockIXCState:
+    """Tabelas em memória + configuração de falhas (compartilhado entre as threads do servidor)."""
+
+    def __init__(
+        self,
+        *,
+        latency_ms: float = 0.0,
+        jitter: float = 0.2,
+        error_rate: float = 0.0,
+        rate_429: float = 0.0,
+        row_latency_ms: float = 0.0,
+        response_format: str = "registros",
+        seed: int = 1,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.row_latency_ms = row_latency_ms
+        self.response_format = response_format
+        self.tables: Dict[str, Dict[int, Dict[str, str]]] = {}
+        self.next_id: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def seed_table(self, table: str, rows: List[Dict[str, str]]) -> None:
+        with self._lock:
+            t = self.tables.setdefault(table, {})
+            for r in rows:
+                t[int(r["id"])] = dict(r)
+            self.next_id[table] = max(t) + 1 if t else 1
+
+    def seed_lookups(self) -> None:
+        """Tabelas de referência (setores, vendedores, layouts) usadas na resolução nome -> id do import."""
+        for table, rows in lookup_tables().items():
+            self.seed_table(table, rows)
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def roll(self) -> Optional[int]:
+        """Sorteia uma falha injetada: 429, 500 ou None."""
+        with self._lock:
+            x = self._rng.random()
+        if x < self.rate_429:
+            return 429
+        if x < self.rate_429 + self.error_rate:
+            return 500
+        return None
+
+    def sleep(self) -> None:
+        if self.latency_ms > 0:
+            with self._lock:
+                f = 1.0 + self._rng.uniform(-self.jitter, self.jitter)
+            time.sleep(self.latency_ms * f / 1000.0)
+
+    # ----------------------------
+    # Operações
+    # ----------------------------
+
+    def listar(self, table: str, q: Dict[str, Any]) -> Dict[str, Any]:
+        field = str(q.get("qtype") or f"{table}.id").split(".")[-1]
+        query = str(q.get("query") or "")
+        oper = str(q.get("oper") or "=")
+        page = max(1, int(q.get("page") or 1))
+        rp = max(1, int(q.get("rp") or 20))
+        sort_field = str(q.get("sortname") or f"{table}.id").split(".")[-1]
+        desc = str(q.get("sortorder") or "asc").lower() == "desc"
+
+        with self._lock:
+            rows = list(self.tables.get(table, {}).values())
+
+        rows = [r for r in rows if _match(r.get(field, ""), oper, query)]
+        rows.sort(key=lambda r: _sort_key(r.get(sort_field, "")), reverse=desc)
+        chunk = rows[(page - 1) * rp: page * rp]
+        if self.row_latency_ms > 0:
+            time.sleep(len(chunk) * self.row_latency_ms / 1000.0)  # servidor fraco: página grande = página lenta
+
+        if self.response_format == "rows":
+            return {"page": str(page), "total": str(len(rows)), "rows": [{"id": r.get("id"), "cell": r} for r in chunk]}
+        return {"page": str(page), "total": str(len(rows)), "registros": chunk}
+
+    def create(self, table: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            new_id = self.next_id.get(table, 1)
+            self.next_id[table] = new_id + 1
+            row = {k: str(v) for k, v in payload.items()}
+            row["id"] = str(new_id)
+            self.tables.setdefault(table, {})[new_id] = row
+        return {"type": "success", "message": "Registro inserido com sucesso!", "id": str(new_id)}
+
+    def update(self, table: str, rid: int, payload: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        with self._lock:
+            row = self.tables.get(table, {}).get(rid)
+            if row is None:
+                return 200, {"type": "error", "message": f"Registro {rid} não encontrado"}
+            row.update({k: str(v) for k, v in payload.items()})
+            row["id"] = str(rid)
+        return 200, {"type": "success", "message": "Registro atualizado com sucesso!"}
+
+
+def _sort_key(v: Any) -> Tuple[int, Any]:
+    s = str(v)
+    return (0, int(s)) if s.isdigit() else (1, s)
+
+
+def _match(value: Any, oper: str, query: str) -> bool:
+    v = str(value)
+    if oper == "L":
+        return query.lower() in v.lower()
+    if oper == "=":
+        return v == query
+    try:
+        a, b = float(v), float(query)
+    except ValueError:
+        a, b = v, query  # type: ignore[assignment]
+    if oper == ">=":
+        return a >= b
+    if oper == ">":
+        return a > b
+    if oper == "<=":
+        return a <= b
+    if oper == "<":
+        return a < b
+    if oper == "!=":
+        return a != b
+    return False
+
+
+def make_handler(state: MockIXCState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # sem isso o keep-alive cai no delayed ACK (~40 ms por request)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+        def _read_json(self) -> Dict[str, Any]:
+            n = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(n) if n else b""
+            if not raw:
+                return {}
+            try:
+                data = json.loads(raw.decode("utf-8", errors="replace"))
+            except ValueError:
+                return {}
+            return data if isinstance(data, dict) else {}
+
+        def _send(self, status: int, obj: Optional[Dict[str, Any]] = None) -> None:
+            body = json.dumps(obj, ensure_ascii=False).encode("utf-8") if obj is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            if status == 429:
+                self.send_header("Retry-After", "1")
+            self.end_headers()
+            if body and self.command != "HEAD":
+                self.wfile.write(body)
+
+        def _route(self) -> Optional[Tuple[str, Optional[int]]]:
+            m = PATH_RE.match(self.path.split("?", 1)[0])
+            if not m:
+                self._send(404, {"type": "error", "message": "endpoint inexistente"})
+                return None
+            if not (self.headers.get("Authorization") or "").startswith("Basic "):
+                self._send(401, {"type": "error", "message": "Não autorizado"})
+                return None
+            state.sleep()
+            fail = state.roll()
+            if fail is not None:
+                state.count(f"injected_{fail}")
+                self._send(fail, {"type": "error", "message": f"falha simulada ({fail})"})
+                return None
+            return m.group("table"), (int(m.group("id")) if m.group("id") else None)
+
+        def do_HEAD(self) -> None:
+            if self._route() is not None:
+                state.count("head")
+                self._send(200)
+
+        def do_GET(self) -> None:
+            body = self._read_json()
+            route = self._route()
+            if route is None:
+                return
+            table, _ = route
+            state.count("listar")
+            self._send(200, state.listar(table, body))
+
+        def do_POST(self) -> None:
+            body = self._read_json()
+            route = self._route()
+            if route is None:
+                return
+            table, _ = route
+            state.count("post")
+            self._send(200, state.create(table, body))
+
+        def do_PUT(self) -> None:
+            body = self._read_json()
+            route = self._route()
+            if route is None:
+                return
+            table, rid = route
+            if rid is None:
+                self._send(400, {"type": "error", "message": "PUT exige /<id>"})
+                return
+            state.count("put")
+            status, obj = state.update(table, rid, body)
+            self._send(status, obj)
+
+    return Handler
+
+
+class MockIXC:
+    """Servidor numa thread; ``base_url`` pronto para ir no cfg do app."""
+
+    def __init__(self, state: Optional[MockIXCState] = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.state = state or MockIXCState()
+        self.server = ThreadingHTTPServer((host, port), make_handler(self.state))
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockIXC":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="mock-ixc", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Mock local do webservice IXC (benchmarks).")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--seed-rows", type=int, default=0, help="assuntos sintéticos (bench/workload.py) pré-carregados em su_oss_assunto")
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter", type=float, default=0.2, help="variação relativa da latência (0.2 = ±20%%)")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fração de respostas 500")
+    ap.add_argument("--rate-429", type=float, default=0.0, help="fração de respostas 429")
+    ap.add_argument("--row-latency-ms", type=float, default=0.0, help="custo por registro devolvido no listar")
+    ap.add_argument("--response-format", choices=["registros", "rows"], default="registros")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    state = MockIXCState(
+        latency_ms=args.latency_ms,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_429=args.rate_429,
+        row_latency_ms=args.row_latency_ms,
+        response_format=args.response_format,
+        seed=args.seed,
+    )
+    if args.seed_rows:
+        state.seed_table("su_oss_assunto", listing_records(args.seed_rows, seed=args.seed))
+    state.seed_lookups()
+
+    mock = MockIXC(state, host=args.host, port=args.port)
+    print(f"mock IXC em {mock.base_url} (Ctrl+C para sair)", flush=True)
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
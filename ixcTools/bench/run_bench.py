@@ -0,0 +1,309 @@
+# bench/run_bench.py
+# Benchmarks de throughput do import (POST), da listagem paginada e do save em massa (PUT),
+# contra o mock local do IXC (bench/mock_ixc.py) — nenhuma chamada sai da máquina.
+#
+# Uso (a partir de ixcTools/):
+#   python bench/run_bench.py                       # roda tudo e compara com bench/baselines.json
+#   python bench/run_bench.py -s list_50k --scale 0.1
+#   python bench/run_bench.py --latency-ms 5 --error-rate 0.01 --rate-429 0.01
+#   python bench/run_bench.py -s list_50k -s list_50k_auto --row-latency-ms 1   # rp fixo x automático num IXC lento
+#   python bench/run_bench.py --repeat 3            # melhor de 3 (reduz ruído da máquina)
+#   python bench/run_bench.py --update-baseline     # grava os números atuais como baseline
+#
+# Cada cenário roda num subprocesso próprio (pico de memória isolado); o mock fica numa thread
+# do processo pai. Sai com código 1 se algum cenário ficar mais lento que baseline * (1 - tolerância)
+# ou usar mais memória que baseline * (1 + tolerância).
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent
+BASELINES_FILE = BENCH_DIR / "baselines.json"
+
+sys.path.insert(0, str(BENCH_DIR))
+
+from mock_ixc import MockIXC, MockIXCState  # noqa: E402
+from workload import generate_sheet, listing_records, write_csv  # noqa: E402
+
+# cenário -> linhas pré-carregadas no mock (seed) e linhas processadas (rows)
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "create_10k": {"seed": 0, "rows": 10_000, "help": "import_row (POST) com sessão compartilhada"},
+    "pipeline_10k": {"seed": 0, "rows": 10_000, "help": "ImportPipeline: leitura/normalização/validação em paralelo ao POST"},
+    "list_50k": {"seed": 50_000, "rows": 50_000, "help": "listar_colunar (streaming) + subjects_frame_from_arrow"},
+    "list_50k_auto": {"seed": 50_000, "rows": 50_000, "help": "idem, com rp automático (RpTuner) a partir de rp=1000"},
+    "list_50k_keyset": {"seed": 50_000, "rows": 50_000, "help": "idem, paginando por id > último id (keyset)"},
+    "list_50k_refresh": {"seed": 50_000, "rows": 50_000, "help": "segunda listagem keyset, catálogo igual (páginas do PageCache)"},
+    "save_5k": {"seed": 5_000, "rows": 5_000, "help": "save_subject (PUT) com validação"},
+    "read_csv_200k": {"seed": 0, "rows": 200_000, "help": "upload_source + blocos de um CSV ';' com BOM (como o import lê)"},
+    "read_parquet_200k": {"seed": 0, "rows": 200_000, "help": "upload_source + blocos de um Parquet (lotes por row group)"},
+}
+
+
+# ============================
+# Worker (subprocesso)
+# ============================
+
+def _peak_rss_mb() -> Optional[float]:
+    # Linux: VmHWM é do processo atual (ru_maxrss herda o pico do pai no fork+exec)
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS devolve bytes
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 1)
+
+
+def _import_app():
+    """Importa o app.py fora do `streamlit run` (modo bare), sem o ruído de warnings do Streamlit."""
+    logging.disable(logging.WARNING)
+    os.environ.setdefault("IXC_PROGRESS_INTERVAL_SECONDS", "3600")
+    sys.path.insert(0, str(APP_DIR))
+    import app  # noqa: WPS433
+
+    logging.disable(logging.NOTSET)
+    return app
+
+
+def _worker(scenario: str, base_url: str, rows: int) -> Dict[str, Any]:
+    app = _import_app()
+    import requests
+
+    cfg = {
+        "base_url": base_url,
+        "auth_basic": "bench:bench",
+        "cookie": "",
+        "timeout_seconds": 30.0,
+        "max_retries": 5,
+        "retry_backoff_seconds": 0.01,
+    }
+    sess = requests.Session()
+    outcomes: Dict[str, int] = {"ok": 0, "validation": 0, "api": 0}
+
+    if scenario == "create_10k":
+        df, _ = generate_sheet("assuntos", rows)
+        df = df[df["assunto"].str.strip() != ""]  # = "Pular linhas com 'assunto' vazio"
+        t0 = time.perf_counter()
+        for idx, row in df.iterrows():
+            r = app.import_row(
+                cfg, app.ENDPOINT_ASSUNTO, "assunto", app.validate_assunto, idx, row, dry_run=False, session=sess
+            )
+            outcomes[r.outcome] += 1
+        seconds = time.perf_counter() - t0
+
+    elif scenario == "pipeline_10k":
+        df, _ = generate_sheet("assuntos", rows)
+        df = df[df["assunto"].str.strip() != ""]
+        t0 = time.perf_counter()
+        pipeline = app.ImportPipeline(
+            cfg, app.ENDPOINT_ASSUNTO, "assunto", app.validate_assunto, [df], dry_run=False
+        ).start()
+        for r in pipeline.outcomes():
+            outcomes[r.outcome] += 1
+        pipeline.stop()
+        seconds = time.perf_counter() - t0
+
+    elif scenario in ("list_50k", "list_50k_auto", "list_50k_keyset", "list_50k_refresh"):
+        if scenario == "list_50k_refresh":
+            app.listar_colunar(cfg, app.ENDPOINT_ASSUNTO, rp=1000, max_pages=rows // 1000 + 1, session=sess, keyset=True)
+            app.get_request_metrics().reset()
+        t0 = time.perf_counter()
+        table, _ = app.listar_colunar(
+            cfg, app.ENDPOINT_ASSUNTO, rp=1000, max_pages=rows // 1000 + 1, session=sess,
+            auto_rp=scenario == "list_50k_auto", keyset=scenario in ("list_50k_keyset", "list_50k_refresh"),
+        )
+        frame = app.subjects_frame_from_arrow(table)
+        seconds = time.perf_counter() - t0
+        outcomes["ok"] = 0 if frame is None else len(frame)
+
+    elif scenario == "save_5k":
+        payloads = []
+        for p in listing_records(rows, seed=2):
+            p["descricao"] = f"{p['descricao']} (bench {time.time():.0f})"
+            payloads.append((p.pop("id"), p))
+        t0 = time.perf_counter()
+        for rid, p in payloads:
+            outcome, _ = app.save_subject(cfg, rid, p, validate_before=True, session=sess)
+            outcomes[outcome] += 1
+        seconds = time.perf_counter() - t0
+
+    elif scenario in ("read_csv_200k", "read_parquet_200k"):
+        import tempfile
+
+        df, _ = generate_sheet("assuntos", rows)
+        with tempfile.TemporaryDirectory() as tmp:
+            if scenario == "read_csv_200k":
+                path = Path(tmp) / "assuntos.csv"
+                write_csv(df, path)
+            else:
+                path = Path(tmp) / "assuntos.parquet"
+                df.to_parquet(path)
+            data = path.read_bytes()
+        del df
+        t0 = time.perf_counter()
+        # o que o import faz sem a rede: passada de contagem/prévia + blocos em pandas, um por vez
+        source = app.upload_source(data, path.name, "assunto", skip_empty=True)
+        outcomes["ok"] = sum(len(chunk) for chunk in source.chunks())
+        seconds = time.perf_counter() - t0
+
+    else:
+        raise SystemExit(f"cenário desconhecido: {scenario}")
+
+    sess.close()
+    agg = app.get_request_metrics().aggregate()
+    return {
+        "scenario": scenario,
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(rows / seconds, 1) if seconds > 0 else 0.0,
+        "peak_rss_mb": _peak_rss_mb(),
+        "outcomes": outcomes,
+        "requests": sum(a["requests"] for a in agg),
+        "retries": sum(a["retries"] for a in agg),
+        "p95_ms": round(max((a["p95"] for a in agg), default=0.0) * 1000, 1),
+    }
+
+
+# ============================
+# Orquestração
+# ============================
+
+def run_scenario(name: str, args: argparse.Namespace) -> Dict[str, Any]:
+    spec = SCENARIOS[name]
+    rows = max(1, int(spec["rows"] * args.scale))
+    seed_rows = int(spec["seed"] * args.scale)
+
+    state = MockIXCState(
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        rate_429=args.rate_429,
+        row_latency_ms=args.row_latency_ms,
+        response_format=args.response_format,
+    )
+    if seed_rows:
+        state.seed_table("su_oss_assunto", listing_records(seed_rows))
+
+    mock = MockIXC(state).start()
+    try:
+        proc = subprocess.run(
+            [sys.executable, __file__, "--worker", name, "--base-url", mock.base_url, "--rows", str(rows)],
+            capture_output=True,
+            text=True,
+            cwd=str(APP_DIR),
+        )
+    finally:
+        mock.stop()
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"{name} falhou:\n{proc.stderr[-4000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["mock"] = dict(state.counters)
+    return result
+
+
+def load_baselines() -> Dict[str, Any]:
+    if not BASELINES_FILE.exists():
+        return {}
+    return json.loads(BASELINES_FILE.read_text(encoding="utf-8"))
+
+
+def compare(result: Dict[str, Any], baseline: Optional[Dict[str, Any]], tolerance: float) -> str:
+    """Throughput abaixo de baseline*(1-tol) ou pico de memória acima de baseline*(1+tol) = regressão."""
+    if not baseline or float(baseline.get("rows_per_sec") or 0) <= 0:
+        return "sem baseline"
+    ref = float(baseline["rows_per_sec"])
+    delta = result["rows_per_sec"] / ref - 1.0
+    notes = [f"{delta:+.0%} vs {ref:g} linhas/s"]
+    bad = delta < -tolerance
+
+    ref_rss = baseline.get("peak_rss_mb")
+    if ref_rss and result.get("peak_rss_mb"):
+        d_rss = result["peak_rss_mb"] / float(ref_rss) - 1.0
+        notes.append(f"RSS {d_rss:+.0%}")
+        bad = bad or d_rss > tolerance
+
+    return f"{'REGRESSAO' if bad else 'ok'} ({', '.join(notes)})"
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmarks do ixcTools contra o mock local do IXC.")
+    ap.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS), help="repetível; padrão = todos")
+    ap.add_argument("--scale", type=float, default=1.0, help="multiplica o nº de linhas (0.1 = 10%%)")
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--rate-429", type=float, default=0.0)
+    ap.add_argument("--row-latency-ms", type=float, default=0.0, help="custo por registro no listar do mock (IXC fraco)")
+    ap.add_argument("--response-format", choices=["registros", "rows"], default="registros")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="queda máxima aceita vs baseline (0.2 = 20%%)")
+    ap.add_argument("--repeat", type=int, default=1, help="roda cada cenário N vezes e fica com a melhor")
+    ap.add_argument("--update-baseline", action="store_true")
+    ap.add_argument("--json", dest="json_out", help="grava os resultados neste arquivo")
+    ap.add_argument("--worker", help=argparse.SUPPRESS)
+    ap.add_argument("--base-url", help=argparse.SUPPRESS)
+    ap.add_argument("--rows", type=int, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        print(json.dumps(_worker(args.worker, args.base_url, args.rows)))
+        return 0
+
+    names = args.scenario or list(SCENARIOS)
+    baselines = load_baselines()
+    comparable = args.scale == 1.0 and not (args.latency_ms or args.error_rate or args.rate_429 or args.row_latency_ms)
+
+    results: List[Dict[str, Any]] = []
+    regressions = 0
+    for name in names:
+        runs = [run_scenario(name, args) for _ in range(max(1, args.repeat))]
+        res = max(runs, key=lambda r: r["rows_per_sec"])
+        results.append(res)
+        verdict = compare(res, baselines.get(name), args.tolerance) if comparable else "não comparável (parâmetros != baseline)"
+        if verdict.startswith("REGRESSAO"):
+            regressions += 1
+        print(
+            f"{name:<12} {res['rows']:>7} linhas  {res['seconds']:>8.2f}s  {res['rows_per_sec']:>9.1f} linhas/s  "
+            f"pico RSS {res['peak_rss_mb']} MB  req {res['requests']} (retries {res['retries']}, p95 {res['p95_ms']} ms)  "
+            f"{res['outcomes']}  -> {verdict}",
+            flush=True,
+        )
+
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if args.update_baseline:
+        if not comparable:
+            print("baseline não atualizada: rode com --scale 1 e sem latência/erros injetados", file=sys.stderr)
+            return 2
+        for res in results:
+            baselines[res["scenario"]] = {
+                "rows": res["rows"],
+                "rows_per_sec": res["rows_per_sec"],
+                "peak_rss_mb": res["peak_rss_mb"],
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+            }
+        BASELINES_FILE.write_text(json.dumps(baselines, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"baseline gravada em {BASELINES_FILE}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
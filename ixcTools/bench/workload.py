@@ -0,0 +1,290 @@
+# bench/workload.py
+# Gerador de carga sintética: planilhas de Assuntos/Diagnósticos (xlsx/CSV) e payloads de listar.
+#
+# As colunas e os valores padrão vêm dos próprios modelos em templates/ (modelo_assuntos.xlsx e
+# modelo_diagnosticos.xlsx), então o arquivo gerado tem exatamente o layout que o import espera.
+# Taxas controladas de linhas inválidas, duplicadas e vazias; mesma seed = mesmo arquivo.
+#
+# Exemplos (a partir de ixcTools/):
+#   python bench/workload.py assuntos --rows 100000 --format xlsx csv
+#   python bench/workload.py diagnosticos --rows 1000 --invalid-rate 0.1
+#   python bench/workload.py listar --rows 50000 --rp 1000 --response-format rows
+#
+# Cada arquivo ganha um <nome>.manifest.json com as contagens esperadas (válidas, inválidas, ...),
+# para conferir o relatório do import sem abrir a planilha.
+
+from __future__ import annotations
+
+import argparse
+import json
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent
+TEMPLATES_DIR = APP_DIR / "templates"
+DEFAULT_OUT_DIR = BENCH_DIR / "data"
+
+# Espelham REQUIRED_ASSUNTO / COND_ASSUNTO / REQUIRED_DIAGNOSTICO do app.py (sem importar o Streamlit).
+REQUIRED_ASSUNTO = [
+    "assunto",
+    "ativo",
+    "layout_impressao",
+    "numero_de_vias",
+    "exige_comodato_finalizar_os",
+    "exige_produto_finalizar_os",
+    "tipo_comissao",
+    "considerar_sla",
+    "metas_horas_abertura_ticket",
+]
+COND_ASSUNTO = [
+    ("exige_comodato_finalizar_os", "quantidade_equipamentos"),
+    ("exige_produto_finalizar_os", "quantidade_produtos"),
+]
+REQUIRED_DIAGNOSTICO = ["descricao", "ativo"]
+
+SIZES = [1_000, 10_000, 50_000, 100_000, 500_000]
+
+
+@dataclass
+class WorkloadManifest:
+    kind: str
+    rows: int
+    seed: int
+    valid: int
+    invalid_required: int
+    invalid_conditional: int
+    duplicates: int
+    empty: int
+
+
+# ============================
+# Base (modelos)
+# ============================
+
+def template_defaults(kind: str) -> Dict[str, str]:
+    """Colunas do modelo, na ordem, com o valor da 1ª linha como padrão ("" quando vazio)."""
+    filename = "modelo_assuntos.xlsx" if kind == "assuntos" else "modelo_diagnosticos.xlsx"
+    df = pd.read_excel(TEMPLATES_DIR / filename, dtype=str, nrows=1)
+    first = df.iloc[0] if len(df) else pd.Series(index=df.columns, dtype=object)
+    return {str(c): ("" if pd.isna(first.get(c)) else str(first.get(c))) for c in df.columns}
+
+
+def _choice(rng: np.random.Generator, values: List[str], n: int, p: Optional[List[float]] = None) -> np.ndarray:
+    return rng.choice(np.array(values, dtype=object), size=n, p=p)
+
+
+# ============================
+# Planilhas
+# ============================
+
+def _assuntos_frame(n: int, rng: np.random.Generator, start: int = 1) -> pd.DataFrame:
+    base = template_defaults("assuntos")
+    num = np.arange(start, start + n)
+    df = pd.DataFrame({c: np.full(n, v, dtype=object) for c, v in base.items()})
+
+    df["assunto"] = [f"Assunto {i:06d}" for i in num]
+    df["descricao"] = [f"Descrição gerada do assunto {i}" for i in num]
+    df["ativo"] = _choice(rng, ["S", "N"], n, [0.9, 0.1])
+    df["tipo_comissao"] = _choice(rng, ["F", "P"], n)
+    df["considerar_sla"] = _choice(rng, ["AB", "AG", "N"], n)
+    df["metas_horas_abertura_ticket"] = _choice(rng, ["24.0", "48.0", "72.0"], n)
+    df["numero_de_vias"] = _choice(rng, ["1", "2"], n, [0.8, 0.2])
+
+    for flag, qty in COND_ASSUNTO:
+        on = rng.random(n) < 0.3
+        df[flag] = np.where(on, "S", "N")
+        df[qty] = np.where(on, rng.integers(1, 6, n).astype(str), "0")
+    return df
+
+
+def _diagnosticos_frame(n: int, rng: np.random.Generator, start: int = 1) -> pd.DataFrame:
+    base = template_defaults("diagnosticos")
+    num = np.arange(start, start + n)
+    df = pd.DataFrame({c: np.full(n, v, dtype=object) for c, v in base.items()})
+    df["descricao"] = [f"Diagnóstico {i:06d}" for i in num]
+    df["ativo"] = _choice(rng, ["S", "N"], n, [0.9, 0.1])
+    if "id_setor" in df.columns:
+        df["id_setor"] = _choice(rng, ["", "1", "2", "3"], n)
+    return df
+
+
+def generate_sheet(
+    kind: str,
+    rows: int,
+    *,
+    invalid_rate: float = 0.02,
+    duplicate_rate: float = 0.01,
+    empty_rate: float = 0.005,
+    seed: int = 1,
+) -> "tuple[pd.DataFrame, WorkloadManifest]":
+    """
+    Planilha de `rows` linhas (todas str) + manifesto com as contagens esperadas.
+    - inválidas: metade com um obrigatório vazio, metade (assuntos) com flag 'S' e quantidade 0
+    - duplicadas: cópia exata de uma linha válida anterior (passa na validação; o IXC decide)
+    - vazias: todas as colunas em branco (o import pula com "Pular linhas ... vazias")
+    """
+    rng = np.random.default_rng(seed)
+    build = _assuntos_frame if kind == "assuntos" else _diagnosticos_frame
+    required = REQUIRED_ASSUNTO if kind == "assuntos" else REQUIRED_DIAGNOSTICO
+    df = build(rows, rng)
+
+    n_empty = int(rows * empty_rate)
+    n_dup = int(rows * duplicate_rate)
+    n_inv = int(rows * invalid_rate)
+    picked = rng.permutation(np.arange(1, rows))[: n_empty + n_dup + n_inv] if rows > 1 else np.array([], dtype=int)
+    empty_idx = picked[:n_empty]
+    dup_idx = picked[n_empty:n_empty + n_dup]
+    inv_idx = picked[n_empty + n_dup:]
+
+    n_cond = len(inv_idx) // 2 if kind == "assuntos" else 0
+    cond_idx, req_idx = inv_idx[:n_cond], inv_idx[n_cond:]
+
+    # obrigatório vazio (fora do campo "nome", senão a linha cai como vazia)
+    blank_fields = _choice(rng, required[1:], len(req_idx)) if len(req_idx) else []
+    for i, f in zip(req_idx, blank_fields):
+        df.at[i, f] = ""
+
+    for i, k in zip(cond_idx, rng.integers(0, len(COND_ASSUNTO), len(cond_idx))):
+        flag, qty = COND_ASSUNTO[k]
+        df.at[i, flag] = "S"
+        df.at[i, qty] = "0"
+
+    # duplicata = cópia de uma linha anterior que não foi alterada acima
+    touched = set(picked.tolist())
+    src_idx = []
+    for i in dup_idx:
+        src = int(rng.integers(0, i))
+        while src in touched and src > 0:
+            src -= 1
+        src_idx.append(src)
+    if len(dup_idx):
+        df.iloc[dup_idx] = df.iloc[src_idx].to_numpy()
+
+    df.iloc[empty_idx] = ""
+
+    manifest = WorkloadManifest(
+        kind=kind,
+        rows=rows,
+        seed=seed,
+        valid=rows - len(inv_idx) - len(empty_idx),
+        invalid_required=len(req_idx),
+        invalid_conditional=len(cond_idx),
+        duplicates=len(dup_idx),
+        empty=len(empty_idx),
+    )
+    return df, manifest
+
+
+def write_xlsx(df: pd.DataFrame, path: Path) -> None:
+    """openpyxl em write_only: memória constante mesmo com 500k linhas."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Planilha1")
+    ws.append(list(df.columns))
+    for row in df.itertuples(index=False, name=None):
+        ws.append([v if v != "" else None for v in row])
+    wb.save(path)
+
+
+def write_csv(df: pd.DataFrame, path: Path, sep: str = ";") -> None:
+    # ';' + BOM: abre direto no Excel pt-BR
+    df.to_csv(path, index=False, sep=sep, encoding="utf-8-sig")
+
+
+# ============================
+# Listar (Gerenciar Assuntos)
+# ============================
+
+def listing_records(rows: int, *, seed: int = 1, start_id: int = 1) -> List[Dict[str, str]]:
+    """Registros como o listar do su_oss_assunto devolve: todas as colunas do modelo + id, tudo str."""
+    df = _assuntos_frame(rows, np.random.default_rng(seed), start=start_id)
+    df.insert(0, "id", [str(i) for i in range(start_id, start_id + rows)])
+    return df.to_dict("records")
+
+
+def lookup_tables() -> Dict[str, List[Dict[str, str]]]:
+    """Tabelas referenciadas pelos modelos (LOOKUPS do app.py) com os ids usados nas planilhas sintéticas."""
+    return {
+        "su_oss_layout_impressao": [{"id": str(i), "descricao": f"Layout {i}"} for i in range(1, 11)],
+        "empresa_setor": [
+            {"id": "1", "setor": "Suporte"},
+            {"id": "2", "setor": "Financeiro"},
+            {"id": "3", "setor": "Instalação"},
+        ],
+        "vendedor": [{"id": str(i), "nome": f"Vendedor {i}"} for i in range(1, 6)],
+    }
+
+
+def listar_pages(
+    records: List[Dict[str, str]], *, rp: int = 1000, response_format: str = "registros"
+) -> Iterator[Dict[str, Any]]:
+    """Fatia os registros em páginas no formato do IXC ("registros" ou a variante rows/cell)."""
+    total = str(len(records))
+    for page, start in enumerate(range(0, max(len(records), 1), rp), start=1):
+        chunk = records[start:start + rp]
+        if response_format == "rows":
+            yield {"page": str(page), "total": total, "rows": [{"id": r["id"], "cell": r} for r in chunk]}
+        else:
+            yield {"page": str(page), "total": total, "registros": chunk}
+
+
+# ============================
+# CLI
+# ============================
+
+def _write_manifest(path: Path, manifest: Any) -> None:
+    path.with_suffix(".manifest.json").write_text(json.dumps(asdict(manifest), indent=2) + "\n", encoding="utf-8")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Gera planilhas e payloads sintéticos para benchmarks do ixcTools.")
+    ap.add_argument("kind", choices=["assuntos", "diagnosticos", "listar"])
+    ap.add_argument("--rows", type=int, nargs="+", default=[1_000], help=f"um ou mais tamanhos (ex.: {' '.join(map(str, SIZES))})")
+    ap.add_argument("--format", nargs="+", choices=["xlsx", "csv"], default=["xlsx"])
+    ap.add_argument("--csv-sep", default=";")
+    ap.add_argument("--invalid-rate", type=float, default=0.02)
+    ap.add_argument("--duplicate-rate", type=float, default=0.01)
+    ap.add_argument("--empty-rate", type=float, default=0.005)
+    ap.add_argument("--rp", type=int, default=1000, help="listar: registros por página")
+    ap.add_argument("--response-format", choices=["registros", "rows"], default="registros")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", type=Path, default=DEFAULT_OUT_DIR)
+    args = ap.parse_args()
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    for n in args.rows:
+        if args.kind == "listar":
+            out_dir = args.out / f"listar_{n}_{args.response_format}"
+            out_dir.mkdir(parents=True, exist_ok=True)
+            pages = 0
+            for pages, page in enumerate(listar_pages(listing_records(n, seed=args.seed), rp=args.rp, response_format=args.response_format), start=1):
+                (out_dir / f"page_{pages:05d}.json").write_text(json.dumps(page, ensure_ascii=False), encoding="utf-8")
+            print(f"{out_dir}: {pages} páginas de até {args.rp}")
+            continue
+
+        df, manifest = generate_sheet(
+            args.kind,
+            n,
+            invalid_rate=args.invalid_rate,
+            duplicate_rate=args.duplicate_rate,
+            empty_rate=args.empty_rate,
+            seed=args.seed,
+        )
+        for fmt in args.format:
+            path = args.out / f"{args.kind}_{n}.{fmt}"
+            if fmt == "xlsx":
+                write_xlsx(df, path)
+            else:
+                write_csv(df, path, sep=args.csv_sep)
+            _write_manifest(path, manifest)
+            print(f"{path}: {asdict(manifest)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# bench/xlsx_backends.py
+# Compara os backends de leitura de .xlsx do app (calamine x openpyxl) em planilhas com o layout dos modelos.
+#
+# Uso (a partir de ixcTools/):
+#   python bench/xlsx_backends.py                      # modelo_assuntos.xlsx + 1k e 10k linhas sintéticas
+#   python bench/xlsx_backends.py --rows 1000 50000 --kind diagnosticos --repeat 3
+#
+# Para cada arquivo: tempo de leitura por backend (melhor de N) e conferência de paridade — mesmos dtypes
+# e mesmo normalize_value em todas as células, com e sem dtype=str. Sai com código 1 se algum backend divergir.
+# Sem o python-calamine instalado, só o openpyxl é medido.
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR))
+
+from run_bench import _import_app  # noqa: E402
+from workload import TEMPLATES_DIR, generate_sheet, write_xlsx  # noqa: E402
+
+
+def _read(app: Any, data: bytes, backend: str, as_text: bool, repeat: int) -> Tuple[float, Any]:
+    best, df = float("inf"), None
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        df = app.read_xlsx(data, dtype=str if as_text else None, backend=backend)
+        best = min(best, time.perf_counter() - t0)
+    return best, df
+
+
+def _parity(app: Any, ref: Any, other: Any) -> List[str]:
+    """Diferenças de colunas, dtypes e normalize_value célula a célula (vazio = paridade)."""
+    if list(ref.columns) != list(other.columns):
+        return ["colunas diferentes"]
+    if ref.shape != other.shape:
+        return [f"formato {ref.shape} != {other.shape}"]
+    diffs = [f"dtype {c}: {ref[c].dtype} != {other[c].dtype}" for c in ref.columns if ref[c].dtype != other[c].dtype]
+    for c in ref.columns:
+        a = [app.normalize_value(v) for v in ref[c].tolist()]
+        b = [app.normalize_value(v) for v in other[c].tolist()]
+        bad = [i for i, (x, y) in enumerate(zip(a, b)) if x != y]
+        if bad:
+            i = bad[0]
+            diffs.append(f"valor {c} ({len(bad)} células; linha {i + 2}: {a[i]!r} != {b[i]!r})")
+    return diffs
+
+
+def run(files: List[Tuple[str, bytes]], repeat: int) -> int:
+    app = _import_app()
+    backends = app.available_xlsx_backends()
+    print(f"backends instalados: {', '.join(backends)} (auto = {app.xlsx_backend('auto')})")
+    failures = 0
+    for label, data in files:
+        base_secs = None
+        results: Dict[str, Dict[str, Any]] = {}
+        for backend in backends:
+            secs, df = _read(app, data, backend, False, repeat)
+            _, df_text = _read(app, data, backend, True, 1)
+            results[backend] = {"secs": secs, "df": df, "df_text": df_text}
+            if backend == "openpyxl":
+                base_secs = secs
+
+        ref_name = "openpyxl" if "openpyxl" in results else backends[0]
+        ref = results[ref_name]
+        rows = len(ref["df"])
+        for backend, res in results.items():
+            diffs = [] if backend == ref_name else (
+                _parity(app, ref["df"], res["df"]) + [f"dtype=str: {d}" for d in _parity(app, ref["df_text"], res["df_text"])]
+            )
+            failures += bool(diffs)
+            speedup = f"{base_secs / res['secs']:.1f}x" if base_secs and backend != "openpyxl" else "-"
+            print(
+                f"{label:<28} {rows:>7} linhas  {backend:<9} {res['secs']:>8.2f}s  "
+                f"{rows / res['secs'] if res['secs'] else 0:>9.0f} linhas/s  {speedup:>6}  "
+                f"{'paridade ok' if not diffs else 'DIVERGE: ' + '; '.join(diffs[:3])}",
+                flush=True,
+            )
+    return 1 if failures else 0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Leitura de .xlsx: calamine x openpyxl (tempo e paridade).")
+    ap.add_argument("--rows", type=int, nargs="*", default=[1_000, 10_000], help="tamanhos das planilhas sintéticas")
+    ap.add_argument("--kind", choices=["assuntos", "diagnosticos"], default="assuntos")
+    ap.add_argument("--repeat", type=int, default=1, help="melhor de N leituras por backend")
+    args = ap.parse_args()
+
+    template = TEMPLATES_DIR / ("modelo_assuntos.xlsx" if args.kind == "assuntos" else "modelo_diagnosticos.xlsx")
+    files: List[Tuple[str, bytes]] = [(template.name, template.read_bytes())]
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.rows:
+            df, _ = generate_sheet(args.kind, n)
+            path = Path(tmp) / f"{args.kind}_{n}.xlsx"
+            write_xlsx(df, path)
+            files.append((path.name, path.read_bytes()))
+    return run(files, args.repeat)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""Fixtures dos testes: o app.py importado fora do `streamlit run` e o mock do IXC de bench/mock_ixc.py."""
+from __future__ import annotations
+
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+
+APP_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(APP_DIR))
+sys.path.insert(0, str(APP_DIR / "bench"))
+
+from mock_ixc import MockIXC, MockIXCState  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    """Módulo do app em modo bare (mesmo caminho do bench/run_bench.py), sem o ruído de warnings do Streamlit."""
+    logging.disable(logging.WARNING)
+    os.environ.setdefault("IXC_PROGRESS_INTERVAL_SECONDS", "3600")
+    import app as module  # noqa: WPS433
+
+    logging.disable(logging.NOTSET)
+    return module
+
+
+@pytest.fixture
+def mock_ixc():
+    mock = MockIXC(MockIXCState()).start()
+    yield mock
+    mock.stop()
+
+
+@pytest.fixture
+def ixc_cfg(mock_ixc) -> Dict[str, Any]:
+    return {
+        "base_url": mock_ixc.base_url,
+        "auth_basic": "test:test",
+        "cookie": "",
+        "timeout_seconds": 10.0,
+        "max_retries": 1,
+        "retry_backoff_seconds": 0.01,
+        "rate_limit": 0.0,
+    }
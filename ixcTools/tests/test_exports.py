@@ -0,0 +1,36 @@
+import gzip
+import json
+
+import pyarrow as pa
+
+
+def test_typed_export_table_types(app):
+    table = pa.table({
+        "id": ["1", "2", "3"],
+        "valor": ["1.5", "2", ""],
+        "data": ["2024-01-02 03:04:05", "", "2024-02-03 00:00:00"],
+        "texto": ["a", "b", "c"],
+    })
+    out = app.typed_export_table(table)
+
+    assert out.schema.field("id").type == pa.int64()
+    assert out.schema.field("valor").type == pa.float64()
+    assert out.column("valor").to_pylist() == [1.5, 2.0, None]
+    assert pa.types.is_timestamp(out.schema.field("data").type)
+    assert out.schema.field("texto").type == pa.string()
+
+
+def test_typed_export_table_keeps_codes_as_text(app):
+    table = pa.table({
+        "zeros": ["0012", "13"],
+        "longo": ["99999999999999999999", "1"],
+        "decimal_zeros": ["01.5", "2"],
+    })
+    out = app.typed_export_table(table)
+
+    for name in table.column_names:
+        assert out.column(name).to_pylist() == table.column(name).to_pylist()
+    # os dois formatos exportam sem estourar
+    app.table_to_parquet_bytes(out)
+    rows = [json.loads(line) for line in gzip.decompress(app.table_to_ndjson_gz(out)).splitlines()]
+    assert rows[0] == {"zeros": "0012", "longo": "99999999999999999999", "decimal_zeros": "01.5"}
@@ -0,0 +1,85 @@
+import json
+
+import pyarrow as pa
+import pytest
+
+
+def _split(body: bytes, size: int):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_stream_list_response_any_chunking(app, chunk_size):
+    body = json.dumps({
+        "page": "1",
+        "total": 12345678901,
+        "registros": [{"id": "1", "assunto": "Ação"}, {"su_oss_assunto.id": "2", "assunto": "B"}],
+    }, ensure_ascii=False).encode("utf-8")
+    records = []
+
+    meta, nbytes = app.stream_list_response(_split(body, chunk_size), records.append)
+
+    assert meta == {"page": "1", "total": 12345678901, "registros": "<2 itens>"}
+    assert nbytes == len(body)
+    assert [r["id"] for r in records] == ["1", "2"]
+    assert records[0]["assunto"] == "Ação"
+
+
+def test_stream_list_response_rows_format(app):
+    body = b'{"page":"1","rows":[{"id":"5","cell":{"id":"5","descricao":"x"}}]}'
+    records = []
+    app.stream_list_response(_split(body, 3), records.append)
+    assert records == [{"id": "5", "descricao": "x"}]
+
+
+def test_stream_list_response_truncated(app):
+    with pytest.raises(ValueError):
+        app.stream_list_response([b'{"registros":[{"id":"1"}'], lambda r: None)
+
+
+def test_column_accumulator_commit_and_discard(app):
+    acc = app.ColumnAccumulator()
+    acc.append({"id": "1", "a": " x "})
+    acc.append({"id": "2", "b": None})
+    assert acc.commit() == 2
+    acc.append({"id": "3", "a": "lost"})
+    acc.discard()  # retry da página: nada entra
+    acc.append({"id": "4", "a": "nan"})
+    assert acc.commit() == 1
+
+    table = acc.to_table()
+    assert acc.last_id == "4"
+    assert table.column("id").to_pylist() == ["1", "2", "4"]
+    assert table.column("a").to_pylist() == ["x", "", ""]
+    assert table.column("b").to_pylist() == ["", "", ""]
+    assert acc.to_table(limit=2).num_rows == 2
+
+
+def test_id_ranges(app):
+    assert app.id_ranges(["10", "3", "abc", "12", "3", "2000", "2999", "3000"], span=1000) == [
+        (3, 12), (2000, 2999), (3000, 3000),
+    ]
+    assert app.id_ranges([], span=10) == []
+
+
+def test_patched_table_batch(app):
+    table = pa.table({"id": ["1", "2", "3"], "assunto": ["a", "b", "c"], "ativo": ["S", "S", "S"]})
+
+    out = app._patched_table(table, {"3": {"assunto": " C ", "id": "999"}, "1": {"ativo": "N"}, "77": {"assunto": "z"}})
+
+    assert out.column("id").to_pylist() == ["1", "2", "3"]
+    assert out.column("assunto").to_pylist() == ["a", "b", "C"]
+    assert out.column("ativo").to_pylist() == ["N", "S", "S"]
+    assert app._patched_table(table, {"77": {"assunto": "z"}}) is None
+
+
+def test_listing_cache_patch_many(app):
+    cache = app.ListingCache(ttl=300, max_bytes=1 << 30)
+    key = ("http://h", "fp", "/webservice/v1/su_oss_assunto", 1000, 10, 0, "page")
+    old = pa.table({"id": ["1", "2"], "assunto": ["a", "b"]})
+    cache.put(key, old, [{"http_status": 200}])
+
+    assert cache.patch_many("http://h", "/webservice/v1/su_oss_assunto", {"2": {"assunto": "B"}}) == 1
+    assert cache.get(key).table.column("assunto").to_pylist() == ["a", "B"]
+    assert old.column("assunto").to_pylist() == ["a", "b"]  # quem já leu continua com a tabela antiga
+    assert cache.patch_many("http://outro", "/webservice/v1/su_oss_assunto", {"1": {"assunto": "x"}}) == 0
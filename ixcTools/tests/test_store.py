@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def store(app):
+    frame = app.build_subjects_frame([
+        {"id": "1", "assunto": "Sem sinal", "ativo": "S"},
+        {"id": "2", "assunto": "Lentidão", "ativo": "N"},
+        {"id": "3", "assunto": "Troca de senha", "ativo": "S"},
+    ])
+    return app.SubjectStore(df=frame)
+
+
+def test_set_cell_keeps_original_until_commit(store):
+    store.set_cell("1", "assunto", "Sem sinal (fibra)")
+    assert store.changed_ids() == ["1"]
+    assert store.original_value("1", "assunto") == "Sem sinal"
+    assert store.current_row("1")["assunto"] == "Sem sinal (fibra)"
+
+    store.commit("1")
+    assert store.changed_ids() == []
+    assert store.original_value("1", "assunto") == "Sem sinal (fibra)"
+
+
+def test_set_cell_back_to_original_leaves_overlay(store):
+    store.set_cell("2", "ativo", "S")
+    store.set_cell("2", "ativo", "N")
+    assert store.original == {}
+
+
+def test_set_many_counts_only_changed_cells(store):
+    assert store.set_many(["1", "2", "3", "99"], "ativo", "S") == 1
+    assert store.changed_ids() == ["2"]
+
+
+def test_conflicts_and_rebase(store):
+    store.set_cell("1", "assunto", "Nosso nome")
+    server = {"id": "1", "assunto": "Nome no IXC", "ativo": "N"}
+
+    # o PUT manda a linha inteira: o "ativo" que mudou só no IXC também seria sobrescrito
+    assert store.conflicts("1", server) == [
+        ("assunto", "Sem sinal", "Nome no IXC", "Nosso nome"),
+        ("ativo", "S", "N", "S"),
+    ]
+
+    store.rebase("1", server)
+    # a edição fica por cima da versão do IXC; o campo que não editamos vem do servidor
+    assert store.current_value("1", "assunto") == "Nosso nome"
+    assert store.original_value("1", "assunto") == "Nome no IXC"
+    assert store.current_value("1", "ativo") == "N"
+    assert store.conflicts("1", server) == []
+
+
+def test_rebase_drops_edit_already_on_server(store):
+    store.set_cell("3", "ativo", "N")
+    store.rebase("3", {"id": "3", "assunto": "Troca de senha", "ativo": "N"})
+    assert store.changed_ids() == []
+
+
+def test_diff_workbook(store):
+    edited = pd.DataFrame({
+        "id": ["1", "2", "42", ""],
+        "assunto": [" Sem sinal ", "Lentidão na rede", "Novo", "sem id"],
+        "ativo": ["S", "N", "S", "S"],
+        "coluna_extra": ["x", "y", "z", "w"],
+    })
+    changes, unknown = store.diff_workbook(edited)
+
+    assert changes.to_dict("records") == [{"id": "2", "campo": "assunto", "atual": "Lentidão", "novo": "Lentidão na rede"}]
+    assert unknown == ["42"]
+
+    assert store.apply_changes(changes) == 1
+    assert store.changed_ids() == ["2"]
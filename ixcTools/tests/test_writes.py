@@ -0,0 +1,46 @@
+"""POST/PUT contra o mock do IXC: 200 com ``type: error`` é rejeição em todos os caminhos de escrita."""
+
+
+def _payload(app, name):
+    payload = {f: "1" for f in app.REQUIRED_ASSUNTO}
+    payload["assunto"] = name
+    return payload
+
+
+def test_dispatch_payload_created(app, ixc_cfg):
+    out = app.dispatch_payload(ixc_cfg, app.ENDPOINT_ASSUNTO, "assunto", 0, _payload(app, "A"), [], dry_run=False)
+
+    assert out.outcome == "ok"
+    assert out.result["status"] == "CRIADO"
+    assert out.compact["ok"] is True
+
+
+def test_dispatch_payload_type_error_is_api_error(app, ixc_cfg, mock_ixc):
+    mock_ixc.state.create = lambda table, payload: {"type": "error", "message": "Assunto já cadastrado"}
+
+    out = app.dispatch_payload(ixc_cfg, app.ENDPOINT_ASSUNTO, "assunto", 0, _payload(app, "A"), [], dry_run=False)
+
+    assert out.outcome == "api"
+    assert out.result["status"] == "ERRO_API"
+    assert out.result["http_status"] == 200
+    assert out.result["mensagem"] == "Assunto já cadastrado"
+    assert out.compact["ok"] is False
+
+
+def test_dispatch_payload_validation_skips_http(app, ixc_cfg, mock_ixc):
+    out = app.dispatch_payload(ixc_cfg, app.ENDPOINT_ASSUNTO, "assunto", 3, {}, ["falta x"], dry_run=False)
+
+    assert out.outcome == "validation"
+    assert out.result["linha_excel"] == 5
+    assert "post" not in mock_ixc.state.counters
+
+
+def test_save_subject_type_error_keeps_edit_pending(app, ixc_cfg, mock_ixc):
+    mock_ixc.state.seed_table("su_oss_assunto", [{"id": "7", "assunto": "Antigo"}])
+
+    outcome, row = app.save_subject(ixc_cfg, "7", {"assunto": "Novo"}, validate_before=False)
+    assert (outcome, row["status"]) == ("ok", "OK")
+    assert mock_ixc.state.tables["su_oss_assunto"][7]["assunto"] == "Novo"
+
+    outcome, row = app.save_subject(ixc_cfg, "8", {"assunto": "Não existe"}, validate_before=False)
+    assert (outcome, row["status"], row["http_status"]) == ("api", "ERRO", 200)